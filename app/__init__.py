@@ -5,9 +5,15 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 import os
+from app.utils.database import RoutingSession, configure_database, install_engine_hooks
+from app.utils.metrics import metrics
+from app.utils.template_cache import fragment_cache
+from app.utils.assets import assets
+from app.utils.compression import compression
+from app.utils.http_cache import http_cache
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
 
@@ -21,7 +27,14 @@ def create_app(config_name='default'):
     app.config.from_object(config[config_name])
     
     # Initialize extensions
+    configure_database(app)
     db.init_app(app)
+    install_engine_hooks(app, db)
+    metrics.init_app(app, db)
+    fragment_cache.init_app(app)
+    assets.init_app(app)
+    compression.init_app(app)
+    http_cache.init_app(app)
     login_manager.init_app(app)
     
     # Configure login manager
@@ -29,12 +42,34 @@ def create_app(config_name='default'):
     login_manager.login_message = 'Please log in to access this page.'
     login_manager.login_message_category = 'info'
     
-    # User loader for Flask-Login
-    from app.models.user import User
+    # Password hashing pool and login throttling
+    from app.services.password_service import password_hasher, login_throttle
+    password_hasher.init_app(app)
+    login_throttle.init_app(app)
+    
+    # User loader for Flask-Login, served from the per-process user cache
+    from app.services.user_cache_service import user_cache
+    user_cache.init_app(app)
+    
+    # Report files: sharded storage and the periodic sweeper
+    from app.services.report_storage_service import report_storage
+    report_storage.init_app(app)
+    
+    # Population statistics rollups and their background compactor
+    from app.services.population_stats_service import population_stats
+    population_stats.init_app(app)
+    
+    # Server-sent event streams of dashboard deltas
+    from app.services.live_update_service import live_updates
+    live_updates.init_app(app)
+    
+    # On-demand profiler, started from the admin API
+    from app.services.profiler_service import profiler
+    profiler.init_app(app)
     
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return user_cache.load_user(user_id)
     
     # Register blueprints
     from app.routes.auth import auth_bp
@@ -42,12 +77,14 @@ def create_app(config_name='default'):
     from app.routes.predictions import predictions_bp
     from app.routes.analytics import analytics_bp
     from app.routes.reports import reports_bp
+    from app.routes.admin import admin_bp
     
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(main_bp)
     app.register_blueprint(predictions_bp, url_prefix='/predict')
     app.register_blueprint(analytics_bp, url_prefix='/analytics')
     app.register_blueprint(reports_bp, url_prefix='/reports')
+    app.register_blueprint(admin_bp, url_prefix='/admin')
     
     
     # Error handlers
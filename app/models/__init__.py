@@ -3,5 +3,11 @@ Models Package Initialization
 """
 from app.models.user import User
 from app.models.prediction import Prediction
+from app.models.population_stats import DailyDiseaseStats
+from app.models.cohort_bitmap import CohortBitmap
+from app.models.report_file import ReportFile
+from app.models.prediction_change import PredictionChange
+from app.models.account_deletion import AccountDeletion
 
-__all__ = ['User', 'Prediction']
+__all__ = ['User', 'Prediction', 'DailyDiseaseStats', 'CohortBitmap', 'ReportFile', 'PredictionChange',
+           'AccountDeletion']
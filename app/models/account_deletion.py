@@ -0,0 +1,21 @@
+"""
+Account Deletion Model - Pending Account Deletions
+"""
+from datetime import datetime
+from app import db
+
+
+class AccountDeletion(db.Model):
+    """An account waiting to be deleted, kept until the deletion finishes so it can be resumed"""
+    
+    __tablename__ = 'account_deletions'
+    
+    # No foreign key: the row outlives the user until the deletion commits
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    
+    requested_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+    
+    def __repr__(self):
+        return f'<AccountDeletion {self.user_id} attempts={self.attempts}>'
@@ -0,0 +1,42 @@
+"""
+Cohort Bitmap Model - Compressed Prediction-Id Bitmaps per Symptom Value
+"""
+import zlib
+from app import db
+
+
+class CohortBitmap(db.Model):
+    """Which predictions of a disease recorded a given feature value, for one block of ids"""
+    
+    __tablename__ = 'cohort_bitmaps'
+    __table_args__ = (db.UniqueConstraint('disease_type', 'feature', 'value', 'chunk'),)
+    
+    # Each row covers prediction ids [chunk * CHUNK_BITS, (chunk + 1) * CHUNK_BITS)
+    CHUNK_BITS = 65536
+    
+    id = db.Column(db.Integer, primary_key=True)
+    disease_type = db.Column(db.String(50), nullable=False)
+    feature = db.Column(db.String(50), nullable=False)
+    value = db.Column(db.Integer, nullable=False)
+    chunk = db.Column(db.Integer, nullable=False)
+    
+    # zlib-compressed bitset, bit i (little-endian within each byte) = id chunk * CHUNK_BITS + i
+    bitmap = db.Column(db.LargeBinary, nullable=False)
+    
+    def get_bits(self):
+        """Decompress the bitset into a writable uint8 array"""
+        import numpy as np
+        return np.frombuffer(zlib.decompress(self.bitmap), dtype=np.uint8).copy()
+    
+    def set_bits(self, bits):
+        """Compress and store a uint8 bitset"""
+        self.bitmap = zlib.compress(bits.tobytes())
+    
+    @classmethod
+    def empty_bits(cls):
+        """A bitset with no ids set"""
+        import numpy as np
+        return np.zeros(cls.CHUNK_BITS // 8, dtype=np.uint8)
+    
+    def __repr__(self):
+        return f'<CohortBitmap {self.disease_type}.{self.feature}={self.value} #{self.chunk}>'
@@ -0,0 +1,50 @@
+"""
+Population Statistics Model - Daily Per-Disease Rollups Across All Users
+"""
+import json
+from app import db
+
+
+class DailyDiseaseStats(db.Model):
+    """Aggregated predictions for one disease on one day, for admin reporting"""
+    
+    __tablename__ = 'daily_disease_stats'
+    __table_args__ = (db.UniqueConstraint('day', 'disease_type'),)
+    
+    # Risk percentage histogram buckets: 0-10, 10-20, ..., 90-100
+    HISTOGRAM_BUCKETS = 10
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    disease_type = db.Column(db.String(50), nullable=False, index=True)
+    
+    # Counters
+    prediction_count = db.Column(db.Integer, default=0, nullable=False)
+    positive_count = db.Column(db.Integer, default=0, nullable=False)
+    low_count = db.Column(db.Integer, default=0, nullable=False)
+    medium_count = db.Column(db.Integer, default=0, nullable=False)
+    high_count = db.Column(db.Integer, default=0, nullable=False)
+    risk_sum = db.Column(db.Float, default=0.0, nullable=False)
+    
+    # Risk percentage distribution (histogram as JSON, t-digest as bytes)
+    risk_histogram = db.Column(db.Text)
+    risk_digest = db.Column(db.LargeBinary)
+    
+    # Highest prediction id folded into this row, used as the compaction watermark
+    last_prediction_id = db.Column(db.Integer, default=0, nullable=False, index=True)
+    
+    def get_histogram(self):
+        """Parse the histogram back to a list of bucket counts"""
+        if self.risk_histogram:
+            return json.loads(self.risk_histogram)
+        return [0] * self.HISTOGRAM_BUCKETS
+    
+    def get_digest(self):
+        """Restore the risk percentage t-digest"""
+        from app.utils.tdigest import TDigest
+        if self.risk_digest:
+            return TDigest.from_bytes(self.risk_digest)
+        return TDigest()
+    
+    def __repr__(self):
+        return f'<DailyDiseaseStats {self.disease_type} {self.day}>'
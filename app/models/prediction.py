@@ -2,6 +2,7 @@
 Prediction Model for Storing Disease Prediction History
 """
 from datetime import datetime
+from sqlalchemy.orm import load_only
 from app import db
 import json
 
@@ -11,7 +12,11 @@ class Prediction(db.Model):
     
     __tablename__ = 'predictions'
     
+    # Never reuse ids of deleted rows: rollups and syncs track progress by id
+    __table_args__ = {'sqlite_autoincrement': True}
+    
     id = db.Column(db.Integer, primary_key=True)
+    # No ON DELETE CASCADE: accounts are deleted after their predictions, so they can be unindexed first
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     
     # Disease information
@@ -32,6 +37,9 @@ class Prediction(db.Model):
     model_version = db.Column(db.String(20))
     model_accuracy = db.Column(db.Float)
     
+    # Per-feature contribution to the risk percentage (stored as JSON)
+    feature_contributions = db.Column(db.Text)
+    
     # Report
     report_id = db.Column(db.String(50), unique=True, index=True)
     report_generated = db.Column(db.Boolean, default=False)
@@ -43,6 +51,20 @@ class Prediction(db.Model):
     # Additional metadata
     notes = db.Column(db.Text)
     
+    # Set on read-only copies loaded from the monthly archive files
+    archived = False
+    
+    # Columns rendered by list views; input_features, notes and feature_contributions are left unloaded
+    LIST_COLUMNS = (
+        'id', 'user_id', 'disease_type', 'disease_name', 'prediction_result', 'risk_level',
+        'confidence_score', 'risk_percentage', 'report_id', 'report_generated', 'created_at'
+    )
+    
+    @classmethod
+    def list_options(cls):
+        """Loader option restricting a query to the list view columns"""
+        return load_only(*[getattr(cls, column) for column in cls.LIST_COLUMNS])
+    
     def set_input_features(self, features_dict):
         """Convert features dictionary to JSON string"""
         self.input_features = json.dumps(features_dict)
@@ -53,6 +75,21 @@ class Prediction(db.Model):
             return json.loads(self.input_features)
         return {}
     
+    def set_feature_contributions(self, contributions):
+        """Convert feature contributions dictionary to JSON string"""
+        self.feature_contributions = json.dumps(contributions) if contributions is not None else None
+    
+    def get_feature_contributions(self):
+        """Parse feature contributions back to dictionary"""
+        if self.feature_contributions:
+            return json.loads(self.feature_contributions)
+        return {}
+    
+    def get_top_contributors(self, limit=5):
+        """Get the features that moved the risk the most, as (feature, points) pairs"""
+        contributions = self.get_feature_contributions()
+        return sorted(contributions.items(), key=lambda item: abs(item[1]), reverse=True)[:limit]
+    
     def generate_report_id(self):
         """Generate a unique report ID"""
         from datetime import datetime
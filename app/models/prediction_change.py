@@ -0,0 +1,32 @@
+"""
+Prediction Change Model - Monotonic Log of Changes to a User's Predictions
+"""
+from datetime import datetime
+from app import db
+
+
+class PredictionChange(db.Model):
+    """One change to a prediction, in the order clients replay them when syncing"""
+    
+    __tablename__ = 'prediction_changes'
+    __table_args__ = (
+        db.Index('ix_prediction_changes_user_id_id', 'user_id', 'id'),
+        # Ids are sync cursors and must never be reused, not even after pruning the newest rows
+        {'sqlite_autoincrement': True}
+    )
+    
+    CREATED = 'created'
+    DELETED = 'deleted'
+    REPORT = 'report'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # No foreign keys: deletions are logged as tombstones after the prediction is gone
+    user_id = db.Column(db.Integer, nullable=False)
+    prediction_id = db.Column(db.Integer, nullable=False)
+    
+    kind = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<PredictionChange {self.id} {self.kind} {self.prediction_id}>'
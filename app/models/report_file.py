@@ -0,0 +1,27 @@
+"""
+Report File Model - Size and Last Access of Generated PDF Reports
+"""
+from datetime import datetime
+from app import db
+
+
+class ReportFile(db.Model):
+    """A report PDF on disk, tracked for orphan sweeping and quota eviction"""
+    
+    __tablename__ = 'report_files'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(db.String(50), unique=True, nullable=False, index=True)
+    
+    # No foreign key: rows of deleted predictions are what the sweeper looks for
+    prediction_id = db.Column(db.Integer, nullable=False, index=True)
+    
+    # Path relative to REPORTS_PATH, e.g. 3f/a2/report_RPT_0123456789AB.pdf
+    path = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.Integer, nullable=False, default=0)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_accessed = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<ReportFile {self.report_id} {self.size}B>'
@@ -3,8 +3,8 @@ User Model for Authentication and User Management
 """
 from datetime import datetime
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
+from app.services.password_service import password_hasher
 
 
 class User(UserMixin, db.Model):
@@ -33,15 +33,23 @@ class User(UserMixin, db.Model):
     last_login = db.Column(db.DateTime)
     
     # Relationships
-    predictions = db.relationship('Prediction', backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    predictions = db.relationship('Prediction', backref='user', lazy='dynamic', cascade='all, delete-orphan',
+                                  passive_deletes=True)
     
     def set_password(self, password):
         """Hash and set the user's password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
         """Check if the provided password matches the hash"""
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+    
+    def rehash_password(self, password):
+        """Re-hash a just-verified password if the hash parameters have changed"""
+        if password_hasher.needs_rehash(self.password_hash):
+            self.set_password(password)
+            return True
+        return False
     
     def update_last_login(self):
         """Update the last login timestamp"""
@@ -54,7 +62,9 @@ class User(UserMixin, db.Model):
     
     def get_recent_predictions(self, limit=10):
         """Get the most recent predictions"""
-        return self.predictions.order_by(Prediction.created_at.desc()).limit(limit).all()
+        return self.predictions.options(Prediction.list_options()).order_by(
+            Prediction.created_at.desc()
+        ).limit(limit).all()
     
     def __repr__(self):
         return f'<User {self.username}>'
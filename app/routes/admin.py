@@ -0,0 +1,224 @@
+"""
+Admin Routes - Population Analytics and Operational Stats
+"""
+from flask import Blueprint, Response, current_app, jsonify, request
+from app.services.user_cache_service import user_cache
+from app.services.password_service import password_hasher, login_throttle
+from app.services.report_storage_service import report_storage
+from app.services.population_stats_service import population_stats
+from app.services.profiler_service import profiler, ProfilerBusyError
+from app.utils.decorators import admin_required
+from app.utils.lazy import lazy_service
+from app.utils.database import replicas
+from app.utils.template_cache import fragment_cache
+from config import Config
+
+admin_bp = Blueprint('admin', __name__)
+# Imported on first use, with numpy
+cohort_index = lazy_service('app.services.cohort_index_service.CohortIndexService')
+
+
+@admin_bp.route('/api/population/overview')
+@admin_required
+def api_population_overview():
+    """Per-disease risk distributions, positive rates and risk quantiles"""
+    days = request.args.get('days', None, type=int)
+    return jsonify(population_stats.overview(days=days))
+
+
+@admin_bp.route('/api/population/daily')
+@admin_required
+def api_population_daily():
+    """Daily prediction volumes and positive rates"""
+    days = request.args.get('days', 30, type=int)
+    disease_type = request.args.get('disease', None)
+    
+    if disease_type and disease_type not in Config.DISEASES:
+        return jsonify({'error': 'Disease not found'}), 404
+    
+    return jsonify(population_stats.daily(days=days, disease_type=disease_type))
+
+
+@admin_bp.route('/api/population/quantiles')
+@admin_required
+def api_population_quantiles():
+    """Approximate risk percentage quantiles, e.g. ?q=0.5,0.95&disease=stroke"""
+    days = request.args.get('days', None, type=int)
+    disease_type = request.args.get('disease', None)
+    
+    if disease_type and disease_type not in Config.DISEASES:
+        return jsonify({'error': 'Disease not found'}), 404
+    
+    try:
+        quantiles = [float(q) for q in request.args.get('q', '0.5,0.9,0.99').split(',')]
+    except ValueError:
+        return jsonify({'error': 'Quantiles must be numbers between 0 and 1'}), 400
+    
+    if not all(0 <= q <= 1 for q in quantiles):
+        return jsonify({'error': 'Quantiles must be numbers between 0 and 1'}), 400
+    
+    return jsonify(population_stats.quantiles(quantiles, days=days, disease_type=disease_type))
+
+
+@admin_bp.route('/api/population/compact', methods=['POST'])
+@admin_required
+def api_population_compact():
+    """Fold new predictions into the daily rollups"""
+    folded = population_stats.compact()
+    return jsonify({'folded': folded, 'watermark': population_stats.get_watermark()})
+
+
+@admin_bp.route('/api/cohort/<disease_type>')
+@admin_required
+def api_cohort(disease_type):
+    """Count and list predictions matching symptom answers, e.g. ?smoking=1&high_bp=1,2&risk_level=High"""
+    if disease_type not in Config.DISEASES:
+        return jsonify({'error': 'Disease not found'}), 404
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 50, type=int), 500)
+    
+    # Each argument is a feature; comma-separated values are alternatives
+    conditions = {}
+    for feature, raw in request.args.items():
+        if feature in ('page', 'per_page'):
+            continue
+        if feature not in cohort_index.OUTCOME_VALUES and feature not in cohort_index.indexed_features[disease_type]:
+            return jsonify({'error': f'Feature not indexed: {feature}'}), 400
+        values = [cohort_index.parse_value(disease_type, feature, v.strip()) for v in raw.split(',')]
+        if None in values:
+            return jsonify({'error': f'Invalid value for {feature}: {raw}'}), 400
+        conditions[feature] = set(values)
+    
+    if not conditions:
+        return jsonify({'error': 'At least one condition is required'}), 400
+    
+    result = cohort_index.query(disease_type, conditions, page=max(page, 1), per_page=max(per_page, 1))
+    result['disease_type'] = disease_type
+    return jsonify(result)
+
+
+@admin_bp.route('/api/user-cache')
+@admin_required
+def api_user_cache():
+    """Hit rate of the logged-in user cache in this worker"""
+    return jsonify(user_cache.stats())
+
+
+@admin_bp.route('/api/template-cache')
+@admin_required
+def api_template_cache():
+    """Template fragment cache hit rate in this worker"""
+    return jsonify(fragment_cache.stats())
+
+
+@admin_bp.route('/api/template-cache/clear', methods=['POST'])
+@admin_required
+def api_template_cache_clear():
+    """Drop the rendered fragments of this worker"""
+    fragment_cache.clear()
+    return jsonify(fragment_cache.stats())
+
+
+@admin_bp.route('/api/login-stats')
+@admin_required
+def api_login_stats():
+    """Password hashing pool usage and login throttling in this worker"""
+    return jsonify({
+        'hashing': password_hasher.stats(),
+        'throttling': login_throttle.stats()
+    })
+
+
+@admin_bp.route('/api/database')
+@admin_required
+def api_database():
+    """Read binds and their last health check in this worker"""
+    return jsonify(replicas.stats())
+
+
+@admin_bp.route('/api/reports')
+@admin_required
+def api_reports():
+    """Report storage usage against the quota and the last sweep in this worker"""
+    return jsonify(report_storage.stats())
+
+
+@admin_bp.route('/api/reports/sweep', methods=['POST'])
+@admin_required
+def api_reports_sweep():
+    """Run the report sweeper now"""
+    result = report_storage.sweep()
+    if result is None:
+        return jsonify({'error': 'A sweep is already running'}), 409
+    return jsonify(result)
+
+
+@admin_bp.route('/api/profiler/start', methods=['POST'])
+@admin_required
+def api_profiler_start():
+    """Start sampling this worker for a time window and/or the next N requests of one endpoint"""
+    data = request.get_json(silent=True) or {}
+    endpoint = data.get('endpoint')
+    if endpoint is not None and endpoint not in current_app.view_functions:
+        return jsonify({'error': f'Unknown endpoint: {endpoint}'}), 400
+    try:
+        seconds = float(data['seconds']) if data.get('seconds') is not None else None
+        requests = int(data['requests']) if data.get('requests') is not None else None
+        interval_ms = float(data['interval_ms']) if data.get('interval_ms') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'seconds, requests and interval_ms must be numbers'}), 400
+    if requests is not None and endpoint is None:
+        return jsonify({'error': 'requests needs an endpoint'}), 400
+    
+    try:
+        status = profiler.start(seconds=seconds, endpoint=endpoint, requests=requests,
+                                interval_ms=interval_ms, trace_memory=bool(data.get('trace_memory')))
+    except ProfilerBusyError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(status), 202
+
+
+@admin_bp.route('/api/profiler/stop', methods=['POST'])
+@admin_required
+def api_profiler_stop():
+    """Stop the running profiling session"""
+    status = profiler.stop()
+    if status is None:
+        return jsonify({'error': 'No profiling session is running'}), 409
+    return jsonify(status)
+
+
+@admin_bp.route('/api/profiler')
+@admin_required
+def api_profiler():
+    """Status of the running or last profiling session"""
+    session = profiler.current()
+    if session is None:
+        return jsonify({'active': False})
+    return jsonify(session.status())
+
+
+@admin_bp.route('/api/profiler/stacks')
+@admin_required
+def api_profiler_stacks():
+    """Collapsed stacks of the last session, for flamegraph.pl or speedscope"""
+    session = profiler.current()
+    if session is None:
+        return jsonify({'error': 'No profiling session'}), 404
+    return Response(session.collapsed(), mimetype='text/plain',
+                    headers={'Content-Disposition': 'attachment; filename=profile.collapsed'})
+
+
+@admin_bp.route('/api/profiler/allocations')
+@admin_required
+def api_profiler_allocations():
+    """Largest allocation sites of the last session traced with trace_memory"""
+    session = profiler.current()
+    if session is None:
+        return jsonify({'error': 'No profiling session'}), 404
+    if session.tracing:
+        return jsonify({'error': 'The session is still tracing allocations'}), 409
+    if session.allocations is None:
+        return jsonify({'error': 'The session did not trace memory'}), 404
+    return jsonify({'allocations': session.allocations})
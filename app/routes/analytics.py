@@ -1,15 +1,20 @@
 """
 Analytics Routes - Dashboard and Statistics
 """
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, jsonify, request, Response
 from flask_login import login_required, current_user
 from app.models.prediction import Prediction
+from app.services.live_update_service import live_updates
 from sqlalchemy import func, extract
 from app import db
+from app.utils.database import use_read_engine
 from datetime import datetime, timedelta
 
 analytics_bp = Blueprint('analytics', __name__)
 
+# Analytics only reads, so it never waits on the writer
+analytics_bp.before_request(use_read_engine)
+
 
 @analytics_bp.route('/')
 @login_required
@@ -122,18 +127,48 @@ def api_disease_comparison():
 @login_required
 def api_recent_activity():
     """Get recent prediction activity"""
-    recent = Prediction.query.filter_by(
+    # Plain row tuples: no entity construction and no JSON blobs
+    recent = db.session.query(
+        Prediction.id,
+        Prediction.disease_name,
+        Prediction.prediction_result,
+        Prediction.risk_level,
+        Prediction.created_at
+    ).filter_by(
         user_id=current_user.id
     ).order_by(Prediction.created_at.desc()).limit(10).all()
     
     activity = []
-    for pred in recent:
+    for pred_id, disease_name, result, risk_level, created_at in recent:
         activity.append({
-            'id': pred.id,
-            'disease': pred.disease_name,
-            'result': pred.prediction_result,
-            'risk_level': pred.risk_level,
-            'date': pred.created_at.strftime('%Y-%m-%d %H:%M')
+            'id': pred_id,
+            'disease': disease_name,
+            'result': result,
+            'risk_level': risk_level,
+            'date': created_at.strftime('%Y-%m-%d %H:%M')
         })
     
     return jsonify(activity)
+
+
+@analytics_bp.route('/api/stream')
+@login_required
+def api_stream():
+    """Server-sent events with deltas to the user's analytics as predictions are saved or deleted"""
+    if not live_updates.enabled:
+        return jsonify({'error': 'Live updates are disabled'}), 404
+    
+    subscription = live_updates.subscribe(current_user.id, request.headers.get('Last-Event-ID'))
+    if subscription is None:
+        response = jsonify({'error': 'Too many open streams'})
+        response.headers['Retry-After'] = str(live_updates.retry_ms // 1000)
+        return response, 429
+    
+    # The stream holds no database connection while it waits for events
+    db.session.close()
+    response = Response(live_updates.stream(subscription), mimetype='text/event-stream')
+    # Unsubscribes even when the client leaves before the first frame
+    response.call_on_close(subscription.close)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
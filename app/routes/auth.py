@@ -2,13 +2,18 @@
 Authentication Routes - Login, Register, Logout
 """
 from flask import Blueprint, render_template, redirect, url_for, flash, request
-from flask_login import login_user, logout_user, current_user
+from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash
 from app import db
 from app.models.user import User
+from app.services.user_cache_service import user_cache
+from app.services.password_service import login_throttle, HashingBusyError
+from app.services.deletion_service import DeletionService
 
 auth_bp = Blueprint('auth', __name__)
 
+deletion = DeletionService()
+
 
 @auth_bp.route('/register', methods=['GET', 'POST'])
 def register():
@@ -55,7 +60,11 @@ def register():
             age=int(age) if age else None,
             gender=gender
         )
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except HashingBusyError:
+            flash('The server is busy right now. Please try again in a moment.', 'error')
+            return render_template('auth/register.html'), 503
         
         db.session.add(user)
         db.session.commit()
@@ -81,17 +90,38 @@ def login():
             flash('Please enter both username and password.', 'error')
             return render_template('auth/login.html')
         
+        # Accounts with too many recent failures are refused before any hashing
+        retry_after = login_throttle.retry_after(username)
+        if retry_after:
+            flash(f'Too many failed login attempts. Please try again in {retry_after // 60 + 1} minutes.', 'error')
+            return render_template('auth/login.html'), 429, {'Retry-After': str(retry_after)}
+        
         # Find user
         user = User.query.filter_by(username=username).first()
         
-        if user is None or not user.check_password(password):
+        try:
+            valid = user is not None and user.check_password(password)
+        except HashingBusyError:
+            flash('The server is busy right now. Please try again in a moment.', 'error')
+            return render_template('auth/login.html'), 503
+        
+        if not valid:
+            login_throttle.record_failure(username)
             flash('Invalid username or password.', 'error')
             return render_template('auth/login.html')
         
+        login_throttle.reset(username)
+        
         if not user.is_active:
             flash('Your account has been deactivated. Please contact support.', 'error')
             return render_template('auth/login.html')
         
+        # Upgrade a hash made with old parameters (committed below); retried next login if busy
+        try:
+            user.rehash_password(password)
+        except HashingBusyError:
+            pass
+        
         # Log in the user
         login_user(user, remember=remember)
         user.update_last_login()
@@ -110,6 +140,9 @@ def login():
 @auth_bp.route('/logout')
 def logout():
     """User logout"""
+    if current_user.is_authenticated:
+        user_cache.invalidate(current_user.id)
+    user_cache.clear_session()
     logout_user()
     flash('You have been logged out successfully.', 'info')
     return redirect(url_for('main.index'))
@@ -136,14 +169,47 @@ def update_profile():
     gender = request.form.get('gender')
     phone = request.form.get('phone')
     
-    # Update user details
-    current_user.full_name = full_name
-    current_user.email = email
-    current_user.age = int(age) if age else None
-    current_user.gender = gender
-    current_user.phone = phone
+    # Update user details (current_user is a cached read-only snapshot)
+    user = current_user.get_record()
+    user.full_name = full_name
+    user.email = email
+    user.age = int(age) if age else None
+    user.gender = gender
+    user.phone = phone
     
     db.session.commit()
+    user_cache.clear_session()
     
     flash('Profile updated successfully!', 'success')
     return redirect(url_for('auth.profile'))
+
+
+@auth_bp.route('/delete-account', methods=['POST'])
+@login_required
+def delete_account():
+    """Deactivate the account now and delete it with all predictions in the background"""
+    # Password guesses count against the same per-account limit as logins
+    retry_after = login_throttle.retry_after(current_user.username)
+    if retry_after:
+        flash(f'Too many failed password attempts. Please try again in {retry_after // 60 + 1} minutes.', 'error')
+        return redirect(url_for('auth.profile'))
+    
+    user = current_user.get_record()
+    try:
+        valid = user.check_password(request.form.get('password') or '')
+    except HashingBusyError:
+        flash('The server is busy right now. Please try again in a moment.', 'error')
+        return redirect(url_for('auth.profile'))
+    
+    if not valid:
+        login_throttle.record_failure(user.username)
+        flash('Incorrect password. Your account was not deleted.', 'error')
+        return redirect(url_for('auth.profile'))
+    
+    login_throttle.reset(user.username)
+    deletion.schedule_account_deletion(user.id)
+    user_cache.clear_session()
+    logout_user()
+    
+    flash('Your account has been deleted.', 'info')
+    return redirect(url_for('main.index'))
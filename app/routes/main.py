@@ -6,6 +6,7 @@ from flask_login import login_required, current_user
 from app.models.prediction import Prediction
 from sqlalchemy import func
 from app import db
+from app.utils.decorators import read_only
 
 main_bp = Blueprint('main', __name__)
 
@@ -20,6 +21,7 @@ def index():
 
 @main_bp.route('/dashboard')
 @login_required
+@read_only
 def dashboard():
     """User dashboard with disease selection"""
     from config import Config
@@ -1,15 +1,62 @@
 """
 Prediction Routes - Disease Prediction Forms and Results
 """
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
+import json
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, abort, Response, \
+    stream_with_context
 from flask_login import login_required, current_user
 from app import db
 from app.models.prediction import Prediction
-from app.services.prediction_service import PredictionService
+from app.models.prediction_change import PredictionChange
+from app.services.archive_service import ArchiveService
+from app.services.change_log_service import change_log, InvalidSyncToken, SyncTokenExpired
+from app.services.deletion_service import DeletionService
+from app.services.live_update_service import live_updates
+from app.services.population_stats_service import population_stats
+from app.utils.decorators import read_only
+from app.utils.http_cache import http_cache
+from app.utils.lazy import LazyService, lazy_service
+from app.utils.metrics import metrics
 from config import Config
 
 predictions_bp = Blueprint('predictions', __name__)
-prediction_service = PredictionService()
+
+
+def _create_prediction_service():
+    if Config.INFERENCE_SERVER_ADDRESS:
+        from app.services.inference_server import InferenceClient
+        return InferenceClient(
+            Config.INFERENCE_SERVER_ADDRESS,
+            pool_size=Config.INFERENCE_POOL_SIZE,
+            timeout=Config.INFERENCE_TIMEOUT
+        )
+    from app.services.prediction_service import PredictionService
+    return PredictionService()
+
+
+# Built on first use: model metadata, cohort feature tables and the mapped
+# similarity indexes are not needed to start a worker
+prediction_service = LazyService(_create_prediction_service)
+cohort_index = lazy_service('app.services.cohort_index_service.CohortIndexService')
+similarity_index = lazy_service('app.services.similarity_index_service.SimilarityIndexService')
+archive = ArchiveService()
+deletion = DeletionService(cohort_index, similarity_index, archive)
+
+
+def _model_cache_size(name):
+    # Nothing is cached before the service exists, or in an inference server client
+    if not prediction_service.loaded:
+        return 0
+    return len(getattr(prediction_service.instance, name, ()))
+
+
+# Model cache state of this worker (an inference server keeps its own)
+if not Config.INFERENCE_SERVER_ADDRESS:
+    metrics.gauge('model_cache_models', 'Models loaded in this worker', lambda: _model_cache_size('models'))
+    metrics.gauge('model_cache_decision_tables', 'Decision tables compiled in this worker',
+                  lambda: _model_cache_size('decision_tables'))
+    metrics.gauge('model_cache_explainers', 'Tree explainers built in this worker',
+                  lambda: _model_cache_size('explainers'))
 
 
 @predictions_bp.route('/<disease_type>')
@@ -64,42 +111,206 @@ def api_predict(disease_type):
         )
         
         prediction.set_input_features(features)
+        prediction.set_feature_contributions(result.get('feature_contributions'))
         prediction.generate_report_id()
         
-        db.session.add(prediction)
-        db.session.commit()
+        with metrics.stage('predict.db_commit'):
+            db.session.add(prediction)
+            db.session.flush()
+            cohort_index.index_prediction(prediction)
+            change_log.record(prediction, PredictionChange.CREATED)
+            db.session.commit()
+        with metrics.stage('predict.similarity_index'):
+            similarity_index.add_prediction(prediction)
+        live_updates.prediction_created(prediction)
+        population_stats.prediction_saved()
         
         # Add prediction ID to result
         result['prediction_id'] = prediction.id
         result['report_id'] = prediction.report_id
         
+        with metrics.stage('predict.serialize'):
+            return jsonify(result)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@predictions_bp.route('/api/<disease_type>/sensitivity', methods=['POST'])
+@login_required
+def api_sensitivity(disease_type):
+    """API endpoint for what-if analysis (results are not saved)"""
+    try:
+        if disease_type not in Config.DISEASES:
+            return jsonify({'error': 'Disease not found'}), 404
+        
+        features = request.get_json() if request.is_json else request.form.to_dict()
+        
+        if not features:
+            return jsonify({'error': 'No input features provided'}), 400
+        
+        # ?pairwise=1 perturbs every pair of features, ?pairwise=a,b only the listed ones
+        pairwise = request.args.get('pairwise', '').strip()
+        if pairwise.lower() in ['1', 'true', 'all']:
+            pairwise = True
+        elif pairwise:
+            pairwise = set(pairwise.split(','))
+        else:
+            pairwise = None
+        
+        result = prediction_service.sensitivity(disease_type, features, pairwise=pairwise)
+        
+        if 'error' in result:
+            return jsonify(result), 400
+        
         return jsonify(result)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@predictions_bp.route('/api/<disease_type>/similar/<int:prediction_id>')
+@login_required
+def api_similar(disease_type, prediction_id):
+    """API endpoint for past predictions with the most similar inputs"""
+    owner_id = None if current_user.is_admin else current_user.id
+    query = Prediction.query.filter_by(id=prediction_id, disease_type=disease_type)
+    if owner_id is not None:
+        query = query.filter_by(user_id=owner_id)
+    prediction = query.first() or archive.get_prediction(prediction_id, user_id=owner_id)
+    if prediction is None or prediction.disease_type != disease_type:
+        abort(404)
+    
+    k = max(1, min(request.args.get('k', 10, type=int), 100))
+    
+    # Patients only see their own history; admins may search every user with ?scope=all
+    search_all = current_user.is_admin and request.args.get('scope') == 'all'
+    matches = similarity_index.query(
+        disease_type,
+        prediction.get_input_features(),
+        k=k,
+        user_id=None if search_all else prediction.user_id,
+        exclude_id=prediction.id
+    )
+    
+    # The index may be stale, so the owner check is repeated on the rows themselves
+    query = Prediction.query.filter(Prediction.id.in_([pid for pid, _ in matches]))
+    if not search_all:
+        query = query.filter(Prediction.user_id == prediction.user_id)
+    found = {p.id: p for p in query}
+    archived_ids = [pid for pid, _ in matches if pid not in found]
+    if archived_ids:
+        found.update(
+            (pid, archived) for pid, archived in archive.get_predictions(archived_ids).items()
+            if search_all or archived.user_id == prediction.user_id
+        )
+    similar = []
+    for pid, distance in matches:
+        if pid in found:
+            item = found[pid].to_dict()
+            item['distance'] = round(distance, 4)
+            similar.append(item)
+    
+    return jsonify({'prediction_id': prediction.id, 'similar': similar})
+
+
+@predictions_bp.app_template_global()
+def result_url_template():
+    """URL of the result page with {id} in place of the prediction id, for scripts to fill in"""
+    return url_for('predictions.result', prediction_id=1).rpartition('/')[0] + '/{id}'
+
+
 @predictions_bp.route('/result/<int:prediction_id>')
 @login_required
+@read_only
 def result(prediction_id):
     """Show prediction result"""
     prediction = Prediction.query.filter_by(
         id=prediction_id,
         user_id=current_user.id
-    ).first_or_404()
+    ).first() or archive.get_prediction(prediction_id, user_id=current_user.id)
+    if prediction is None:
+        abort(404)
+    
+    # Only the report state and the explanation (recorded later by `flask explain-predictions`
+    # for predictions saved without one) change after a prediction is saved; the user is
+    # part of the tag for the navbar
+    etag = http_cache.etag(
+        'result', prediction.id, prediction.report_id, prediction.report_generated, prediction.archived,
+        prediction.feature_contributions is not None, current_user.id, current_user.username
+    )
+    return http_cache.respond(etag, lambda: render_template(
+        'predictions/result.html',
+        prediction=prediction,
+        top_contributors=prediction.get_top_contributors(Config.EXPLANATION_TOP_FEATURES)
+    ))
+
+
+@predictions_bp.route('/api/prediction/<int:prediction_id>')
+@login_required
+@read_only
+def api_prediction(prediction_id):
+    """API endpoint for one saved prediction"""
+    prediction = Prediction.query.filter_by(
+        id=prediction_id,
+        user_id=current_user.id
+    ).first() or archive.get_prediction(prediction_id, user_id=current_user.id)
+    if prediction is None:
+        abort(404)
+    
+    # to_dict() holds nothing that changes once the prediction is saved
+    return http_cache.respond(
+        http_cache.etag('prediction', prediction.id, prediction.report_id),
+        lambda: jsonify(prediction.to_dict()),
+        last_modified=prediction.created_at,
+        max_age=Config.PREDICTION_CACHE_MAX_AGE
+    )
+
+
+@predictions_bp.route('/api/sync')
+@login_required
+@read_only
+def api_sync():
+    """API endpoint for the changes to the user's predictions since a sync token"""
+    limit = max(1, min(request.args.get('limit', Config.SYNC_PAGE_SIZE, type=int), Config.SYNC_MAX_PAGE_SIZE))
+    user_id = current_user.id
+    try:
+        changes, token, has_more = change_log.sync(user_id, request.args.get('since'), limit)
+    except InvalidSyncToken as e:
+        return jsonify({'error': str(e)}), 400
+    except SyncTokenExpired as e:
+        return jsonify({'error': str(e), 'resync': True}), 410
+    
+    ndjson = request.args.get('format') == 'ndjson' or \
+        request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+    if not ndjson:
+        return http_cache.private(jsonify({'changes': changes, 'sync_token': token, 'has_more': has_more}))
+    
+    # One change per line for every page, then the token to continue from
+    def lines(changes, token, has_more):
+        while True:
+            for change in changes:
+                yield json.dumps(change) + '\n'
+            if not has_more:
+                break
+            changes, token, has_more = change_log.sync(user_id, token, limit)
+        yield json.dumps({'sync_token': token, 'has_more': False}) + '\n'
     
-    return render_template('predictions/result.html', prediction=prediction)
+    response = Response(stream_with_context(lines(changes, token, has_more)), mimetype='application/x-ndjson')
+    return http_cache.private(response)
 
 
 @predictions_bp.route('/history')
 @login_required
+@read_only
 def history():
     """Show prediction history"""
     page = request.args.get('page', 1, type=int)
     disease_filter = request.args.get('disease', None)
     risk_filter = request.args.get('risk', None)
+    include_archived = request.args.get('archived', type=int) == 1
     
-    query = Prediction.query.filter_by(user_id=current_user.id)
+    query = Prediction.query.options(Prediction.list_options()).filter_by(user_id=current_user.id)
     
     if disease_filter:
         query = query.filter_by(disease_type=disease_filter)
@@ -107,11 +318,19 @@ def history():
     if risk_filter:
         query = query.filter_by(risk_level=risk_filter)
     
-    predictions = query.order_by(Prediction.created_at.desc()).paginate(
-        page=page,
-        per_page=Config.PREDICTIONS_PER_PAGE,
-        error_out=False
-    )
+    query = query.order_by(Prediction.created_at.desc())
+    if include_archived:
+        # Archived predictions are all older than the hot ones, so they follow them
+        predictions = archive.paginate(
+            query, current_user.id, page, Config.PREDICTIONS_PER_PAGE,
+            disease_type=disease_filter, risk_level=risk_filter
+        )
+    else:
+        predictions = query.paginate(
+            page=page,
+            per_page=Config.PREDICTIONS_PER_PAGE,
+            error_out=False
+        )
     
     return render_template(
         'predictions/history.html',
@@ -124,13 +343,22 @@ def history():
 @login_required
 def delete_prediction(prediction_id):
     """Delete a prediction"""
-    prediction = Prediction.query.filter_by(
-        id=prediction_id,
-        user_id=current_user.id
-    ).first_or_404()
-    
-    db.session.delete(prediction)
-    db.session.commit()
+    if not deletion.delete_predictions(current_user.id, [prediction_id]):
+        abort(404)
     
     flash('Prediction deleted successfully.', 'success')
     return redirect(url_for('predictions.history'))
+
+
+@predictions_bp.route('/delete', methods=['POST'])
+@login_required
+def delete_predictions():
+    """Delete the predictions selected in the history view"""
+    prediction_ids = [int(pid) for pid in request.form.getlist('prediction_ids') if pid.isdigit()]
+    if not prediction_ids:
+        flash('No predictions selected.', 'warning')
+        return redirect(url_for('predictions.history'))
+    
+    deleted = deletion.delete_predictions(current_user.id, prediction_ids)
+    flash(f'{deleted} prediction{"s" if deleted != 1 else ""} deleted.', 'success')
+    return redirect(url_for('predictions.history'))
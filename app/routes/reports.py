@@ -4,11 +4,32 @@ Reports Routes - PDF Generation and Download
 from flask import Blueprint, send_file, flash, redirect, url_for, jsonify
 from flask_login import login_required, current_user
 from app.models.prediction import Prediction
-from app.services.pdf_service import PDFService
+from app.services.report_storage_service import report_storage
+from app.utils.http_cache import http_cache
+from app.utils.lazy import lazy_service
+from config import Config
 import os
 
 reports_bp = Blueprint('reports', __name__)
-pdf_service = PDFService()
+
+# reportlab is imported with the service, on the first report generated
+pdf_service = lazy_service('app.services.pdf_service.PDFService')
+
+
+def _send_report(prediction):
+    """The report file of a prediction, with validators, Range support and a private cache lifetime"""
+    response = send_file(
+        prediction.report_path,
+        as_attachment=True,
+        download_name=f"report_{prediction.report_id}.pdf",
+        mimetype='application/pdf',
+        max_age=Config.REPORT_CACHE_MAX_AGE
+    )
+    return http_cache.private(response, Config.REPORT_CACHE_MAX_AGE)
+
+
+def _report_exists(prediction):
+    return bool(prediction.report_generated and prediction.report_path and os.path.exists(prediction.report_path))
 
 
 @reports_bp.route('/generate/<int:prediction_id>')
@@ -21,21 +42,20 @@ def generate_report(prediction_id):
             user_id=current_user.id
         ).first_or_404()
         
+        # A prediction never changes, so neither does a report already written for it
+        if _report_exists(prediction):
+            report_storage.touch(prediction)
+            return _send_report(prediction)
+        
         # Generate PDF
         pdf_path = pdf_service.generate_report(prediction, current_user)
         
-        # Update prediction record
-        prediction.report_generated = True
-        prediction.report_path = pdf_path
+        # Update prediction record and track the file for sweeping
+        report_storage.register(prediction, pdf_path)
         from app import db
         db.session.commit()
         
-        return send_file(
-            pdf_path,
-            as_attachment=True,
-            download_name=f"report_{prediction.report_id}.pdf",
-            mimetype='application/pdf'
-        )
+        return _send_report(prediction)
     
     except Exception as e:
         flash(f'Error generating report: {str(e)}', 'error')
@@ -60,12 +80,8 @@ def download_report(prediction_id):
             flash('Report file not found. Generating new report...', 'info')
             return redirect(url_for('reports.generate_report', prediction_id=prediction_id))
         
-        return send_file(
-            prediction.report_path,
-            as_attachment=True,
-            download_name=f"report_{prediction.report_id}.pdf",
-            mimetype='application/pdf'
-        )
+        report_storage.touch(prediction)
+        return _send_report(prediction)
     
     except Exception as e:
         flash(f'Error downloading report: {str(e)}', 'error')
@@ -1,7 +1,19 @@
 """
 Services Package Initialization
+Services are imported on first access, so importing one service module does
+not pull in the others (and reportlab with PDFService)
 """
-from app.services.prediction_service import PredictionService
-from app.services.pdf_service import PDFService
+import importlib
+
+_SERVICES = {
+    'PredictionService': 'app.services.prediction_service',
+    'PDFService': 'app.services.pdf_service'
+}
 
 __all__ = ['PredictionService', 'PDFService']
+
+
+def __getattr__(name):
+    if name in _SERVICES:
+        return getattr(importlib.import_module(_SERVICES[name]), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
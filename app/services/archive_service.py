@@ -0,0 +1,330 @@
+"""
+Archive Service - Per-Month Cold Storage for Old Predictions
+Predictions older than ARCHIVE_AFTER_DAYS are moved out of the predictions
+table into one SQLite file per month, with their JSON columns zlib-compressed,
+so the hot table and its indexes only hold recent history. Archived
+predictions keep their ids and stay in the cohort and similarity indexes
+until those are rebuilt from the table; views that ask for them get
+read-only Prediction objects.
+Only predictions already folded into the daily rollups are archived
+"""
+import glob
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask_sqlalchemy.pagination import Pagination
+from app import db
+from app.models.prediction import Prediction
+from config import Config
+
+
+# Columns compressed in the archive
+COMPRESSED_COLUMNS = ('input_features', 'feature_contributions', 'notes')
+
+FILE_PATTERN = re.compile(r'predictions-(\d{4})-(\d{2})\.sqlite3$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    disease_type TEXT NOT NULL,
+    disease_name TEXT NOT NULL,
+    prediction_result TEXT NOT NULL,
+    risk_level TEXT,
+    confidence_score REAL,
+    risk_percentage REAL,
+    input_features BLOB,
+    model_name TEXT,
+    model_version TEXT,
+    model_accuracy REAL,
+    feature_contributions BLOB,
+    report_id TEXT,
+    report_generated INTEGER,
+    report_path TEXT,
+    created_at TEXT,
+    notes BLOB
+);
+CREATE INDEX IF NOT EXISTS ix_predictions_user_created ON predictions (user_id, created_at);
+"""
+
+COLUMNS = [column.name for column in Prediction.__table__.columns]
+
+
+class ArchivePagination(Pagination):
+    """Pagination over a user's hot predictions followed by their archived ones"""
+
+    def _query_items(self):
+        args = self._query_args
+        hot_total = self._hot_total()
+        items = []
+        if self._query_offset < hot_total:
+            items = args['query'].offset(self._query_offset).limit(self.per_page).all()
+        remaining = self.per_page - len(items)
+        if remaining > 0:
+            items += args['archive'].user_predictions(
+                args['user_id'], offset=max(self._query_offset - hot_total, 0), limit=remaining, **args['filters']
+            )
+        return items
+
+    def _hot_total(self):
+        if 'hot_total' not in self._query_args:
+            self._query_args['hot_total'] = self._query_args['query'].order_by(None).count()
+        return self._query_args['hot_total']
+
+    def _query_count(self):
+        args = self._query_args
+        return self._hot_total() + args['archive'].count_user_predictions(args['user_id'], **args['filters'])
+
+
+class ArchiveService:
+    """Service for moving old predictions to monthly archive files and reading them back"""
+
+    def __init__(self, archive_path=None, batch_size=5000):
+        self._archive_path = archive_path
+        self.batch_size = batch_size
+        self.id_ranges = {}
+        self.lock = threading.Lock()
+
+    @property
+    def archive_path(self):
+        """The directory given to the service, or ARCHIVE_PATH as currently configured"""
+        return self._archive_path or Config.ARCHIVE_PATH
+
+    def _path(self, year, month):
+        return os.path.join(self.archive_path, f'predictions-{year:04d}-{month:02d}.sqlite3')
+
+    def _connect(self, path):
+        connection = sqlite3.connect(path)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def files(self):
+        """Archive files, newest month first"""
+        paths = [p for p in glob.glob(os.path.join(self.archive_path, 'predictions-*.sqlite3'))
+                 if FILE_PATTERN.search(p)]
+        return sorted(paths, reverse=True)
+
+    def _encode(self, row):
+        values = []
+        for column in COLUMNS:
+            value = getattr(row, column)
+            if column in COMPRESSED_COLUMNS and value is not None:
+                value = zlib.compress(value.encode())
+            elif column == 'created_at' and value is not None:
+                value = value.isoformat(sep=' ')
+            values.append(value)
+        return values
+
+    def _decode(self, row):
+        """Rebuild a read-only, detached Prediction from an archive row"""
+        fields = dict(row)
+        for column in COMPRESSED_COLUMNS:
+            if fields[column] is not None:
+                fields[column] = zlib.decompress(fields[column]).decode()
+        if fields['created_at']:
+            fields['created_at'] = datetime.fromisoformat(fields['created_at'])
+        fields['report_generated'] = bool(fields['report_generated'])
+        prediction = Prediction(**fields)
+        prediction.archived = True
+        return prediction
+
+    def archive(self, older_than_days=None):
+        """Move predictions older than the cutoff into their monthly files; returns counts per month"""
+        days = older_than_days if older_than_days is not None else Config.ARCHIVE_AFTER_DAYS
+        cutoff = datetime.utcnow() - timedelta(days=days)
+
+        # Rollups are built from the predictions table, so fold everything first
+        from app.services.population_stats_service import population_stats
+        population_stats.compact()
+        watermark = population_stats.get_watermark()
+
+        os.makedirs(self.archive_path, exist_ok=True)
+        moved = defaultdict(int)
+        while True:
+            rows = Prediction.query.filter(
+                Prediction.created_at < cutoff,
+                Prediction.id <= watermark
+            ).order_by(Prediction.id).limit(self.batch_size).all()
+            if not rows:
+                break
+
+            by_month = defaultdict(list)
+            for row in rows:
+                by_month[(row.created_at.year, row.created_at.month)].append(self._encode(row))
+
+            # Write and commit the archive copies first; INSERT OR REPLACE makes a rerun
+            # after a crash between the two steps harmless
+            placeholders = ', '.join('?' * len(COLUMNS))
+            for (year, month), values in by_month.items():
+                connection = self._connect(self._path(year, month))
+                try:
+                    connection.executescript(SCHEMA)
+                    connection.executemany(
+                        f'INSERT OR REPLACE INTO predictions ({", ".join(COLUMNS)}) VALUES ({placeholders})',
+                        values
+                    )
+                    connection.commit()
+                finally:
+                    connection.close()
+                moved[f'{year:04d}-{month:02d}'] += len(values)
+
+            Prediction.query.filter(Prediction.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+            db.session.commit()
+
+        with self.lock:
+            self.id_ranges.clear()
+        return dict(moved)
+
+    def _where(self, user_id, disease_type=None, risk_level=None):
+        clauses, params = ['user_id = ?'], [user_id]
+        if disease_type:
+            clauses.append('disease_type = ?')
+            params.append(disease_type)
+        if risk_level:
+            clauses.append('risk_level = ?')
+            params.append(risk_level)
+        return ' AND '.join(clauses), params
+
+    def count_user_predictions(self, user_id, disease_type=None, risk_level=None):
+        """Number of archived predictions of a user"""
+        where, params = self._where(user_id, disease_type, risk_level)
+        total = 0
+        for path in self.files():
+            connection = self._connect(path)
+            try:
+                total += connection.execute(f'SELECT count(*) FROM predictions WHERE {where}', params).fetchone()[0]
+            finally:
+                connection.close()
+        return total
+
+    def user_predictions(self, user_id, offset=0, limit=None, disease_type=None, risk_level=None):
+        """A user's archived predictions, newest first"""
+        where, params = self._where(user_id, disease_type, risk_level)
+        predictions = []
+        for path in self.files():
+            if limit is not None and len(predictions) >= limit:
+                break
+            connection = self._connect(path)
+            try:
+                count = connection.execute(f'SELECT count(*) FROM predictions WHERE {where}', params).fetchone()[0]
+                if offset >= count:
+                    offset -= count
+                    continue
+                wanted = -1 if limit is None else limit - len(predictions)
+                rows = connection.execute(
+                    f'SELECT * FROM predictions WHERE {where} ORDER BY created_at DESC LIMIT ? OFFSET ?',
+                    params + [wanted, offset]
+                ).fetchall()
+                offset = 0
+            finally:
+                connection.close()
+            predictions.extend(self._decode(row) for row in rows)
+        return predictions
+
+    def user_predictions_after(self, user_id, after_id=0, limit=100):
+        """A user's archived predictions with ids above after_id, in id order"""
+        predictions = []
+        for path in self.files():
+            low, high = self._id_range(path)
+            if high is None or high <= after_id:
+                continue
+            connection = self._connect(path)
+            try:
+                rows = connection.execute(
+                    'SELECT * FROM predictions WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?',
+                    (user_id, after_id, limit)
+                ).fetchall()
+            finally:
+                connection.close()
+            predictions.extend(self._decode(row) for row in rows)
+        predictions.sort(key=lambda prediction: prediction.id)
+        return predictions[:limit]
+
+    def _id_range(self, path):
+        mtime = os.path.getmtime(path)
+        with self.lock:
+            cached = self.id_ranges.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        connection = self._connect(path)
+        try:
+            id_range = tuple(connection.execute('SELECT min(id), max(id) FROM predictions').fetchone())
+        finally:
+            connection.close()
+        with self.lock:
+            self.id_ranges[path] = (mtime, id_range)
+        return id_range
+
+    def get_predictions(self, prediction_ids):
+        """Archived predictions by id, opening only the files whose id range covers them"""
+        remaining = set(prediction_ids)
+        found = {}
+        for path in self.files():
+            if not remaining:
+                break
+            low, high = self._id_range(path)
+            wanted = [pid for pid in remaining if low is not None and low <= pid <= high]
+            if not wanted:
+                continue
+            connection = self._connect(path)
+            try:
+                rows = connection.execute(
+                    f'SELECT * FROM predictions WHERE id IN ({", ".join("?" * len(wanted))})', wanted
+                ).fetchall()
+            finally:
+                connection.close()
+            for row in rows:
+                found[row['id']] = self._decode(row)
+            remaining -= set(found)
+        return found
+
+    def get_prediction(self, prediction_id, user_id=None):
+        """One archived prediction, optionally restricted to its owner"""
+        prediction = self.get_predictions([prediction_id]).get(prediction_id)
+        if prediction is None or (user_id is not None and prediction.user_id != user_id):
+            return None
+        return prediction
+
+    def delete_user_predictions(self, user_id):
+        """Delete a user's archived predictions, returning them as read-only objects"""
+        deleted = []
+        for path in self.files():
+            connection = self._connect(path)
+            try:
+                rows = connection.execute('SELECT * FROM predictions WHERE user_id = ?', (user_id,)).fetchall()
+                if rows:
+                    connection.execute('DELETE FROM predictions WHERE user_id = ?', (user_id,))
+                    connection.commit()
+            finally:
+                connection.close()
+            deleted.extend(self._decode(row) for row in rows)
+        return deleted
+
+    def paginate(self, query, user_id, page, per_page, disease_type=None, risk_level=None):
+        """Paginate a user's hot prediction query followed by their archived predictions"""
+        return ArchivePagination(
+            page=page,
+            per_page=per_page,
+            error_out=False,
+            archive=self,
+            query=query,
+            user_id=user_id,
+            filters={'disease_type': disease_type, 'risk_level': risk_level}
+        )
+
+    def stats(self):
+        """Months archived and rows per month"""
+        months = []
+        for path in self.files():
+            year, month = FILE_PATTERN.search(path).groups()
+            connection = self._connect(path)
+            try:
+                count = connection.execute('SELECT count(*) FROM predictions').fetchone()[0]
+            finally:
+                connection.close()
+            months.append({'month': f'{year}-{month}', 'predictions': count, 'bytes': os.path.getsize(path)})
+        return {'months': months}
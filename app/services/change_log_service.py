@@ -0,0 +1,159 @@
+"""
+Change Log Service - Incremental Sync of a User's Prediction History
+Every write that changes what a client mirrors (a new prediction, a deletion,
+a report generated or evicted) appends a row to prediction_changes in the
+same transaction. Row ids only grow, so a client that keeps the id of the
+last change it applied can ask for everything after it instead of fetching
+its whole history again. The id travels in an opaque, signed sync token.
+A first sync (no token) pages through the full history, hot and archived,
+in id order, after noting the newest change id so that nothing written
+meanwhile is missed. Changes older than SYNC_RETENTION_DAYS are pruned;
+tokens older than that are refused and the client starts over
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import func, insert, literal, select
+from app import db
+from app.models.prediction import Prediction
+from app.models.prediction_change import PredictionChange
+from app.services.archive_service import ArchiveService
+from config import Config
+
+
+# Tokens carry their issue time in whole seconds since this (naive UTC, like created_at)
+EPOCH = datetime(1970, 1, 1)
+
+
+class InvalidSyncToken(Exception):
+    """The sync token was tampered with or belongs to another user"""
+
+
+class SyncTokenExpired(Exception):
+    """Changes after the sync token may have been pruned; a full sync is needed"""
+
+
+class ChangeLogService:
+    """Service for recording prediction changes and serving them as sync pages"""
+
+    def __init__(self, archive=None, retention_days=None):
+        self.archive = archive or ArchiveService()
+        self.retention_days = retention_days or Config.SYNC_RETENTION_DAYS
+
+    def record(self, prediction, kind):
+        """Log a change to one prediction, committed by the caller with the change itself"""
+        db.session.add(PredictionChange(user_id=prediction.user_id, prediction_id=prediction.id, kind=kind))
+
+    def record_rows(self, rows, kind):
+        """Log a change to many predictions, given rows with id and user_id"""
+        if not rows:
+            return
+        now = datetime.utcnow()
+        db.session.execute(insert(PredictionChange), [
+            {'user_id': row.user_id, 'prediction_id': row.id, 'kind': kind, 'created_at': now} for row in rows
+        ])
+
+    def record_ids(self, prediction_ids, kind):
+        """Log a change to the existing predictions among prediction_ids, looking up their owners in SQL"""
+        if not prediction_ids:
+            return
+        owners = select(Prediction.user_id, Prediction.id, literal(kind), literal(datetime.utcnow())).where(
+            Prediction.id.in_(prediction_ids)
+        )
+        db.session.execute(insert(PredictionChange).from_select(
+            ['user_id', 'prediction_id', 'kind', 'created_at'], owners
+        ))
+
+    def prune(self, older_than_days=None):
+        """Delete changes past retention; returns how many were removed"""
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days or self.retention_days)
+        removed = PredictionChange.query.filter(PredictionChange.created_at < cutoff).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+        return removed
+
+    def _serializer(self):
+        return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='prediction-sync')
+
+    def _dump(self, user_id, cursor, after_id, issued):
+        issued = int((issued - EPOCH).total_seconds())
+        return self._serializer().dumps({'u': user_id, 'c': cursor, 'a': after_id, 't': issued})
+
+    def _load(self, token, user_id):
+        try:
+            state = self._serializer().loads(token)
+        except BadSignature:
+            raise InvalidSyncToken('Invalid sync token')
+        if state.get('u') != user_id:
+            raise InvalidSyncToken('Invalid sync token')
+        issued = EPOCH + timedelta(seconds=state['t'])
+        if issued < datetime.utcnow() - timedelta(days=self.retention_days):
+            raise SyncTokenExpired('Sync token expired, a full sync is required')
+        return state['c'], state['a'], issued
+
+    def sync(self, user_id, token=None, limit=500):
+        """One page of a user's changes since token: (items, next token, has_more)"""
+        if token:
+            cursor, after_id, issued = self._load(token, user_id)
+        else:
+            # Anything committed from here on is replayed from the log after the snapshot
+            cursor = db.session.query(func.max(PredictionChange.id)).scalar() or 0
+            after_id, issued = 0, datetime.utcnow()
+
+        if after_id is not None:
+            return self._snapshot_page(user_id, cursor, after_id, issued, limit)
+        return self._changes_page(user_id, cursor, limit)
+
+    def _snapshot_page(self, user_id, cursor, after_id, issued, limit):
+        live = Prediction.query.filter(Prediction.user_id == user_id, Prediction.id > after_id) \
+            .order_by(Prediction.id).limit(limit + 1).all()
+        archived = self.archive.user_predictions_after(user_id, after_id, limit + 1)
+        predictions = sorted({p.id: p for p in archived + live}.values(), key=lambda p: p.id)
+
+        page = predictions[:limit]
+        has_more = len(predictions) > limit
+        # The snapshot keeps the time it started: that is when its cursor was read
+        token = self._dump(user_id, cursor, page[-1].id if has_more else None, issued)
+        return [_upsert(prediction) for prediction in page], token, has_more
+
+    def _changes_page(self, user_id, cursor, limit):
+        changes = PredictionChange.query.filter(PredictionChange.user_id == user_id, PredictionChange.id > cursor) \
+            .order_by(PredictionChange.id).limit(limit + 1).all()
+        page = changes[:limit]
+        has_more = len(changes) > limit
+
+        # Only the last change to each prediction matters, in the order of that change
+        latest = {}
+        for change in page:
+            latest.pop(change.prediction_id, None)
+            latest[change.prediction_id] = change.kind
+        wanted = [pid for pid, kind in latest.items() if kind != PredictionChange.DELETED]
+        found = {p.id: p for p in Prediction.query.filter(Prediction.user_id == user_id, Prediction.id.in_(wanted))}
+        missing = [pid for pid in wanted if pid not in found]
+        if missing:
+            found.update((pid, p) for pid, p in self.archive.get_predictions(missing).items() if p.user_id == user_id)
+
+        # A prediction missing here was deleted by a change on a later page
+        items = [_upsert(found[pid]) if pid in found else _tombstone(pid) for pid in latest]
+
+        # A caught-up token is as old as this request; otherwise as old as the
+        # last change applied, so the changes after it outlive the token
+        if page:
+            cursor = page[-1].id
+        issued = page[-1].created_at if has_more else datetime.utcnow()
+        return items, self._dump(user_id, cursor, None, issued), has_more
+
+
+def _upsert(prediction):
+    data = prediction.to_dict()
+    data['report_generated'] = bool(prediction.report_generated)
+    data['archived'] = prediction.archived
+    return {'op': 'upsert', 'prediction': data}
+
+
+def _tombstone(prediction_id):
+    return {'op': 'delete', 'id': prediction_id}
+
+
+change_log = ChangeLogService()
@@ -0,0 +1,231 @@
+"""
+Cohort Index Service - Bitmap Indexes over Recorded Symptom Answers
+Every binary or ordinal feature value of a prediction sets one bit in a
+per-disease, per-feature, per-value bitmap, so cohort questions such as
+"high-risk stroke predictions with smoking=1 and high_bp=1" are answered
+with bitwise AND/OR instead of decoding every stored input_features blob.
+Updates lock the bitmap rows they change (SELECT ... FOR UPDATE, after
+creating missing ones with INSERT ... ON CONFLICT DO NOTHING) before reading
+them, so workers indexing at the same time never overwrite each other's
+bits while updates of other diseases and values go ahead. SQLite has no row
+locks; there its one write lock is taken before the reads instead
+"""
+import json
+import zlib
+from collections import defaultdict
+import numpy as np
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models.prediction import Prediction
+from app.models.cohort_bitmap import CohortBitmap
+from app.services.prediction_service import PredictionService
+from app.utils.database import lock_table
+
+
+# Prediction outcomes are indexed alongside the symptoms
+OUTCOME_VALUES = {
+    'risk_level': {'Low': 0, 'Medium': 1, 'High': 2},
+    'prediction_result': {'Negative': 0, 'Positive': 1}
+}
+
+
+class CohortIndexService:
+    """Service for maintaining and querying cohort bitmap indexes"""
+
+    OUTCOME_VALUES = OUTCOME_VALUES
+
+    def __init__(self, max_values=11, batch_size=5000):
+        self.batch_size = batch_size
+
+        # Only features with a small set of answers are indexed (not age, height, weight...)
+        feature_ranges = PredictionService().feature_ranges
+        self.indexed_features = {
+            disease_type: {
+                feature: (low, high)
+                for feature, (low, high) in ranges.items()
+                if high - low + 1 <= max_values
+            }
+            for disease_type, ranges in feature_ranges.items()
+        }
+
+    def parse_value(self, disease_type, feature, value):
+        """Convert a raw answer to its indexed integer value, or None if it is not indexable"""
+        if feature in OUTCOME_VALUES:
+            return OUTCOME_VALUES[feature].get(value)
+
+        low, high = self.indexed_features.get(disease_type, {}).get(feature, (None, None))
+        if low is None:
+            return None
+        try:
+            number = float(value)
+        except (ValueError, TypeError):
+            return None
+        if not low <= number <= high or number != int(number):
+            return None
+        return int(number)
+
+    def _encode(self, disease_type, risk_level, prediction_result, input_features):
+        """List the (feature, value) pairs a prediction contributes to the index"""
+        pairs = []
+        features = json.loads(input_features) if input_features else {}
+        for feature in self.indexed_features.get(disease_type, {}):
+            value = self.parse_value(disease_type, feature, features.get(feature))
+            if value is not None:
+                pairs.append((feature, value))
+        for feature, raw in (('risk_level', risk_level), ('prediction_result', prediction_result)):
+            value = self.parse_value(disease_type, feature, raw)
+            if value is not None:
+                pairs.append((feature, value))
+        return pairs
+
+    def _update(self, predictions, set_bit):
+        """Set or clear the bits of several predictions, rewriting each bitmap row once"""
+        groups = defaultdict(list)
+        for prediction in predictions:
+            chunk, offset = divmod(prediction.id, CohortBitmap.CHUNK_BITS)
+            pairs = self._encode(
+                prediction.disease_type, prediction.risk_level,
+                prediction.prediction_result, prediction.input_features
+            )
+            if pairs:
+                groups[(prediction.disease_type, chunk)].append((offset, pairs))
+
+        # The bitmaps are read, changed and written back whole, so concurrent updates
+        # of the same rows would lose each other's bits; SQLite ignores FOR UPDATE
+        dialect = db.session.get_bind(mapper=CohortBitmap.__mapper__).dialect.name
+        if groups and dialect == 'sqlite':
+            lock_table(db.session, CohortBitmap)
+
+        for (disease_type, chunk), items in sorted(groups.items()):
+            keys = sorted({key for _, pairs in items for key in pairs})
+            if set_bit and dialect in ('sqlite', 'postgresql'):
+                self._insert_missing(dialect, disease_type, chunk, keys)
+            existing = {(row.feature, row.value): row for row in self._locked_rows(disease_type, chunk, keys)}
+
+            changed = {}
+            for offset, pairs in items:
+                for key in pairs:
+                    if key not in changed:
+                        row = existing.get(key)
+                        if row is None:
+                            if not set_bit:
+                                continue
+                            row = CohortBitmap(disease_type=disease_type, feature=key[0], value=key[1], chunk=chunk)
+                            db.session.add(row)
+                            changed[key] = (row, CohortBitmap.empty_bits())
+                        else:
+                            changed[key] = (row, row.get_bits())
+                    bits = changed[key][1]
+                    if set_bit:
+                        bits[offset >> 3] |= np.uint8(1 << (offset & 7))
+                    else:
+                        bits[offset >> 3] &= np.uint8(~(1 << (offset & 7)) & 0xFF)
+
+            for row, bits in changed.values():
+                row.set_bits(bits)
+
+    def _insert_missing(self, dialect, disease_type, chunk, keys):
+        """Create empty bitmap rows for keys without one; a row another worker is creating is left to it"""
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        empty = zlib.compress(CohortBitmap.empty_bits().tobytes())
+        db.session.execute(insert(CohortBitmap).values([
+            {'disease_type': disease_type, 'feature': feature, 'value': value, 'chunk': chunk, 'bitmap': empty}
+            for feature, value in keys
+        ]).on_conflict_do_nothing())
+
+    def _locked_rows(self, disease_type, chunk, keys):
+        """The bitmap rows of the given (feature, value) keys, locked in a fixed order so updates cannot deadlock"""
+        return CohortBitmap.query.filter(
+            CohortBitmap.disease_type == disease_type,
+            CohortBitmap.chunk == chunk,
+            tuple_(CohortBitmap.feature, CohortBitmap.value).in_(keys)
+        ).order_by(CohortBitmap.feature, CohortBitmap.value).with_for_update().populate_existing()
+
+    def index_prediction(self, prediction):
+        """Add a flushed prediction to the index (commit with the prediction)"""
+        self._update([prediction], set_bit=True)
+
+    def unindex_prediction(self, prediction):
+        """Remove a prediction from the index (commit with the deletion)"""
+        self._update([prediction], set_bit=False)
+
+    def unindex_predictions(self, predictions):
+        """Remove many predictions, e.g. rows with id, disease_type, risk_level,
+        prediction_result and input_features (commit with the deletion)"""
+        self._update(predictions, set_bit=False)
+
+    def rebuild(self):
+        """Recreate the whole index from the stored predictions"""
+        CohortBitmap.query.delete()
+        bitmaps = defaultdict(CohortBitmap.empty_bits)
+        last_id = 0
+        indexed = 0
+
+        while True:
+            rows = db.session.query(
+                Prediction.id,
+                Prediction.disease_type,
+                Prediction.risk_level,
+                Prediction.prediction_result,
+                Prediction.input_features
+            ).filter(Prediction.id > last_id).order_by(Prediction.id).limit(self.batch_size).all()
+            if not rows:
+                break
+
+            for row in rows:
+                chunk, offset = divmod(row.id, CohortBitmap.CHUNK_BITS)
+                for feature, value in self._encode(row.disease_type, row.risk_level,
+                                                   row.prediction_result, row.input_features):
+                    bitmaps[(row.disease_type, feature, value, chunk)][offset >> 3] |= np.uint8(1 << (offset & 7))
+            indexed += len(rows)
+            last_id = rows[-1].id
+
+        for (disease_type, feature, value, chunk), bits in bitmaps.items():
+            row = CohortBitmap(disease_type=disease_type, feature=feature, value=value, chunk=chunk)
+            row.set_bits(bits)
+            db.session.add(row)
+        db.session.commit()
+        return indexed
+
+    def query(self, disease_type, conditions, page=1, per_page=50):
+        """Find predictions matching every condition; a condition is feature -> list of accepted values"""
+        rows = CohortBitmap.query.filter(
+            CohortBitmap.disease_type == disease_type,
+            CohortBitmap.feature.in_(list(conditions)),
+            CohortBitmap.value.in_(set().union(*conditions.values()))
+        ).all()
+
+        # OR together the accepted values of each feature, per chunk
+        per_feature = {feature: {} for feature in conditions}
+        for row in rows:
+            if row.value not in conditions[row.feature]:
+                continue
+            chunks = per_feature[row.feature]
+            if row.chunk in chunks:
+                chunks[row.chunk] |= row.get_bits()
+            else:
+                chunks[row.chunk] = row.get_bits()
+
+        # AND across features, only over chunks present for every feature
+        common_chunks = set.intersection(*(set(chunks) for chunks in per_feature.values()))
+        ids = []
+        count = 0
+        for chunk in sorted(common_chunks, reverse=True):
+            bits = None
+            for chunks in per_feature.values():
+                bits = chunks[chunk] if bits is None else bits & chunks[chunk]
+            offsets = np.flatnonzero(np.unpackbits(bits, bitorder='little'))
+            count += offsets.size
+            ids.append(offsets[::-1] + chunk * CohortBitmap.CHUNK_BITS)
+
+        # Newest predictions first
+        ids = np.concatenate(ids) if ids else np.array([], dtype=np.int64)
+        start = (page - 1) * per_page
+        return {
+            'count': count,
+            'page': page,
+            'per_page': per_page,
+            'pages': (count + per_page - 1) // per_page,
+            'prediction_ids': [int(i) for i in ids[start:start + per_page]]
+        }
@@ -0,0 +1,66 @@
+"""
+Decision Table - Precomputed Model Output for Small Symptom Spaces
+Enumerates every combination of a disease's discrete inputs once so that
+predictions become a single array lookup instead of a forest traversal
+"""
+import numpy as np
+
+
+class DecisionTable:
+    """Model probabilities for every point of a discrete input space"""
+
+    def __init__(self, lows, highs, classes, probabilities):
+        self.lows = [int(low) for low in lows]
+        self.highs = [int(high) for high in highs]
+        self.classes = classes
+        self.probabilities = probabilities
+
+        # Row-major strides: the last feature varies fastest
+        self.strides = []
+        stride = 1
+        for low, high in reversed(list(zip(self.lows, self.highs))):
+            self.strides.insert(0, stride)
+            stride *= high - low + 1
+
+    @staticmethod
+    def domain_size(ranges):
+        """Number of input combinations spanned by a list of (min, max) ranges"""
+        size = 1
+        for low, high in ranges:
+            size *= int(high) - int(low) + 1
+        return size
+
+    @classmethod
+    def compile(cls, model, ranges, chunk_size=65536):
+        """Score every combination of the given (min, max) ranges with the model"""
+        lows = np.array([low for low, _ in ranges], dtype=np.int64)
+        sizes = tuple(int(high) - int(low) + 1 for low, high in ranges)
+        total = cls.domain_size(ranges)
+
+        probabilities = np.empty((total, len(model.classes_)), dtype=np.float64)
+        for start in range(0, total, chunk_size):
+            stop = min(start + chunk_size, total)
+            columns = np.unravel_index(np.arange(start, stop), sizes)
+            X = (np.column_stack(columns) + lows).astype(np.float64)
+            probabilities[start:stop] = model.predict_proba(X)
+
+        return cls(
+            lows=[low for low, _ in ranges],
+            highs=[high for _, high in ranges],
+            classes=model.classes_,
+            probabilities=probabilities
+        )
+
+    def lookup(self, feature_values):
+        """Return precomputed probabilities, or None if the input is out of domain"""
+        index = 0
+        for value, low, high, stride in zip(feature_values, self.lows, self.highs, self.strides):
+            if not low <= value <= high or value != int(value):
+                return None
+            index += (int(value) - low) * stride
+        return self.probabilities[index]
+
+    @property
+    def size(self):
+        """Number of precomputed entries"""
+        return len(self.probabilities)
@@ -0,0 +1,234 @@
+"""
+Deletion Service - Bulk Prediction and Account Deletion
+Predictions are removed with set-based DELETE statements, a chunk at a time,
+instead of loading and deleting each row through the session. The cohort
+bitmaps are cleared in the same transaction, the similarity index gets one
+tombstone write per disease, and report PDFs are removed afterwards in
+batches on a background thread. Whole accounts are deactivated at once and
+deleted chunk by chunk in the background; the user row goes last, only once
+no prediction refers to it, so nothing is left to a database cascade that
+would skip the indexes. A pending deletion is recorded with the
+deactivation, and one interrupted by a crash or an error is picked up again
+by `flask resume-deletions`. The daily rollups are left alone: they count
+predictions that were made, not ones that still exist
+"""
+import os
+import queue
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.user import User
+from app.models.prediction import Prediction
+from app.models.report_file import ReportFile
+from app.models.prediction_change import PredictionChange
+from app.models.account_deletion import AccountDeletion
+from app.services.archive_service import ArchiveService
+from app.services.change_log_service import change_log
+from app.services.live_update_service import live_updates
+from app.services.report_storage_service import report_storage
+from app.services.user_cache_service import user_cache
+from app.utils.lazy import lazy_service
+from config import Config
+
+
+class ReportCleaner:
+    """Removes report files of deleted predictions in batches on a background thread"""
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or Config.REPORT_CLEANUP_BATCH_SIZE
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.removed = 0
+
+    def enqueue(self, paths):
+        paths = [path for path in paths if path]
+        if not paths:
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='report-cleaner', daemon=True)
+                self.thread.start()
+        for path in paths:
+            self.queue.put(path)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for path in batch:
+                try:
+                    os.remove(path)
+                    self.removed += 1
+                except OSError:
+                    pass
+                finally:
+                    self.queue.task_done()
+
+    def wait(self):
+        """Block until every queued file has been handled"""
+        self.queue.join()
+
+
+report_cleaner = ReportCleaner()
+
+# Account deletions run one at a time so they never crowd out request traffic
+_account_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='account-deletion')
+
+
+class DeletionService:
+    """Service for deleting predictions and accounts in bulk"""
+
+    # Everything needed to unindex a prediction, find its report file and take it off open dashboards
+    COLUMNS = (
+        Prediction.id, Prediction.user_id, Prediction.disease_type, Prediction.risk_level,
+        Prediction.prediction_result, Prediction.input_features, Prediction.report_id, Prediction.report_path,
+        Prediction.disease_name, Prediction.confidence_score, Prediction.risk_percentage, Prediction.created_at
+    )
+
+    def __init__(self, cohort_index=None, similarity_index=None, archive=None, chunk_size=None):
+        self.cohort_index = cohort_index or lazy_service('app.services.cohort_index_service.CohortIndexService')
+        self.similarity_index = similarity_index or lazy_service(
+            'app.services.similarity_index_service.SimilarityIndexService'
+        )
+        self.archive = archive or ArchiveService()
+        self.chunk_size = chunk_size or Config.DELETION_CHUNK_SIZE
+
+    def _report_files(self, rows):
+        for row in rows:
+            if row.report_path:
+                yield row.report_path
+            elif row.report_id:
+                path = os.path.join(report_storage.root, report_storage.relative_path(row.report_id))
+                if os.path.exists(path):
+                    yield path
+
+    def _untrack_reports(self, prediction_ids):
+        ReportFile.query.filter(ReportFile.prediction_id.in_(prediction_ids)).delete(synchronize_session=False)
+
+    def _after_delete(self, rows):
+        """Tombstone similarity entries, queue report files and notify open dashboards once the deletion is committed"""
+        by_disease = defaultdict(list)
+        for row in rows:
+            by_disease[row.disease_type].append(row.id)
+        for disease_type, ids in by_disease.items():
+            self.similarity_index.remove_predictions(disease_type, ids)
+        report_cleaner.enqueue(list(self._report_files(rows)))
+        live_updates.predictions_deleted(rows)
+
+    def _delete_chunk(self, user_id, prediction_ids=None):
+        query = db.session.query(*self.COLUMNS).filter(Prediction.user_id == user_id)
+        if prediction_ids is not None:
+            query = query.filter(Prediction.id.in_(prediction_ids))
+        rows = query.order_by(Prediction.id).limit(self.chunk_size).all()
+        if not rows:
+            return 0
+
+        self.cohort_index.unindex_predictions(rows)
+        self._untrack_reports([row.id for row in rows])
+        if prediction_ids is not None:
+            change_log.record_rows(rows, PredictionChange.DELETED)
+        Prediction.query.filter(Prediction.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+        db.session.commit()
+        self._after_delete(rows)
+        return len(rows)
+
+    def delete_predictions(self, user_id, prediction_ids):
+        """Delete the given predictions of a user; ids of other users are ignored"""
+        prediction_ids = list(prediction_ids)
+        deleted = 0
+        for start in range(0, len(prediction_ids), self.chunk_size):
+            deleted += self._delete_chunk(user_id, prediction_ids[start:start + self.chunk_size])
+        return deleted
+
+    def delete_account(self, user_id):
+        """Delete a user with all of their predictions, archived ones included"""
+        deleted = 0
+        archived = self.archive.user_predictions(user_id)
+        if archived:
+            # Unindexed before the archive files let go of them, so a retry still finds them
+            self.cohort_index.unindex_predictions(archived)
+            self._untrack_reports([prediction.id for prediction in archived])
+            db.session.commit()
+            self.archive.delete_user_predictions(user_id)
+            self._after_delete(archived)
+            deleted += len(archived)
+
+        while True:
+            count = self._delete_chunk(user_id)
+            deleted += count
+            if count:
+                continue
+
+            # A prediction saved since the last chunk is deleted next round; one saved after
+            # this check makes the foreign key refuse the user delete, with the same outcome
+            if db.session.query(Prediction.id).filter(Prediction.user_id == user_id).first() is not None:
+                db.session.rollback()
+                continue
+            try:
+                User.query.filter_by(id=user_id).delete(synchronize_session=False)
+                PredictionChange.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+                AccountDeletion.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+                db.session.commit()
+                break
+            except IntegrityError:
+                db.session.rollback()
+        user_cache.invalidate(user_id)
+        return deleted
+
+    def schedule_account_deletion(self, user_id):
+        """Deactivate a user now and delete the account on the background worker"""
+        user = db.session.get(User, user_id)
+        user.is_active = False
+        if db.session.get(AccountDeletion, user_id) is None:
+            db.session.add(AccountDeletion(user_id=user_id))
+        db.session.commit()
+
+        app = current_app._get_current_object()
+        return _account_executor.submit(self._delete_account_in_context, app, user_id)
+
+    def _delete_account_in_context(self, app, user_id):
+        with app.app_context():
+            try:
+                return self._attempt(user_id)
+            finally:
+                db.session.remove()
+
+    def _attempt(self, user_id):
+        """Delete an account, recording the error on its pending deletion if it fails"""
+        try:
+            return self.delete_account(user_id)
+        except Exception as error:
+            db.session.rollback()
+            current_app.logger.exception('Account deletion failed for user %s', user_id)
+            pending = db.session.get(AccountDeletion, user_id)
+            if pending is not None:
+                pending.attempts += 1
+                pending.last_error = f'{type(error).__name__}: {error}'[:1000]
+                db.session.commit()
+            raise
+
+    def pending_account_deletions(self):
+        """Users whose deletion has not finished, and owners of predictions left without a user"""
+        pending = [row.user_id for row in AccountDeletion.query.order_by(AccountDeletion.requested_at)]
+        orphaned = db.session.query(Prediction.user_id).distinct().filter(
+            ~Prediction.user_id.in_(db.session.query(User.id))
+        )
+        return pending + [user_id for user_id, in orphaned if user_id not in pending]
+
+    def resume_account_deletions(self):
+        """Finish every pending account deletion in this process; returns {user_id: deleted or error}"""
+        results = {}
+        for user_id in self.pending_account_deletions():
+            try:
+                results[user_id] = self._attempt(user_id)
+            except Exception as error:
+                results[user_id] = error
+        return results
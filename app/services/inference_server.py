@@ -0,0 +1,298 @@
+"""
+Inference Server - Host PredictionService in a Separate Model Process
+Web workers send batched requests over a Unix socket or a localhost TCP port.
+Messages are length-prefixed msgpack frames (JSON when msgpack is not installed)
+"""
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+from app.services.prediction_service import PredictionService
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# Frame header: codec id (1 byte) + payload length (4 bytes, big-endian)
+FRAME_HEADER = struct.Struct('>BI')
+CODEC_JSON = 0
+CODEC_MSGPACK = 1
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+# Operations forwarded to PredictionService, one call per batch item
+SERVICE_OPERATIONS = ('predict', 'sensitivity', 'explain')
+
+
+def parse_address(address):
+    """Parse 'unix:///path/to.sock' or 'tcp://127.0.0.1:5001' into (family, target)"""
+    if address.startswith('unix://'):
+        return socket.AF_UNIX, address[len('unix://'):]
+    if address.startswith('tcp://'):
+        address = address[len('tcp://'):]
+    host, _, port = address.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+def encode_frame(message):
+    """Serialize a message into a single frame"""
+    if msgpack is not None:
+        codec, payload = CODEC_MSGPACK, msgpack.packb(message, use_bin_type=True)
+    else:
+        codec, payload = CODEC_JSON, json.dumps(message, separators=(',', ':')).encode('utf-8')
+    return FRAME_HEADER.pack(codec, len(payload)) + payload
+
+
+def read_frame(sock):
+    """Read one message from a socket, or None if the peer closed the connection"""
+    header = _recv_exactly(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+
+    codec, length = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f'Frame of {length} bytes exceeds the limit')
+
+    payload = _recv_exactly(sock, length)
+    if payload is None:
+        raise ConnectionError('Connection closed mid-frame')
+
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise ValueError('Received a msgpack frame but msgpack is not installed')
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(payload.decode('utf-8'))
+
+
+def _recv_exactly(sock, size):
+    """Receive exactly size bytes, or None on a clean end of stream"""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            if remaining == size:
+                return None
+            raise ConnectionError('Connection closed mid-frame')
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+class InferenceServer:
+    """Serve PredictionService calls to web workers"""
+
+    def __init__(self, address, service=None):
+        self.address = address
+        self.service = service or PredictionService()
+        self._server = None
+
+    def warm(self):
+        """Load every model up front so the first requests do not pay for it"""
+        for disease_type in self.service.disease_features:
+            self.service.load_model(disease_type)
+
+    def handle(self, message):
+        """Answer one request message"""
+        op = message.get('op')
+
+        if op == 'ping':
+            return {'ok': True, 'pid': os.getpid(), 'models': sorted(self.service.models)}
+
+        if op not in SERVICE_OPERATIONS:
+            return {'error': f'Unknown operation: {op}'}
+
+        method = getattr(self.service, op)
+        results = []
+        for args in message.get('items', []):
+            if op == 'sensitivity' and len(args) > 2 and isinstance(args[2], list):
+                args = [args[0], args[1], set(args[2])]
+            results.append(method(*args))
+        return {'results': results}
+
+    def _make_server(self):
+        family, target = parse_address(self.address)
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                # Keep-alive: serve frames until the client disconnects
+                while True:
+                    try:
+                        message = read_frame(self.request)
+                    except (OSError, ValueError):
+                        return
+                    if message is None:
+                        return
+                    try:
+                        response = server.handle(message)
+                    except Exception as e:
+                        response = {'error': str(e)}
+                    self.request.sendall(encode_frame(response))
+
+        if family == socket.AF_UNIX:
+            if os.path.exists(target):
+                os.unlink(target)
+            base_class = socketserver.ThreadingUnixStreamServer
+        else:
+            base_class = socketserver.ThreadingTCPServer
+
+        class Server(base_class):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        return Server(target, Handler)
+
+    def start(self):
+        """Bind the socket and serve in a background thread"""
+        self._server = self._make_server()
+        thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def serve_forever(self):
+        """Bind the socket and serve in the current thread"""
+        self._server = self._make_server()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def shutdown(self):
+        """Stop serving and release the socket"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            family, target = parse_address(self.address)
+            if family == socket.AF_UNIX and os.path.exists(target):
+                os.unlink(target)
+            self._server = None
+
+
+class InferenceClient:
+    """Drop-in replacement for PredictionService that scores on an inference server"""
+
+    def __init__(self, address, pool_size=4, timeout=5.0, retry_interval=30.0, fallback=True):
+        self.address = address
+        self.family, self.target = parse_address(address)
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.fallback = fallback
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._down_until = 0.0
+
+        # Feature metadata is served locally; models load here only when falling back
+        self.local = PredictionService()
+
+    def __getattr__(self, name):
+        if name == 'local':
+            raise AttributeError(name)
+        return getattr(self.local, name)
+
+    def _connect(self):
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.target)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _exchange(self, sock, message):
+        sock.sendall(encode_frame(message))
+        response = read_frame(sock)
+        if response is None:
+            raise ConnectionError('Inference server closed the connection')
+        return response
+
+    def _call(self, op, items):
+        """Send one batch to the server, retrying once if a pooled connection went stale"""
+        if time.monotonic() < self._down_until:
+            raise ConnectionError('Inference server marked unavailable')
+
+        message = {'op': op, 'items': items}
+        try:
+            sock = self._pool.get_nowait()
+            pooled = True
+        except queue.Empty:
+            sock = None
+            pooled = False
+
+        try:
+            if sock is None:
+                sock = self._connect()
+            try:
+                response = self._exchange(sock, message)
+            except (OSError, ConnectionError):
+                sock.close()
+                if not pooled:
+                    raise
+                sock = self._connect()
+                response = self._exchange(sock, message)
+        except (OSError, ValueError, ConnectionError):
+            if sock is not None:
+                sock.close()
+            self._down_until = time.monotonic() + self.retry_interval
+            raise
+
+        try:
+            self._pool.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response['results']
+
+    def _run(self, op, items):
+        try:
+            return self._call(op, items)
+        except (OSError, ValueError, ConnectionError):
+            if not self.fallback:
+                raise
+            method = getattr(self.local, op)
+            return [method(*args) for args in items]
+
+    def ping(self):
+        """Check that the server is reachable"""
+        try:
+            sock = self._connect()
+            try:
+                return self._exchange(sock, {'op': 'ping'}).get('ok', False)
+            finally:
+                sock.close()
+        except (OSError, ValueError, ConnectionError):
+            return False
+
+    def predict(self, disease_type, features):
+        """Make a prediction on the inference server"""
+        return self._run('predict', [[disease_type, features]])[0]
+
+    def predict_many(self, requests):
+        """Make several predictions in one round trip from (disease_type, features) pairs"""
+        return self._run('predict', [[disease_type, features] for disease_type, features in requests])
+
+    def sensitivity(self, disease_type, features, pairwise=None):
+        """Run what-if analysis on the inference server"""
+        if isinstance(pairwise, set):
+            pairwise = sorted(pairwise)
+        return self._run('sensitivity', [[disease_type, features, pairwise]])[0]
+
+    def explain(self, disease_type, features):
+        """Explain a prediction on the inference server"""
+        return self._run('explain', [[disease_type, features]])[0]
+
+    def close(self):
+        """Close all pooled connections"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
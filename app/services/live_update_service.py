@@ -0,0 +1,243 @@
+"""
+Live Update Service - Server-Sent Event Deltas for Open Dashboards
+The dashboard and analytics pages load their aggregates once and then keep
+them current from a per-user event stream: a saved prediction or a deletion
+is published, once committed, as a small delta (the prediction's disease,
+risk level and dates) that the page adds to or subtracts from its counts,
+charts and recent activity, instead of asking for every aggregate again.
+Events go through a broker behind EVENT_BROKER. The default one only
+reaches streams of the same process; a broker shared between workers has
+the same publish/subscribe interface. Every stream has a bounded queue: a
+client too slow to keep up loses its queued deltas and is told to resync,
+i.e. to fetch the aggregates once. Streams send a heartbeat, close after
+LIVE_UPDATES_IDLE_TIMEOUT without events and resume from Last-Event-ID, with
+a resync when the missed events are no longer kept
+"""
+import json
+import queue
+import threading
+import uuid
+from collections import OrderedDict, defaultdict, deque
+from werkzeug.utils import import_string
+from app.utils.metrics import metrics
+
+
+RESYNC = 'event: resync\ndata: {}\n\n'
+
+# Bulk deletions larger than this are sent as one resync instead of a delta each
+MAX_DELTAS_PER_EVENT = 20
+
+
+class Subscription:
+    """One open stream: a bounded queue of SSE frames"""
+
+    def __init__(self, broker, channel, max_queue):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(max_queue)
+        self.lock = threading.Lock()
+        self.dropped = 0
+
+    def put(self, frame):
+        with self.lock:
+            try:
+                self.queue.put_nowait(frame)
+            except queue.Full:
+                # A client this far behind refetches its aggregates instead of catching up
+                while True:
+                    try:
+                        self.queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        break
+                self.queue.put_nowait(RESYNC)
+
+    def get(self, timeout):
+        """Next frame, or None after timeout seconds without one"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class _Channel:
+    def __init__(self, history_size):
+        self.seq = 0
+        self.history = deque(maxlen=history_size)
+        self.subscribers = set()
+
+
+class InProcessBroker:
+    """Publishes to the streams of this process, keeping recent events of each channel for resuming"""
+
+    # Channels without streams whose history is still kept
+    MAX_IDLE_CHANNELS = 1024
+
+    def __init__(self, max_queue=100, history_size=100):
+        self.max_queue = max_queue
+        self.history_size = history_size
+        # Event ids of another process (or an earlier one) cannot be resumed from
+        self.instance = uuid.uuid4().hex[:8]
+        self.channels = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _channel(self, name):
+        channel = self.channels.get(name)
+        if channel is None:
+            channel = self.channels[name] = _Channel(self.history_size)
+            idle = [key for key, value in self.channels.items() if not value.subscribers]
+            for key in idle[:max(0, len(idle) - self.MAX_IDLE_CHANNELS)]:
+                del self.channels[key]
+        self.channels.move_to_end(name)
+        return channel
+
+    def _frame(self, seq, event, data):
+        return f'id: {self.instance}-{seq}\nevent: {event}\ndata: {data}\n\n'
+
+    def publish(self, name, event, data):
+        """Send an event (data is a JSON string) to every stream of a channel"""
+        with self.lock:
+            channel = self._channel(name)
+            channel.seq += 1
+            frame = self._frame(channel.seq, event, data)
+            channel.history.append((channel.seq, frame))
+            subscribers = list(channel.subscribers)
+        for subscription in subscribers:
+            subscription.put(frame)
+
+    def subscribe(self, name, last_event_id=None):
+        """Open a stream, replaying what was missed since last_event_id"""
+        subscription = Subscription(self, name, self.max_queue)
+        with self.lock:
+            channel = self._channel(name)
+            channel.subscribers.add(subscription)
+            instance, _, seq = (last_event_id or '').partition('-')
+            if not last_event_id:
+                # Give the client a position to resume from, even before its first event
+                subscription.put(self._frame(channel.seq, 'ready', '{}'))
+            elif instance != self.instance or not seq.isdigit() or int(seq) > channel.seq:
+                subscription.put(RESYNC)
+            else:
+                missed = [frame for number, frame in channel.history if number > int(seq)]
+                if channel.seq - int(seq) > len(missed):
+                    subscription.put(RESYNC)
+                else:
+                    for frame in missed:
+                        subscription.put(frame)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            channel = self.channels.get(subscription.channel)
+            if channel is not None:
+                channel.subscribers.discard(subscription)
+
+    def subscriber_count(self, name=None):
+        """Open streams of a channel, or of every channel"""
+        with self.lock:
+            if name is not None:
+                channel = self.channels.get(name)
+                return len(channel.subscribers) if channel else 0
+            return sum(len(channel.subscribers) for channel in self.channels.values())
+
+
+class LiveUpdateService:
+    """Service for publishing prediction deltas and serving them as event streams"""
+
+    def __init__(self):
+        self.enabled = False
+        self.broker = None
+        self.heartbeat = 15
+        self.idle_timeout = 300
+        self.retry_ms = 3000
+        self.max_streams = 100
+        self.max_streams_per_user = 5
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('LIVE_UPDATES_ENABLED', True)
+        queue_size = app.config.get('LIVE_UPDATES_QUEUE_SIZE', 100)
+        broker_class = import_string(app.config.get('EVENT_BROKER') or 'app.services.live_update_service.InProcessBroker')
+        self.broker = broker_class(max_queue=queue_size, history_size=queue_size)
+        self.heartbeat = app.config.get('LIVE_UPDATES_HEARTBEAT', 15)
+        self.idle_timeout = app.config.get('LIVE_UPDATES_IDLE_TIMEOUT', 300)
+        self.retry_ms = app.config.get('LIVE_UPDATES_RETRY_MS', 3000)
+        self.max_streams = app.config.get('LIVE_UPDATES_MAX_STREAMS', 100)
+        self.max_streams_per_user = app.config.get('LIVE_UPDATES_MAX_STREAMS_PER_USER', 5)
+
+    def _channel(self, user_id):
+        return f'user:{user_id}'
+
+    def _publish(self, user_id, event, data):
+        if self.enabled and self.broker is not None:
+            self.broker.publish(self._channel(user_id), event, json.dumps(data))
+
+    def prediction_created(self, prediction):
+        """Publish a committed prediction to its owner's streams"""
+        self._publish(prediction.user_id, 'created', _delta(prediction))
+
+    def predictions_deleted(self, rows):
+        """Publish committed deletions, given rows with the columns of a delta"""
+        by_user = defaultdict(list)
+        for row in rows:
+            by_user[row.user_id].append(row)
+        for user_id, deleted in by_user.items():
+            if len(deleted) > MAX_DELTAS_PER_EVENT:
+                self._publish(user_id, 'resync', {})
+                continue
+            for row in deleted:
+                self._publish(user_id, 'deleted', _delta(row))
+
+    def subscribe(self, user_id, last_event_id=None):
+        """A subscription for a new stream, or None when the stream limits are reached"""
+        channel = self._channel(user_id)
+        with self.lock:
+            if self.broker.subscriber_count() >= self.max_streams or \
+                    self.broker.subscriber_count(channel) >= self.max_streams_per_user:
+                return None
+            return self.broker.subscribe(channel, last_event_id)
+
+    def stream(self, subscription):
+        """SSE frames of a subscription, with heartbeats, until the client leaves or stays idle"""
+        try:
+            yield f'retry: {self.retry_ms}\n\n'
+            idle = 0
+            while idle < self.idle_timeout:
+                wait = min(self.heartbeat, self.idle_timeout - idle)
+                frame = subscription.get(wait)
+                if frame is None:
+                    idle += wait
+                    # Also how a client that went away is noticed: the write fails
+                    yield ': keepalive\n\n'
+                else:
+                    idle = 0
+                    yield frame
+        finally:
+            subscription.close()
+
+    def stream_count(self):
+        return self.broker.subscriber_count() if self.broker is not None else 0
+
+
+def _delta(prediction):
+    """What a page needs to add a prediction to (or take it off) its aggregates"""
+    created_at = prediction.created_at
+    return {
+        'id': prediction.id,
+        'disease': prediction.disease_name,
+        'result': prediction.prediction_result,
+        'risk_level': prediction.risk_level,
+        'confidence_score': prediction.confidence_score,
+        'risk_percentage': prediction.risk_percentage,
+        'created_at': created_at.isoformat() if created_at else None,
+        'date': created_at.strftime('%Y-%m-%d %H:%M') if created_at else None,
+        'month': created_at.strftime('%B %Y') if created_at else None
+    }
+
+
+live_updates = LiveUpdateService()
+
+metrics.gauge('live_update_streams', 'Open live update streams in this worker', lambda: live_updates.stream_count())
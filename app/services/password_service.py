@@ -0,0 +1,160 @@
+"""
+Password Service - Bounded Password Hashing and Login Throttling
+Password hashing is deliberately expensive, so it runs on a small dedicated
+thread pool (hashlib releases the GIL) with a cap on queued work: a login
+burst can only use that many cores, and requests past the cap are turned away
+instead of tying up every worker. Hashes made with outdated parameters are
+upgraded on the next successful login, and accounts with repeated failures
+are refused before any hashing is done
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing queue is full or a hash takes too long"""
+
+
+class PasswordHasher:
+    """Hash and verify passwords on a bounded executor"""
+
+    def __init__(self, method='scrypt:32768:8:1', salt_length=16, workers=2, queue_size=32, timeout=10.0):
+        self.executor = None
+        self.configure(method, salt_length, workers, queue_size, timeout)
+
+    def init_app(self, app):
+        """Read the hashing settings of an application"""
+        self.configure(
+            app.config.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1'),
+            app.config.get('PASSWORD_SALT_LENGTH', 16),
+            app.config.get('PASSWORD_HASH_WORKERS', 2),
+            app.config.get('PASSWORD_HASH_QUEUE_SIZE', 32),
+            app.config.get('PASSWORD_HASH_TIMEOUT', 10.0)
+        )
+
+    def configure(self, method, salt_length, workers, queue_size, timeout):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.method = method
+        self.salt_length = salt_length
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.full_method = None
+        self.hashed = 0
+        self.rejected = 0
+
+    def _run(self, function, *args):
+        # Admission control: running plus queued hashes never exceed the slots
+        if not self.slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingBusyError('Password hashing queue is full')
+        try:
+            future = self.executor.submit(function, *args)
+        except RuntimeError:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            result = future.result(timeout=self.timeout)
+        except TimeoutError:
+            self.rejected += 1
+            raise HashingBusyError('Password hashing timed out')
+        self.hashed += 1
+        return result
+
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash"""
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with other parameters than the configured ones"""
+        if self.full_method is None:
+            # Werkzeug fills in default parameters ('scrypt' -> 'scrypt:32768:8:1'), so ask it once
+            self.full_method = generate_password_hash('', self.method, 1).split('$', 1)[0]
+        parts = password_hash.split('$', 2)
+        if len(parts) != 3:
+            return True
+        return parts[0] != self.full_method or len(parts[1]) != self.salt_length
+
+    def stats(self):
+        return {
+            'method': self.method,
+            'hashed': self.hashed,
+            'rejected': self.rejected,
+            'queued': self.executor._work_queue.qsize()
+        }
+
+
+class LoginThrottle:
+    """Per-account failed login counter, kept in this process"""
+
+    def __init__(self, max_attempts=5, window=300, max_accounts=100000):
+        self.max_attempts = max_attempts
+        self.window = window
+        self.max_accounts = max_accounts
+        self.failures = OrderedDict()
+        self.lock = threading.Lock()
+        self.throttled = 0
+
+    def init_app(self, app):
+        """Read the throttling settings of an application"""
+        self.max_attempts = app.config.get('LOGIN_MAX_ATTEMPTS', 5)
+        self.window = app.config.get('LOGIN_ATTEMPT_WINDOW', 300)
+        with self.lock:
+            self.failures.clear()
+            self.throttled = 0
+
+    def _recent(self, key, now):
+        attempts = self.failures.get(key)
+        if attempts is None:
+            return None
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        if not attempts:
+            del self.failures[key]
+            return None
+        return attempts
+
+    def retry_after(self, username):
+        """Seconds until the account may try again, or 0 if it is not throttled"""
+        key = username.lower()
+        now = time.monotonic()
+        with self.lock:
+            attempts = self._recent(key, now)
+            if attempts is None or len(attempts) < self.max_attempts:
+                return 0
+            self.throttled += 1
+            return int(attempts[0] + self.window - now) + 1
+
+    def record_failure(self, username):
+        key = username.lower()
+        with self.lock:
+            attempts = self.failures.setdefault(key, deque(maxlen=self.max_attempts))
+            attempts.append(time.monotonic())
+            self.failures.move_to_end(key)
+            while len(self.failures) > self.max_accounts:
+                self.failures.popitem(last=False)
+
+    def reset(self, username):
+        with self.lock:
+            self.failures.pop(username.lower(), None)
+
+    def stats(self):
+        return {
+            'max_attempts': self.max_attempts,
+            'window': self.window,
+            'accounts_with_failures': len(self.failures),
+            'throttled': self.throttled
+        }
+
+
+password_hasher = PasswordHasher()
+login_throttle = LoginThrottle()
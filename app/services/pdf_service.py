@@ -10,6 +10,8 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.pdfgen import canvas
+from app.services.report_storage_service import report_storage
+from app.utils.metrics import metrics
 from config import Config
 
 
@@ -54,16 +56,14 @@ class PDFService:
     def generate_report(self, prediction, user):
         """Generate a comprehensive PDF report for a prediction"""
         
-        # Create filename
-        filename = f"report_{prediction.report_id}.pdf"
-        filepath = os.path.join(Config.REPORTS_PATH, filename)
-        
-        # Ensure directory exists
-        os.makedirs(Config.REPORTS_PATH, exist_ok=True)
+        # Sharded location; the PDF is built in a temporary file so the sweeper
+        # and concurrent downloads never see a half-written report
+        filepath = report_storage.path_for(prediction.report_id)
+        temp_path = f"{filepath}.{os.getpid()}.tmp"
         
         # Create PDF document
         doc = SimpleDocTemplate(
-            filepath,
+            temp_path,
             pagesize=letter,
             rightMargin=72,
             leftMargin=72,
@@ -71,7 +71,18 @@ class PDFService:
             bottomMargin=18
         )
         
-        # Build content
+        with metrics.stage('report.layout'):
+            story = self._build_story(prediction, user)
+        
+        # Build PDF
+        with metrics.stage('report.render'):
+            doc.build(story)
+        os.replace(temp_path, filepath)
+        
+        return filepath
+    
+    def _build_story(self, prediction, user):
+        """Lay out the report content as reportlab flowables"""
         story = []
         
         # Header
@@ -193,6 +204,33 @@ class PDFService:
         
         story.append(Spacer(1, 20))
         
+        # Key Contributing Factors
+        top_contributors = prediction.get_top_contributors(Config.EXPLANATION_TOP_FEATURES)
+        if top_contributors:
+            story.append(Paragraph("Key Contributing Factors", self.styles['CustomHeading']))
+            
+            contributor_items = [['Factor', 'Effect on Risk']]
+            for feature, points in top_contributors:
+                direction = 'raises' if points > 0 else 'lowers'
+                label = feature.replace('_', ' ').title()
+                contributor_items.append([label, f"{points:+.1f} points ({direction} risk)"])
+            
+            contributors_table = Table(contributor_items, colWidths=[2.5*inch, 3.5*inch])
+            contributors_table.setStyle(TableStyle([
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 0), (-1, -1), 9),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#2C3E50')),
+                ('TEXTCOLOR', (0, 1), (0, -1), colors.HexColor('#7F8C8D')),
+                ('TEXTCOLOR', (1, 1), (1, -1), colors.HexColor('#2C3E50')),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#BDC3C7')),
+            ]))
+            
+            story.append(contributors_table)
+            story.append(Spacer(1, 20))
+        
         # Recommendations
         story.append(Paragraph("Recommendations", self.styles['CustomHeading']))
         
@@ -219,10 +257,7 @@ class PDFService:
             disclaimer_style
         ))
         
-        # Build PDF
-        doc.build(story)
-        
-        return filepath
+        return story
     
     def _get_recommendations(self, prediction):
         """Get personalized recommendations based on prediction"""
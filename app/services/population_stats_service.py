@@ -0,0 +1,295 @@
+"""
+Population Stats Service - Cross-User Analytics from Daily Rollups
+Predictions are folded incrementally into per-day, per-disease rows holding
+counters, a histogram and a t-digest. Queries read those rows plus the small
+tail of predictions not yet compacted, so they never scan the whole table.
+A background compactor folds the tail every STATS_COMPACT_INTERVAL seconds
+and after every STATS_COMPACT_EVERY saved predictions, one compaction at a
+time across workers. The watermark is the highest folded prediction id, which
+assumes ids become visible in order. SQLite commits them in order, but
+PostgreSQL sequences hand out ids before their transactions commit, so a
+compaction leaves predictions younger than STATS_COMPACT_LAG_SECONDS in the
+tail for slower transactions to catch up.
+Deleting a prediction does not change the rollups: they describe predictions made
+"""
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app import db
+from app.models.prediction import Prediction
+from app.models.population_stats import DailyDiseaseStats
+from app.utils.database import lock_table
+from config import Config
+
+
+class _Aggregate:
+    """Running totals for one group of predictions"""
+
+    def __init__(self):
+        self.count = 0
+        self.positive = 0
+        self.levels = {'Low': 0, 'Medium': 0, 'High': 0}
+        self.risk_sum = 0.0
+        self.histogram = [0] * DailyDiseaseStats.HISTOGRAM_BUCKETS
+        self.digests = []
+        self.risks = []
+
+    def add_prediction(self, result, risk_level, risk):
+        self.count += 1
+        if result == 'Positive':
+            self.positive += 1
+        if risk_level in self.levels:
+            self.levels[risk_level] += 1
+        if risk is not None:
+            self.risk_sum += risk
+            self.histogram[_bucket(risk)] += 1
+            self.risks.append(risk)
+
+    def add_stats(self, stats):
+        self.count += stats.prediction_count
+        self.positive += stats.positive_count
+        self.levels['Low'] += stats.low_count
+        self.levels['Medium'] += stats.medium_count
+        self.levels['High'] += stats.high_count
+        self.risk_sum += stats.risk_sum
+        self.histogram = [a + b for a, b in zip(self.histogram, stats.get_histogram())]
+        self.digests.append(stats.get_digest())
+
+    def add(self, other):
+        self.count += other.count
+        self.positive += other.positive
+        for level, count in other.levels.items():
+            self.levels[level] += count
+        self.risk_sum += other.risk_sum
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        self.digests.extend(other.digests)
+        self.risks.extend(other.risks)
+
+    def digest(self):
+        from app.utils.tdigest import TDigest
+        digests = list(self.digests)
+        if self.risks:
+            digests.append(TDigest().update(self.risks))
+        return TDigest.merge_all(digests)
+
+
+def _bucket(risk):
+    return min(max(int(risk // 10), 0), DailyDiseaseStats.HISTOGRAM_BUCKETS - 1)
+
+
+class PopulationStatsService:
+    """Service for population-level prediction statistics"""
+
+    def __init__(self, batch_size=5000):
+        self.batch_size = batch_size
+        self.compact_interval = 0
+        self.compact_every = 0
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.thread = None
+        self.wake_event = threading.Event()
+        self.stopped = False
+
+    def init_app(self, app):
+        """Read the compaction settings of an application and start its compactor"""
+        self.compact_interval = app.config.get('STATS_COMPACT_INTERVAL', 0)
+        self.compact_every = app.config.get('STATS_COMPACT_EVERY', 0)
+        if (self.compact_interval or self.compact_every) and (self.thread is None or not self.thread.is_alive()):
+            self.stopped = False
+            self.thread = threading.Thread(target=self._run, args=(app,), name='stats-compactor', daemon=True)
+            self.thread.start()
+
+    def _run(self, app):
+        while True:
+            self.wake_event.wait(self.compact_interval or None)
+            self.wake_event.clear()
+            if self.stopped:
+                return
+            with self.lock:
+                self.pending = 0
+            with app.app_context():
+                try:
+                    self.compact()
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception('Population stats compaction failed')
+                finally:
+                    db.session.remove()
+
+    def stop(self):
+        self.stopped = True
+        self.wake_event.set()
+
+    def prediction_saved(self):
+        """Count a committed prediction, waking the compactor every STATS_COMPACT_EVERY of them"""
+        if not self.compact_every:
+            return
+        with self.lock:
+            self.pending += 1
+            if self.pending >= self.compact_every:
+                self.wake_event.set()
+
+    def get_watermark(self):
+        """Highest prediction id already folded into the rollups"""
+        return db.session.query(func.max(DailyDiseaseStats.last_prediction_id)).scalar() or 0
+
+    def _tail_query(self, watermark):
+        return db.session.query(
+            Prediction.id,
+            Prediction.created_at,
+            Prediction.disease_type,
+            Prediction.prediction_result,
+            Prediction.risk_level,
+            Prediction.risk_percentage
+        ).filter(Prediction.id > watermark)
+
+    def compact(self, lag_seconds=None):
+        """Fold predictions newer than the watermark, and older than the lag, into the daily rollups"""
+        lag = Config.STATS_COMPACT_LAG_SECONDS if lag_seconds is None else lag_seconds
+        settled_before = datetime.utcnow() - timedelta(seconds=lag)
+        folded = 0
+
+        while True:
+            # A second compaction reading the same watermark would fold the same predictions again
+            lock_table(db.session, DailyDiseaseStats)
+            rows = self._tail_query(self.get_watermark()).order_by(Prediction.id).limit(self.batch_size).all()
+
+            # Stop at the first prediction inside the lag: ids below it may still be committing
+            settled = []
+            for row in rows:
+                if row.created_at >= settled_before:
+                    break
+                settled.append(row)
+            if not settled:
+                db.session.commit()
+                return folded
+
+            groups = defaultdict(list)
+            for row in settled:
+                groups[(row.created_at.date(), row.disease_type)].append(row)
+
+            for (day, disease_type), items in groups.items():
+                stats = DailyDiseaseStats.query.filter_by(day=day, disease_type=disease_type).first()
+                if stats is None:
+                    stats = DailyDiseaseStats(
+                        day=day, disease_type=disease_type, prediction_count=0, positive_count=0,
+                        low_count=0, medium_count=0, high_count=0, risk_sum=0.0, last_prediction_id=0
+                    )
+                    db.session.add(stats)
+
+                aggregate = _Aggregate()
+                for item in items:
+                    aggregate.add_prediction(item.prediction_result, item.risk_level, item.risk_percentage)
+
+                stats.prediction_count += aggregate.count
+                stats.positive_count += aggregate.positive
+                stats.low_count += aggregate.levels['Low']
+                stats.medium_count += aggregate.levels['Medium']
+                stats.high_count += aggregate.levels['High']
+                stats.risk_sum += aggregate.risk_sum
+                stats.risk_histogram = json.dumps(
+                    [a + b for a, b in zip(stats.get_histogram(), aggregate.histogram)]
+                )
+                stats.risk_digest = stats.get_digest().update(aggregate.risks).to_bytes()
+                stats.last_prediction_id = max(stats.last_prediction_id, items[-1].id)
+
+            db.session.commit()
+            folded += len(settled)
+            if len(settled) < len(rows):
+                return folded
+
+    def _collect(self, days=None, disease_type=None):
+        """Aggregates keyed by (day, disease_type) from rollups plus the live tail"""
+        cutoff = datetime.utcnow().date() - timedelta(days=days) if days else None
+        aggregates = defaultdict(_Aggregate)
+
+        stats_query = DailyDiseaseStats.query
+        if cutoff:
+            stats_query = stats_query.filter(DailyDiseaseStats.day >= cutoff)
+        if disease_type:
+            stats_query = stats_query.filter_by(disease_type=disease_type)
+        for stats in stats_query:
+            aggregates[(stats.day, stats.disease_type)].add_stats(stats)
+
+        tail_query = self._tail_query(self.get_watermark())
+        if cutoff:
+            tail_query = tail_query.filter(Prediction.created_at >= datetime.combine(cutoff, datetime.min.time()))
+        if disease_type:
+            tail_query = tail_query.filter(Prediction.disease_type == disease_type)
+        for row in tail_query:
+            aggregates[(row.created_at.date(), row.disease_type)].add_prediction(
+                row.prediction_result, row.risk_level, row.risk_percentage
+            )
+
+        return aggregates
+
+    def _summarize(self, aggregate, quantiles):
+        digest = aggregate.digest()
+        return {
+            'total_predictions': aggregate.count,
+            'positive_rate': round(aggregate.positive / aggregate.count * 100, 2) if aggregate.count else 0,
+            'average_risk': round(aggregate.risk_sum / aggregate.count, 2) if aggregate.count else 0,
+            'risk_distribution': aggregate.levels,
+            'risk_histogram': aggregate.histogram,
+            'risk_quantiles': {
+                f'p{q * 100:g}': round(digest.quantile(q), 2) if digest.count else None
+                for q in quantiles
+            }
+        }
+
+    def overview(self, days=None, quantiles=(0.5, 0.9, 0.99)):
+        """Per-disease totals, positive rates, risk distributions and quantiles"""
+        per_disease = defaultdict(_Aggregate)
+        overall = _Aggregate()
+        for (_, disease_type), aggregate in self._collect(days).items():
+            per_disease[disease_type].add(aggregate)
+            overall.add(aggregate)
+
+        diseases = []
+        for disease_type, aggregate in sorted(per_disease.items()):
+            summary = self._summarize(aggregate, quantiles)
+            summary['disease_type'] = disease_type
+            summary['disease'] = Config.DISEASES.get(disease_type, {}).get('name', disease_type)
+            diseases.append(summary)
+
+        return {
+            'overall': self._summarize(overall, quantiles),
+            'diseases': diseases
+        }
+
+    def daily(self, days=30, disease_type=None):
+        """Daily prediction volumes and positive rates"""
+        per_day = defaultdict(_Aggregate)
+        for (day, _), aggregate in self._collect(days, disease_type).items():
+            per_day[day].add(aggregate)
+
+        labels, volumes, positive_rates = [], [], []
+        for day, aggregate in sorted(per_day.items()):
+            labels.append(day.isoformat())
+            volumes.append(aggregate.count)
+            positive_rates.append(round(aggregate.positive / aggregate.count * 100, 2) if aggregate.count else 0)
+
+        return {
+            'labels': labels,
+            'predictions': volumes,
+            'positive_rate': positive_rates
+        }
+
+    def quantiles(self, quantiles, days=None, disease_type=None):
+        """Approximate risk percentage quantiles"""
+        merged = _Aggregate()
+        for aggregate in self._collect(days, disease_type).values():
+            merged.add(aggregate)
+        digest = merged.digest()
+        return {
+            'total_predictions': merged.count,
+            'quantiles': {
+                f'{q:g}': round(digest.quantile(q), 2) if digest.count else None
+                for q in quantiles
+            }
+        }
+
+
+population_stats = PopulationStatsService()
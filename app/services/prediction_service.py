@@ -3,9 +3,12 @@ Prediction Service - Symptom-Based ML Prediction Logic
 Uses symptoms and lifestyle data (no hospital tests needed)
 """
 import os
-import joblib
+import threading
 import numpy as np
 from config import Config
+from app.services.decision_table import DecisionTable
+from app.services.tree_explainer import TreeExplainer
+from app.utils.metrics import metrics
 
 
 class PredictionService:
@@ -13,7 +16,12 @@ class PredictionService:
     
     def __init__(self):
         self.models = {}
+        self.decision_tables = {}
+        self.explainers = {}
+        self.load_locks = {}
+        self.lock = threading.Lock()
         self.disease_features = self._get_disease_features()
+        self.feature_ranges = self._get_feature_ranges()
         self.model_accuracies = self._get_model_accuracies()
     
     def _get_disease_features(self):
@@ -70,6 +78,45 @@ class PredictionService:
                         'sunburns', 'fair_skin', 'many_moles', 'family_history']
         }
     
+    def _get_feature_ranges(self):
+        """Define the (min, max) input range of each feature, as offered by the forms"""
+        common = {
+            'age': (1, 120), 'gender': (0, 1), 'height': (100, 250), 'weight': (20, 200),
+            'fatigue': (0, 10), 'stress': (0, 10), 'symptom_duration': (0, 4), 'activity': (0, 4)
+        }
+        overrides = {
+            'diabetes': {'pregnancies': (0, 20), 'frequent_urination': (0, 2), 'excessive_thirst': (0, 2),
+                         'weight_loss': (0, 2), 'blurred_vision': (0, 2), 'tingling': (0, 2),
+                         'family_history': (0, 2), 'diet': (0, 3)},
+            'heart_disease': {'chest_pain': (0, 4), 'shortness_breath': (0, 3), 'radiating_pain': (0, 2),
+                              'palpitations': (0, 3), 'dizziness': (0, 2), 'swelling': (0, 2),
+                              'smoking': (0, 4), 'high_bp': (0, 2), 'diabetes': (0, 2),
+                              'family_history': (0, 2), 'alcohol': (0, 3)},
+            'kidney_disease': {'swelling': (0, 3), 'urination_changes': (0, 4), 'foamy_urine': (0, 2),
+                               'appetite_loss': (0, 2), 'nausea': (0, 2), 'itchy_skin': (0, 2),
+                               'back_pain': (0, 2), 'high_bp': (0, 2), 'diabetes': (0, 2),
+                               'painkillers': (0, 2), 'water_intake': (0, 3)},
+            'liver_disease': {'jaundice': (0, 2), 'abdominal_pain': (0, 3), 'dark_urine': (0, 2),
+                              'pale_stool': (0, 2), 'nausea': (0, 2), 'appetite_loss': (0, 2),
+                              'itchy_skin': (0, 2), 'alcohol': (0, 4)},
+            'breast_cancer': {'age': (18, 120), 'lump': (0, 2), 'size_change': (0, 2),
+                              'nipple_discharge': (0, 2), 'skin_changes': (0, 2), 'breast_pain': (0, 2),
+                              'symptom_duration': (0, 3), 'family_history': (0, 2), 'alcohol': (0, 2),
+                              'obesity': (0, 2)},
+            'anemia': {'pale_skin': (0, 2), 'shortness_breath': (0, 3), 'dizziness': (0, 2),
+                       'cold_extremities': (0, 2), 'headaches': (0, 2), 'irregular_heart': (0, 2),
+                       'diet': (0, 2), 'heavy_periods': (0, 2)}
+        }
+        
+        # Anything not listed is a yes/no answer
+        return {
+            disease: {
+                feature: overrides.get(disease, {}).get(feature, common.get(feature, (0, 1)))
+                for feature in features
+            }
+            for disease, features in self.disease_features.items()
+        }
+    
     def _get_model_accuracies(self):
         """Model accuracy for each disease"""
         return {
@@ -80,30 +127,73 @@ class PredictionService:
             'pneumonia': 92.1, 'tuberculosis': 93.9, 'melanoma': 91.0
         }
     
+    def _load_lock(self, disease_type):
+        with self.lock:
+            return self.load_locks.setdefault(disease_type, threading.Lock())
+    
     def load_model(self, disease_type):
         """Load or create ML model for a specific disease"""
         if disease_type in self.models:
             return self.models[disease_type]
         
-        model_path = os.path.join(Config.ML_MODELS_PATH, f'{disease_type}_model.pkl')
-        
-        try:
-            if os.path.exists(model_path):
-                model = joblib.load(model_path)
-                self.models[disease_type] = model
-                return model
-            else:
+        # Concurrent first requests for a disease wait for one load instead of each
+        # training and saving a dummy model
+        with self._load_lock(disease_type):
+            if disease_type in self.models:
+                return self.models[disease_type]
+            
+            model_path = os.path.join(Config.ML_MODELS_PATH, f'{disease_type}_model.pkl')
+            
+            try:
+                if os.path.exists(model_path):
+                    # joblib (and sklearn, through the pickle) load with the first model
+                    import joblib
+                    model = joblib.load(model_path)
+                else:
+                    model = self._create_dummy_model(disease_type)
+            except Exception as e:
+                # If loading fails, create a new dummy model
                 model = self._create_dummy_model(disease_type)
-                self.models[disease_type] = model
-                return model
-        except Exception as e:
-            # If loading fails, create a new dummy model
-            model = self._create_dummy_model(disease_type)
+            
             self.models[disease_type] = model
+            if Config.DECISION_TABLES_ENABLED:
+                self.compile_decision_table(disease_type)
             return model
     
+    def compile_decision_table(self, disease_type, max_size=None):
+        """Precompute the model output for every input combination of a small-domain disease"""
+        if max_size is None:
+            max_size = Config.DECISION_TABLE_MAX_SIZE
+        
+        model = self.load_model(disease_type)
+        ranges = [self.feature_ranges[disease_type][f] for f in self.disease_features.get(disease_type, [])]
+        
+        if not ranges or not hasattr(model, 'predict_proba') or len(getattr(model, 'classes_', [])) != 2:
+            return None
+        if DecisionTable.domain_size(ranges) > max_size:
+            return None
+        
+        try:
+            table = DecisionTable.compile(model, ranges)
+        except Exception:
+            # Models that do not accept the form's feature layout keep using direct inference
+            return None
+        
+        self.decision_tables[disease_type] = table
+        return table
+    
+    def compile_decision_tables(self, max_size=None):
+        """Compile decision tables for every disease whose input space is small enough"""
+        tables = {}
+        for disease_type in self.disease_features:
+            table = self.compile_decision_table(disease_type, max_size)
+            if table is not None:
+                tables[disease_type] = table.size
+        return tables
+    
     def _create_dummy_model(self, disease_type):
         """Create a demo model for symptom-based prediction"""
+        import joblib
         from sklearn.ensemble import RandomForestClassifier
         
         features = self.disease_features.get(disease_type, [])
@@ -118,35 +208,43 @@ class PredictionService:
         
         os.makedirs(Config.ML_MODELS_PATH, exist_ok=True)
         model_path = os.path.join(Config.ML_MODELS_PATH, f'{disease_type}_model.pkl')
-        joblib.dump(model, model_path)
+        # Other processes may be loading the same file; they only ever see a complete one
+        temp_path = f'{model_path}.{os.getpid()}.tmp'
+        joblib.dump(model, temp_path)
+        os.replace(temp_path, model_path)
         
         return model
     
     def predict(self, disease_type, features):
         """Make a symptom-based prediction for a disease"""
         try:
-            model = self.load_model(disease_type)
+            with metrics.stage('predict.load_model'):
+                model = self.load_model(disease_type)
             expected_features = self.disease_features.get(disease_type, [])
+            with metrics.stage('predict.coerce_features'):
+                feature_values = self.get_feature_values(disease_type, features)
             
-            feature_values = []
-            for feature in expected_features:
-                value = features.get(feature, 0)
-                try:
-                    feature_values.append(float(value))
-                except (ValueError, TypeError):
-                    feature_values.append(0.0)
-            
-            X = np.array([feature_values])
-            
-            prediction = model.predict(X)[0]
-            
-            if hasattr(model, 'predict_proba'):
-                probabilities = model.predict_proba(X)[0]
-                confidence = float(max(probabilities) * 100)
-                risk_percentage = float(probabilities[1] * 100) if len(probabilities) > 1 else confidence
-            else:
-                confidence = 85.0
-                risk_percentage = 75.0 if prediction == 1 else 25.0
+            with metrics.stage('predict.inference'):
+                # Small discrete input spaces are answered from the precomputed table
+                table = self.decision_tables.get(disease_type)
+                probabilities = table.lookup(feature_values) if table is not None else None
+                
+                if probabilities is not None:
+                    prediction = table.classes[int(np.argmax(probabilities))]
+                    confidence = float(max(probabilities) * 100)
+                    risk_percentage = float(probabilities[1] * 100)
+                else:
+                    X = np.array([feature_values])
+                    
+                    prediction = model.predict(X)[0]
+                    
+                    if hasattr(model, 'predict_proba'):
+                        probabilities = model.predict_proba(X)[0]
+                        confidence = float(max(probabilities) * 100)
+                        risk_percentage = float(probabilities[1] * 100) if len(probabilities) > 1 else confidence
+                    else:
+                        confidence = 85.0
+                        risk_percentage = 75.0 if prediction == 1 else 25.0
             
             risk_level = self._calculate_risk_level(risk_percentage)
             
@@ -155,9 +253,10 @@ class PredictionService:
             model_accuracy = self.model_accuracies.get(disease_type, 92.0)
             
             # Generate recommendations based on risk level
-            recommendations = self._get_recommendations(disease_type, risk_level, features)
+            with metrics.stage('predict.recommendations'):
+                recommendations = self._get_recommendations(disease_type, risk_level, features)
             
-            return {
+            result = {
                 'prediction': 'Positive' if prediction == 1 else 'Negative',
                 'confidence': round(confidence, 2),
                 'risk_percentage': round(risk_percentage, 2),
@@ -167,10 +266,176 @@ class PredictionService:
                 'features_used': len(expected_features),
                 'recommendations': recommendations
             }
+            
+            if Config.EXPLANATIONS_ENABLED:
+                with metrics.stage('predict.explain'):
+                    result['feature_contributions'] = self._explain_values(disease_type, feature_values)
+            
+            return result
         
         except Exception as e:
             return {'error': f'Prediction failed: {str(e)}'}
     
+    def get_explainer(self, disease_type):
+        """Get the decision-path explainer for a disease, or None if its model is not a tree ensemble"""
+        if disease_type not in self.explainers:
+            model = self.load_model(disease_type)
+            explainer = None
+            if TreeExplainer.supports(model) and model.n_features_in_ == len(self.disease_features.get(disease_type, [])):
+                explainer = TreeExplainer(model)
+            self.explainers[disease_type] = explainer
+        return self.explainers[disease_type]
+    
+    def explain(self, disease_type, features):
+        """Per-feature contribution to the risk percentage, in percentage points"""
+        try:
+            return self._explain_values(disease_type, self.get_feature_values(disease_type, features))
+        except Exception:
+            return None
+    
+    def _explain_values(self, disease_type, feature_values):
+        """Decompose the positive-class probability of a feature vector"""
+        explainer = self.get_explainer(disease_type)
+        if explainer is None:
+            return None
+        
+        _, contributions = explainer.explain([feature_values])
+        points = [round(float(value) * 100, 2) for value in contributions[0]]
+        
+        # Only non-zero contributions are kept to store compactly
+        return {
+            feature: value
+            for feature, value in zip(self.disease_features[disease_type], points)
+            if value != 0
+        }
+    
+    def get_feature_values(self, disease_type, features):
+        """Convert raw input into a numeric vector in the model's feature order"""
+        feature_values = []
+        for feature in self.disease_features.get(disease_type, []):
+            value = features.get(feature, 0)
+            try:
+                feature_values.append(float(value))
+            except (ValueError, TypeError):
+                feature_values.append(0.0)
+        return feature_values
+    
+    def _get_perturbation_values(self, disease_type, feature, max_points):
+        """Candidate values of a feature for what-if analysis"""
+        low, high = self.feature_ranges[disease_type][feature]
+        if high - low + 1 <= max_points:
+            return list(range(low, high + 1))
+        return sorted({int(round(v)) for v in np.linspace(low, high, max_points)})
+    
+    def sensitivity(self, disease_type, features, pairwise=None):
+        """Score every single-feature (and optionally pairwise) perturbation in one batch"""
+        try:
+            model = self.load_model(disease_type)
+            if not hasattr(model, 'predict_proba'):
+                return {'error': 'Sensitivity analysis requires a probabilistic model'}
+            
+            expected_features = self.disease_features.get(disease_type, [])
+            base = self.get_feature_values(disease_type, features)
+            candidates = [
+                self._get_perturbation_values(disease_type, feature, Config.SENSITIVITY_MAX_POINTS)
+                for feature in expected_features
+            ]
+            
+            # Only values that differ from the submitted ones are scored
+            candidates = [[value for value in values if value != base[i]] for i, values in enumerate(candidates)]
+            pair_indices = []
+            if pairwise:
+                pair_indices = [
+                    i for i, feature in enumerate(expected_features)
+                    if pairwise is True or feature in pairwise
+                ]
+            
+            # Count the rows before building any of them
+            row_count = 1 + sum(len(values) for values in candidates)
+            for a, i in enumerate(pair_indices):
+                row_count += len(candidates[i]) * sum(len(candidates[j]) for j in pair_indices[a + 1:])
+            if row_count > Config.SENSITIVITY_MAX_ROWS:
+                return {'error': f'Too many perturbations ({row_count}); restrict the pairwise features'}
+            
+            # Row 0 is the submitted vector, every other row changes one or two features
+            rows = [base]
+            changes = [()]
+            for i, values in enumerate(candidates):
+                for value in values:
+                    row = list(base)
+                    row[i] = value
+                    rows.append(row)
+                    changes.append(((i, value),))
+            
+            for a, i in enumerate(pair_indices):
+                for j in pair_indices[a + 1:]:
+                    for value_i in candidates[i]:
+                        for value_j in candidates[j]:
+                            row = list(base)
+                            row[i] = value_i
+                            row[j] = value_j
+                            rows.append(row)
+                            changes.append(((i, value_i), (j, value_j)))
+            
+            probabilities = model.predict_proba(np.array(rows))
+            positive = probabilities[:, 1] if probabilities.shape[1] > 1 else probabilities.max(axis=1)
+            risks = positive * 100
+            base_risk = float(risks[0])
+            
+            single = {feature: [] for feature in expected_features}
+            pairs = {}
+            for change, risk in zip(changes[1:], risks[1:]):
+                entry = {
+                    'risk_percentage': round(float(risk), 2),
+                    'delta': round(float(risk) - base_risk, 2)
+                }
+                if len(change) == 1:
+                    (i, value), = change
+                    entry['value'] = value
+                    single[expected_features[i]].append(entry)
+                else:
+                    (i, value_i), (j, value_j) = change
+                    entry['values'] = [value_i, value_j]
+                    pairs.setdefault((i, j), []).append(entry)
+            
+            feature_results = []
+            for i, feature in enumerate(expected_features):
+                perturbations = single[feature]
+                deltas = [p['delta'] for p in perturbations] or [0.0]
+                feature_results.append({
+                    'feature': feature,
+                    'current_value': base[i],
+                    'perturbations': perturbations,
+                    'max_increase': max(max(deltas), 0.0),
+                    'max_decrease': min(min(deltas), 0.0)
+                })
+            
+            # Most influential features first
+            feature_results.sort(key=lambda r: max(r['max_increase'], -r['max_decrease']), reverse=True)
+            
+            result = {
+                'disease_type': disease_type,
+                'risk_percentage': round(base_risk, 2),
+                'risk_level': self._calculate_risk_level(base_risk),
+                'perturbations_scored': len(rows) - 1,
+                'features': feature_results
+            }
+            
+            if pairwise:
+                result['pairwise'] = [
+                    {
+                        'features': [expected_features[i], expected_features[j]],
+                        'lowest': min(entries, key=lambda e: e['delta']),
+                        'highest': max(entries, key=lambda e: e['delta'])
+                    }
+                    for (i, j), entries in pairs.items()
+                ]
+            
+            return result
+        
+        except Exception as e:
+            return {'error': f'Sensitivity analysis failed: {str(e)}'}
+    
     def _calculate_risk_level(self, risk_percentage):
         """Calculate risk level based on percentage"""
         if risk_percentage < 33:
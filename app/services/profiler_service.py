@@ -0,0 +1,287 @@
+"""
+Profiler Service - On-Demand Stack Sampling and Allocation Tracking
+An administrator can profile a live worker: a background thread samples the
+stacks of the threads serving requests (all of them, or only those of one
+endpoint) every few milliseconds, for a time window or until that endpoint
+has served N requests, optionally with tracemalloc tracing allocations.
+Results are kept as collapsed stacks (flame graph input) and a table of the
+largest allocation sites.
+Overhead is the sampler's CPU time over each one-second window: sampling
+backs off when a window costs more than half the cap, and the session stops
+itself when a second window in a row (or one at the longest interval) is
+above the cap, after PROFILER_MAX_SECONDS, or when it is done.
+tracemalloc slows every allocation of the process rather than the sampler,
+so it is bounded on its own: allocation tracing ends, and its results are
+kept, after PROFILER_MAX_TRACE_SECONDS or once its traces use
+PROFILER_MAX_TRACE_MB. Sessions are per worker process
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from flask import request
+
+# Frames kept per sampled stack and per traced allocation
+MAX_STACK_DEPTH = 128
+TRACEMALLOC_FRAMES = 16
+
+# Sampling interval limits, in seconds
+MIN_INTERVAL = 0.001
+MAX_INTERVAL = 0.1
+
+# Seconds over which the sampling overhead is measured
+OVERHEAD_WINDOW = 1.0
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profiling session is already running in this worker"""
+
+
+class ProfileSession:
+    """One profiling run and its results"""
+
+    def __init__(self, seconds, endpoint, requests, interval, trace_memory):
+        self.seconds = seconds
+        self.endpoint = endpoint
+        self.requests = requests
+        self.remaining = requests
+        self.interval = interval
+        self.trace_memory = trace_memory
+        self.tracing = trace_memory
+        self.started_at = datetime.utcnow()
+        self.started = time.monotonic()
+        self.finished_at = None
+        self.stop_reason = None
+        self.stacks = Counter()
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.window_started = self.started
+        self.window_sampling = 0.0
+        self.over_cap = False
+        self.allocations = None
+        self.stop_event = threading.Event()
+        self.finished = threading.Event()
+
+    @property
+    def active(self):
+        return not self.finished.is_set()
+
+    def overhead(self):
+        elapsed = time.monotonic() - self.started
+        return self.sampling_seconds / elapsed if elapsed > 0 else 0.0
+
+    def collapsed(self):
+        """Collapsed stacks, one 'frame;frame;frame count' line per distinct stack"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def status(self):
+        return {
+            'active': self.active,
+            'endpoint': self.endpoint,
+            'requests': self.requests,
+            'requests_remaining': self.remaining,
+            'seconds': self.seconds,
+            'interval_ms': round(self.interval * 1000, 2),
+            'trace_memory': self.trace_memory,
+            'tracing': self.tracing,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'stop_reason': self.stop_reason,
+            'samples': self.samples,
+            'distinct_stacks': len(self.stacks),
+            'overhead': round(self.overhead(), 4)
+        }
+
+
+class Profiler:
+    """Runs at most one profiling session at a time in this worker"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.session = None
+        self.last = None
+        # Threads currently serving a request, and the endpoint they serve
+        self.request_threads = {}
+        # Collapsed name of each code object seen, as shortening its path is the costly part of a sample
+        self.frame_names = {}
+        self.max_seconds = 300
+        self.max_requests = 1000
+        self.max_overhead = 0.05
+        self.default_interval = 0.01
+        self.max_trace_seconds = 30
+        self.max_trace_bytes = 32 * 1024 * 1024
+        self.root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    def init_app(self, app):
+        """Read the profiler limits of an application and track its request threads"""
+        self.max_seconds = app.config.get('PROFILER_MAX_SECONDS', 300)
+        self.max_requests = app.config.get('PROFILER_MAX_REQUESTS', 1000)
+        self.max_overhead = app.config.get('PROFILER_MAX_OVERHEAD', 0.05)
+        self.default_interval = app.config.get('PROFILER_INTERVAL_MS', 10) / 1000
+        self.max_trace_seconds = app.config.get('PROFILER_MAX_TRACE_SECONDS', 30)
+        self.max_trace_bytes = app.config.get('PROFILER_MAX_TRACE_MB', 32) * 1024 * 1024
+        app.before_request(self._request_started)
+        app.teardown_request(self._request_finished)
+
+    def _request_started(self):
+        # Always tracked (one dict write) so requests already running when a session starts are sampled
+        self.request_threads[threading.get_ident()] = request.endpoint
+
+    def _request_finished(self, error):
+        endpoint = self.request_threads.pop(threading.get_ident(), None)
+        session = self.session
+        if session is None or session.requests is None or endpoint != session.endpoint:
+            return
+        with self.lock:
+            session.remaining -= 1
+            if session.remaining <= 0:
+                self._request_stop(session, 'requests done')
+
+    def start(self, seconds=None, endpoint=None, requests=None, interval_ms=None, trace_memory=False):
+        """Start a session for a time window and/or the next N requests of an endpoint"""
+        seconds = min(seconds or self.max_seconds, self.max_seconds)
+        if requests is not None:
+            requests = min(requests, self.max_requests)
+        interval = self.default_interval if interval_ms is None else interval_ms / 1000
+        interval = min(max(interval, MIN_INTERVAL), MAX_INTERVAL)
+
+        with self.lock:
+            if self.session is not None:
+                raise ProfilerBusyError('A profiling session is already running')
+            session = ProfileSession(seconds, endpoint, requests, interval, trace_memory)
+            self.session = session
+
+        session.owns_tracemalloc = trace_memory and not tracemalloc.is_tracing()
+        if session.owns_tracemalloc:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        threading.Thread(target=self._run, args=(session,), name='profiler', daemon=True).start()
+        return session.status()
+
+    def stop(self, reason='stopped'):
+        """Stop the running session and wait for its results"""
+        session = self.session
+        if session is None:
+            return None
+        with self.lock:
+            self._request_stop(session, reason)
+        session.finished.wait(5)
+        return session.status()
+
+    def _request_stop(self, session, reason):
+        if session.stop_reason is None:
+            session.stop_reason = reason
+        session.stop_event.set()
+
+    def _short_path(self, path):
+        if 'site-packages' in path:
+            return path.split('site-packages' + os.sep, 1)[-1]
+        if path.startswith(self.root):
+            return os.path.relpath(path, self.root)
+        return path
+
+    def _frame_name(self, code):
+        name = self.frame_names.get(code)
+        if name is None:
+            name = f'{self._short_path(code.co_filename)}:{code.co_name}'.replace(';', ':').replace(' ', '_')
+            self.frame_names[code] = name
+        return name
+
+    def _collapse(self, frame, endpoint):
+        names = []
+        while frame is not None and len(names) < MAX_STACK_DEPTH:
+            names.append(self._frame_name(frame.f_code))
+            frame = frame.f_back
+        names.append(f'endpoint:{endpoint}')
+        return ';'.join(reversed(names))
+
+    def _sample(self, session):
+        frames = sys._current_frames()
+        for ident, endpoint in list(self.request_threads.items()):
+            if session.endpoint is not None and endpoint != session.endpoint:
+                continue
+            frame = frames.get(ident)
+            if frame is not None:
+                session.stacks[self._collapse(frame, endpoint)] += 1
+                session.samples += 1
+
+    def _run(self, session):
+        deadline = session.started + session.seconds
+        try:
+            while not session.stop_event.wait(session.interval):
+                now = time.monotonic()
+                if now >= deadline:
+                    self._request_stop(session, 'time window ended')
+                    break
+                if session.tracing and (
+                    now - session.started >= self.max_trace_seconds
+                    or tracemalloc.get_tracemalloc_memory() >= self.max_trace_bytes
+                ):
+                    self._stop_tracing(session)
+
+                # CPU time, so waiting for the GIL held by the sampled threads does not count
+                started = time.thread_time()
+                self._sample(session)
+                spent = time.thread_time() - started
+                session.sampling_seconds += spent
+                session.window_sampling += spent
+
+                window = time.monotonic() - session.window_started
+                if window >= OVERHEAD_WINDOW and not self._check_overhead(session, session.window_sampling / window):
+                    break
+        finally:
+            self._finish(session)
+
+    def _check_overhead(self, session, overhead):
+        """Back off after a window above half the cap; False once the session had to stop"""
+        if overhead > self.max_overhead and (session.over_cap or session.interval >= MAX_INTERVAL):
+            self._request_stop(session, 'overhead cap exceeded')
+            return False
+        session.over_cap = overhead > self.max_overhead
+        if overhead > self.max_overhead / 2:
+            # Aim the next window at a quarter of the cap
+            session.interval = min(session.interval * overhead * 4 / self.max_overhead, MAX_INTERVAL)
+        session.window_started = time.monotonic()
+        session.window_sampling = 0.0
+        return True
+
+    def _stop_tracing(self, session):
+        """Keep the largest allocation sites and stop tracemalloc if this session started it"""
+        if not tracemalloc.is_tracing():
+            session.tracing = False
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>')
+        ])
+        if session.owns_tracemalloc:
+            tracemalloc.stop()
+        session.allocations = [
+            {
+                'site': f'{self._short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}',
+                'size_kib': round(stat.size / 1024, 1),
+                'count': stat.count,
+                'traceback': [f'{self._short_path(frame.filename)}:{frame.lineno}' for frame in stat.traceback]
+            }
+            for stat in snapshot.statistics('traceback')[:50]
+        ]
+        session.tracing = False
+
+    def _finish(self, session):
+        if session.tracing:
+            self._stop_tracing(session)
+        session.finished_at = datetime.utcnow()
+        with self.lock:
+            if self.session is session:
+                self.session = None
+            self.last = session
+        session.finished.set()
+
+    def current(self):
+        """The running session, or else the last finished one"""
+        return self.session or self.last
+
+
+profiler = Profiler()
@@ -0,0 +1,283 @@
+"""
+Report Storage Service - Sharded Report Files, Orphan Sweeping and Quota Eviction
+Report PDFs live in two levels of hashed subdirectories under REPORTS_PATH
+(at most 256 entries per directory level) instead of one flat directory, and
+every file's size and last access are tracked in the report_files table.
+A periodic sweeper moves files left in the old flat layout into their shard,
+removes files whose prediction is gone, forgets files that disappeared, and
+evicts the least recently used reports while the directory is over its
+quota, marking their predictions as having no report so the next download
+generates it again.
+Reports of archived predictions are swept as orphans: the archive has no PDF view
+"""
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app import db
+from app.models.prediction import Prediction
+from app.models.report_file import ReportFile
+from app.models.prediction_change import PredictionChange
+from app.services.change_log_service import change_log
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: sweeps are not coordinated between processes
+    fcntl = None
+
+
+FILE_PREFIX = 'report_'
+FILE_SUFFIX = '.pdf'
+
+# Temporary files older than this were left by a crashed report generation
+STALE_TEMP_SECONDS = 3600
+
+
+class ReportStorageService:
+    """Service for placing, tracking and sweeping generated report files"""
+
+    # Downloads update last_accessed at most this often per report
+    ACCESS_RESOLUTION = timedelta(hours=1)
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.quota_bytes = 1024 * 1024 * 1024
+        self.quota_target = 0.9
+        self.sweep_interval = 0
+        self.last_sweep = None
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def init_app(self, app):
+        """Read the storage settings of an application and start its sweeper"""
+        self.quota_bytes = app.config.get('REPORTS_QUOTA_MB', 1024) * 1024 * 1024
+        self.quota_target = app.config.get('REPORTS_QUOTA_TARGET', 0.9)
+        self.sweep_interval = app.config.get('REPORT_SWEEP_INTERVAL', 0)
+        if self.sweep_interval and (self.thread is None or not self.thread.is_alive()):
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, args=(app,), name='report-sweeper', daemon=True)
+            self.thread.start()
+
+    def _run(self, app):
+        while not self.stop_event.wait(self.sweep_interval):
+            with app.app_context():
+                try:
+                    self.sweep()
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception('Report sweep failed')
+                finally:
+                    db.session.remove()
+
+    def stop(self):
+        self.stop_event.set()
+
+    @property
+    def root(self):
+        return Config.REPORTS_PATH
+
+    def relative_path(self, report_id):
+        """Sharded location of a report, relative to REPORTS_PATH"""
+        digest = hashlib.sha1(report_id.encode()).hexdigest()
+        return os.path.join(digest[:2], digest[2:4], f'{FILE_PREFIX}{report_id}{FILE_SUFFIX}')
+
+    def path_for(self, report_id):
+        """Absolute sharded path of a report, creating its directory"""
+        path = os.path.join(self.root, self.relative_path(report_id))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def register(self, prediction, path):
+        """Record a freshly written report (commit with the prediction)"""
+        now = datetime.utcnow()
+        record = ReportFile.query.filter_by(report_id=prediction.report_id).first()
+        if record is None:
+            record = ReportFile(report_id=prediction.report_id, created_at=now)
+            db.session.add(record)
+        record.prediction_id = prediction.id
+        record.path = os.path.relpath(path, self.root)
+        record.size = os.path.getsize(path)
+        record.last_accessed = now
+        if not prediction.report_generated:
+            change_log.record(prediction, PredictionChange.REPORT)
+        prediction.report_generated = True
+        prediction.report_path = path
+        return record
+
+    def touch(self, prediction):
+        """Note a download of a report for LRU eviction"""
+        now = datetime.utcnow()
+        updated = ReportFile.query.filter(
+            ReportFile.report_id == prediction.report_id,
+            ReportFile.last_accessed < now - self.ACCESS_RESOLUTION
+        ).update({ReportFile.last_accessed: now}, synchronize_session=False)
+        if updated:
+            db.session.commit()
+
+    def usage(self):
+        """Tracked files and their total size"""
+        files, total = db.session.query(func.count(ReportFile.id), func.coalesce(func.sum(ReportFile.size), 0)).one()
+        return files, int(total)
+
+    def _lock(self):
+        """Non-blocking lock so only one process sweeps at a time; None if another one is"""
+        os.makedirs(self.root, exist_ok=True)
+        handle = open(os.path.join(self.root, '.sweep.lock'), 'w')
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                return None
+        return handle
+
+    def sweep(self):
+        """Migrate, clean up and enforce the quota; returns what was done"""
+        handle = self._lock()
+        if handle is None:
+            return None
+        try:
+            started = time.monotonic()
+            result = {'migrated': 0, 'orphans_removed': 0, 'adopted': 0, 'missing': 0,
+                      'evicted': 0, 'bytes_freed': 0}
+            self._migrate_flat(result)
+            self._sweep_shards(result)
+            self._evict(result)
+            result['seconds'] = round(time.monotonic() - started, 3)
+            result['finished_at'] = datetime.utcnow().isoformat()
+            self.last_sweep = result
+            return result
+        finally:
+            handle.close()
+
+    def _report_id(self, name):
+        if name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX):
+            return name[len(FILE_PREFIX):-len(FILE_SUFFIX)]
+        return None
+
+    def _predictions(self, report_ids):
+        """Ids of the predictions owning the given reports, by report id"""
+        rows = db.session.query(Prediction.id, Prediction.report_id).filter(
+            Prediction.report_id.in_(report_ids)
+        ).all()
+        return {row.report_id: row.id for row in rows}
+
+    def _remove(self, path, result, orphan=True):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        result['bytes_freed'] += size
+        if orphan:
+            result['orphans_removed'] += 1
+
+    def _migrate_flat(self, result):
+        """Move reports written in the old flat layout into their shards"""
+        with os.scandir(self.root) as entries:
+            names = [entry.name for entry in entries if entry.is_file() and self._report_id(entry.name)]
+
+        for start in range(0, len(names), self.batch_size):
+            batch = {self._report_id(name): name for name in names[start:start + self.batch_size]}
+            owners = self._predictions(list(batch))
+            for report_id, name in batch.items():
+                source = os.path.join(self.root, name)
+                prediction_id = owners.get(report_id)
+                if prediction_id is None:
+                    self._remove(source, result)
+                    continue
+                target = self.path_for(report_id)
+                os.replace(source, target)
+                prediction = db.session.get(Prediction, prediction_id)
+                self.register(prediction, target)
+                result['migrated'] += 1
+            db.session.commit()
+
+    def _sweep_shards(self, result):
+        """Remove orphans, adopt untracked files and forget missing ones, one top-level shard at a time"""
+        now = time.time()
+        for top in range(256):
+            shard = f'{top:02x}'
+            on_disk = {}
+            for directory, _, names in os.walk(os.path.join(self.root, shard)):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    report_id = self._report_id(name)
+                    if report_id:
+                        on_disk[report_id] = path
+                    elif name.endswith('.tmp') and now - os.path.getmtime(path) > STALE_TEMP_SECONDS:
+                        self._remove(path, result, orphan=False)
+
+            tracked = {
+                record.report_id: record
+                for record in ReportFile.query.filter(ReportFile.path.like(f'{shard}%')).all()
+            }
+            report_ids = list(set(on_disk) | set(tracked))
+            owners = {}
+            for start in range(0, len(report_ids), self.batch_size):
+                owners.update(self._predictions(report_ids[start:start + self.batch_size]))
+
+            for report_id in report_ids:
+                path, record, prediction_id = on_disk.get(report_id), tracked.get(report_id), owners.get(report_id)
+                if prediction_id is None:
+                    if path:
+                        self._remove(path, result)
+                    if record:
+                        db.session.delete(record)
+                elif path is None:
+                    db.session.delete(record)
+                    self._forget([prediction_id])
+                    result['missing'] += 1
+                elif record is None:
+                    self.register(db.session.get(Prediction, prediction_id), path)
+                    result['adopted'] += 1
+            db.session.commit()
+
+    def _forget(self, prediction_ids):
+        """Mark predictions as having no report file"""
+        change_log.record_ids(prediction_ids, PredictionChange.REPORT)
+        Prediction.query.filter(Prediction.id.in_(prediction_ids)).update(
+            {Prediction.report_generated: False, Prediction.report_path: None}, synchronize_session=False
+        )
+
+    def _evict(self, result):
+        """Delete least recently used reports until usage is back under the quota target"""
+        _, total = self.usage()
+        if total <= self.quota_bytes:
+            return
+        target = int(self.quota_bytes * self.quota_target)
+
+        while total > target:
+            records = ReportFile.query.order_by(ReportFile.last_accessed, ReportFile.id).limit(self.batch_size).all()
+            if not records:
+                break
+            evicted = []
+            for record in records:
+                if total <= target:
+                    break
+                self._remove(os.path.join(self.root, record.path), result, orphan=False)
+                total -= record.size
+                evicted.append(record)
+            self._forget([record.prediction_id for record in evicted])
+            ReportFile.query.filter(ReportFile.id.in_([record.id for record in evicted])).delete(
+                synchronize_session=False
+            )
+            db.session.commit()
+            result['evicted'] += len(evicted)
+
+    def stats(self):
+        """Disk usage against the quota and the outcome of the last sweep"""
+        files, total = self.usage()
+        return {
+            'files': files,
+            'bytes': total,
+            'quota_bytes': self.quota_bytes,
+            'sweep_interval': self.sweep_interval,
+            'last_sweep': self.last_sweep
+        }
+
+
+report_storage = ReportStorageService()
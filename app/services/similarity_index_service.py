@@ -0,0 +1,208 @@
+"""
+Similarity Index Service - Nearest Past Cases by Symptom Vector
+Each disease has an append-only record file of (prediction id, user id,
+normalized feature vector) that is memory-mapped and scanned with one
+matrix-vector product per query, over the owner's rows only unless an
+admin searches every user. Deleted predictions are recorded in a
+tombstone file and dropped from results until the next rebuild
+"""
+import json
+import os
+import threading
+import numpy as np
+from app import db
+from app.models.prediction import Prediction
+from app.services.prediction_service import PredictionService
+from config import Config
+
+
+class _DiseaseIndex:
+    """Memory-mapped vectors of one disease"""
+
+    def __init__(self, path, dtype):
+        self.path = path
+        self.dtype = dtype
+        self.lock = threading.Lock()
+        # (records, norms, ids, user_ids, deleted), replaced as a whole so a query
+        # never sees arrays from two different versions of the files
+        self.snapshot = (
+            np.zeros(0, dtype=dtype),
+            np.zeros(0, dtype=np.float32),
+            np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=np.int64)
+        )
+        self.signature = (None, -1)
+        self.deleted_size = -1
+
+    def refresh(self):
+        """Remap the files if another process appended to or rebuilt them; returns the current snapshot"""
+        with self.lock:
+            records, norms, ids, user_ids, deleted = self.snapshot
+            stat = os.stat(self.path) if os.path.exists(self.path) else None
+            signature = (stat.st_ino, stat.st_size) if stat else (None, 0)
+            if signature != self.signature:
+                count = signature[1] // self.dtype.itemsize
+                if count:
+                    records = np.memmap(self.path, dtype=self.dtype, mode='r', shape=(count,))
+                else:
+                    records = np.zeros(0, dtype=self.dtype)
+
+                # Appends only need the new rows; ids, owners and norms are kept contiguous in memory
+                start = len(norms) if signature[0] == self.signature[0] and count >= len(norms) else 0
+                added = records[start:]
+                vectors = added['vector']
+                norms = np.concatenate([norms[:start], np.einsum('ij,ij->i', vectors, vectors)])
+                ids = np.concatenate([ids[:start], added['id']])
+                user_ids = np.concatenate([user_ids[:start], added['user_id']])
+
+            tombstones = self.path + '.deleted'
+            size = os.path.getsize(tombstones) if os.path.exists(tombstones) else 0
+            if size != self.deleted_size:
+                deleted = np.fromfile(tombstones, dtype=np.int64) if size else np.zeros(0, dtype=np.int64)
+
+            self.snapshot = (records, norms, ids, user_ids, deleted)
+            self.signature = signature
+            self.deleted_size = size
+            return self.snapshot
+
+
+class SimilarityIndexService:
+    """Service for per-disease nearest-neighbour search over prediction inputs"""
+
+    def __init__(self, index_path=None, prediction_service=None):
+        self.index_path = index_path or Config.SIMILARITY_INDEX_PATH
+        self.prediction_service = prediction_service or PredictionService()
+        self.indexes = {}
+        self.lock = threading.Lock()
+
+        # Map whatever was built before this process started
+        for disease_type in self.prediction_service.disease_features:
+            if os.path.exists(self._path(disease_type)):
+                self._get_index(disease_type)
+
+    def _path(self, disease_type):
+        return os.path.join(self.index_path, f'{disease_type}.vectors')
+
+    def _dtype(self, disease_type):
+        dimensions = len(self.prediction_service.disease_features[disease_type])
+        return np.dtype([('id', '<i8'), ('user_id', '<i8'), ('vector', '<f4', (dimensions,))])
+
+    def _get_index(self, disease_type):
+        """Return a consistent (records, norms, ids, user_ids, deleted) snapshot of a disease index"""
+        with self.lock:
+            if disease_type not in self.indexes:
+                self.indexes[disease_type] = _DiseaseIndex(self._path(disease_type), self._dtype(disease_type))
+            index = self.indexes[disease_type]
+        return index.refresh()
+
+    def get_vector(self, disease_type, features):
+        """Scale each feature to 0..1 by its input range so no single feature dominates the distance"""
+        values = np.array(self.prediction_service.get_feature_values(disease_type, features), dtype=np.float32)
+        ranges = self.prediction_service.feature_ranges[disease_type]
+        lows = np.array([ranges[f][0] for f in self.prediction_service.disease_features[disease_type]], dtype=np.float32)
+        highs = np.array([ranges[f][1] for f in self.prediction_service.disease_features[disease_type]], dtype=np.float32)
+        return (values - lows) / np.maximum(highs - lows, 1)
+
+    def _record(self, disease_type, prediction_id, user_id, features):
+        record = np.zeros(1, dtype=self._dtype(disease_type))
+        record['id'] = prediction_id
+        record['user_id'] = user_id
+        record['vector'] = self.get_vector(disease_type, features)
+        return record
+
+    def _append(self, path, data):
+        # A single O_APPEND write keeps records whole when several workers append
+        os.makedirs(self.index_path, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def add_prediction(self, prediction):
+        """Append a committed prediction to its disease index"""
+        if prediction.disease_type not in self.prediction_service.disease_features:
+            return
+        record = self._record(prediction.disease_type, prediction.id, prediction.user_id,
+                              prediction.get_input_features())
+        self._append(self._path(prediction.disease_type), record.tobytes())
+
+    def remove_prediction(self, prediction):
+        """Tombstone a deleted prediction"""
+        self.remove_predictions(prediction.disease_type, [prediction.id])
+
+    def remove_predictions(self, disease_type, prediction_ids):
+        """Tombstone several deleted predictions of one disease with a single write"""
+        if prediction_ids and os.path.exists(self._path(disease_type)):
+            self._append(self._path(disease_type) + '.deleted',
+                         np.array(prediction_ids, dtype=np.int64).tobytes())
+
+    def rebuild(self, disease_type, batch_size=5000):
+        """Rewrite a disease index from the stored predictions, dropping tombstoned entries"""
+        path = self._path(disease_type)
+        temp_path = path + '.tmp'
+        os.makedirs(self.index_path, exist_ok=True)
+        last_id = 0
+        count = 0
+
+        with open(temp_path, 'wb') as f:
+            while True:
+                rows = db.session.query(
+                    Prediction.id, Prediction.user_id, Prediction.input_features
+                ).filter(
+                    Prediction.disease_type == disease_type,
+                    Prediction.id > last_id
+                ).order_by(Prediction.id).limit(batch_size).all()
+                if not rows:
+                    break
+
+                records = np.zeros(len(rows), dtype=self._dtype(disease_type))
+                for i, row in enumerate(rows):
+                    features = json.loads(row.input_features) if row.input_features else {}
+                    records[i]['id'] = row.id
+                    records[i]['user_id'] = row.user_id
+                    records[i]['vector'] = self.get_vector(disease_type, features)
+                f.write(records.tobytes())
+                count += len(rows)
+                last_id = rows[-1].id
+
+        os.replace(temp_path, path)
+        if os.path.exists(path + '.deleted'):
+            os.remove(path + '.deleted')
+        with self.lock:
+            self.indexes.pop(disease_type, None)
+        return count
+
+    def query(self, disease_type, features, k=10, user_id=None, exclude_id=None):
+        """Return up to k (prediction_id, distance) pairs, nearest first"""
+        records, norms, all_ids, user_ids, deleted = self._get_index(disease_type)
+        if not len(records):
+            return []
+
+        # Restrict to one owner's rows first so per-user queries stay small
+        if user_id is not None:
+            rows = np.flatnonzero(user_ids == user_id)
+            vectors = records['vector'][rows]
+        else:
+            rows = np.arange(len(records))
+            vectors = records['vector']
+
+        # |x - q|^2 = |x|^2 - 2 x.q + |q|^2 as one matrix-vector product
+        q = self.get_vector(disease_type, features)
+        distances = norms[rows] - 2 * (vectors @ q) + q @ q
+        ids = all_ids[rows]
+
+        valid = np.ones(len(rows), dtype=bool)
+        if exclude_id is not None:
+            valid &= ids != exclude_id
+        if deleted.size:
+            valid &= ~np.isin(ids, deleted)
+
+        candidates = np.flatnonzero(valid)
+        if candidates.size > k:
+            nearest = np.argpartition(distances[candidates], k)[:k]
+            candidates = candidates[nearest]
+        candidates = candidates[np.argsort(distances[candidates], kind='stable')]
+
+        return [(int(ids[i]), float(np.sqrt(max(distances[i], 0.0)))) for i in candidates]
@@ -0,0 +1,215 @@
+"""
+User Cache Service - Logged-In User Loading without a Query per Request
+Flask-Login loads the current user on every request. Loaded users are kept
+as read-only snapshots for a short TTL and dropped as soon as their row
+changes, so the dashboard and its analytics calls skip the users table.
+Optionally the snapshot also travels in the signed session cookie
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from flask import session
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app import db
+from app.models.user import User
+from app.models.prediction import Prediction
+
+
+SESSION_KEY = '_user_snapshot'
+PENDING_KEY = 'user_cache_pending'
+
+
+class UserSnapshot(UserMixin):
+    """Read-only copy of a user's profile, safe to share between requests"""
+
+    FIELDS = ('id', 'username', 'email', 'full_name', 'age', 'gender', 'phone',
+              'is_admin', 'is_active', 'email_notifications', 'created_at', 'last_login')
+    DATE_FIELDS = ('created_at', 'last_login')
+
+    # Plain attribute rather than UserMixin's property, so the stored flag is used
+    is_active = True
+
+    def __init__(self, **fields):
+        for field in self.FIELDS:
+            object.__setattr__(self, field, fields.get(field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('UserSnapshot is read-only; change the record from get_record()')
+
+    @classmethod
+    def from_user(cls, user):
+        """Copy the fields of a User row"""
+        return cls(**{field: getattr(user, field) for field in cls.FIELDS})
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a snapshot stored with to_dict"""
+        fields = dict(data)
+        for field in cls.DATE_FIELDS:
+            if fields.get(field):
+                fields[field] = datetime.fromisoformat(fields[field])
+        return cls(**fields)
+
+    def to_dict(self):
+        """Plain values for the session cookie"""
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        for field in self.DATE_FIELDS:
+            if data[field]:
+                data[field] = data[field].isoformat()
+        return data
+
+    def get_record(self):
+        """Load the User row, for changes"""
+        return db.session.get(User, self.id)
+
+    def get_prediction_count(self):
+        """Get the total number of predictions made by the user"""
+        return Prediction.query.filter_by(user_id=self.id).count()
+
+    def get_recent_predictions(self, limit=10):
+        """Get the most recent predictions"""
+        return Prediction.query.options(Prediction.list_options()).filter_by(
+            user_id=self.id
+        ).order_by(Prediction.created_at.desc()).limit(limit).all()
+
+    def __repr__(self):
+        return f'<UserSnapshot {self.username}>'
+
+
+class UserCacheService:
+    """Per-process TTL cache of user snapshots for the Flask-Login user loader"""
+
+    def __init__(self, ttl=60, max_size=10000, session_snapshot=False):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.session_snapshot = session_snapshot
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def init_app(self, app):
+        """Read the cache settings of an application"""
+        self.ttl = app.config.get('USER_CACHE_TTL', 60)
+        self.max_size = app.config.get('USER_CACHE_MAX_SIZE', 10000)
+        self.session_snapshot = app.config.get('USER_SESSION_SNAPSHOT', False)
+        self.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.session_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id):
+        """Cached snapshot of a user, or None if missing or expired"""
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            expires, snapshot = entry
+            if expires <= time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return snapshot
+
+    def put(self, snapshot):
+        with self.lock:
+            self.entries[snapshot.id] = (time.monotonic() + self.ttl, snapshot)
+            self.entries.move_to_end(snapshot.id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """Drop a user so the next request reads the row again"""
+        self.invalidations += 1
+        self.drop(user_id)
+
+    def drop(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.reset_stats()
+
+    def _from_session(self, user_id):
+        data = session.get(SESSION_KEY)
+        if not data or data.get('fields', {}).get('id') != user_id:
+            return None
+        if data.get('loaded_at', 0) + self.ttl <= time.time():
+            return None
+        return UserSnapshot.from_dict(data['fields'])
+
+    def _to_session(self, snapshot):
+        session[SESSION_KEY] = {'fields': snapshot.to_dict(), 'loaded_at': time.time()}
+
+    def clear_session(self):
+        """Forget the snapshot carried in the current session"""
+        session.pop(SESSION_KEY, None)
+
+    def load_user(self, user_id):
+        """Flask-Login user loader; deactivated users are treated as logged out"""
+        user_id = int(user_id)
+        snapshot = None
+
+        if self.session_snapshot:
+            snapshot = self._from_session(user_id)
+            if snapshot is not None:
+                self.session_hits += 1
+
+        if snapshot is None:
+            snapshot = self.get(user_id)
+            if snapshot is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                user = db.session.get(User, user_id)
+                if user is None:
+                    return None
+                snapshot = UserSnapshot.from_user(user)
+                if self.ttl > 0:
+                    self.put(snapshot)
+            if self.session_snapshot:
+                self._to_session(snapshot)
+
+        if snapshot.is_active is False:
+            return None
+        return snapshot
+
+    def stats(self):
+        """Hit rate and size of the cache"""
+        lookups = self.hits + self.session_hits + self.misses
+        return {
+            'size': len(self.entries),
+            'ttl': self.ttl,
+            'session_snapshot': self.session_snapshot,
+            'hits': self.hits,
+            'session_hits': self.session_hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': round((self.hits + self.session_hits) / lookups * 100, 2) if lookups else 0
+        }
+
+
+user_cache = UserCacheService()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    # Drop now, and again once committed in case another request cached the old row meanwhile
+    user_cache.invalidate(target.id)
+    orm_session = object_session(target)
+    if orm_session is not None:
+        orm_session.info.setdefault(PENDING_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _user_changes_committed(orm_session):
+    for user_id in orm_session.info.pop(PENDING_KEY, ()):
+        user_cache.drop(user_id)
@@ -0,0 +1,199 @@
+// API URLs come from the script tag's data attributes
+const analyticsUrls = document.currentScript.dataset;
+
+// Configure Chart.js defaults
+Chart.defaults.font.family = 'Inter, sans-serif';
+Chart.defaults.color = '#2C3E50';
+
+// Charts, kept to apply live updates
+const charts = {};
+
+// Fetch analytics data
+async function loadAnalytics() {
+    try {
+        // Overview data
+        const overviewResponse = await fetch(analyticsUrls.overviewUrl);
+        const overview = await overviewResponse.json();
+
+        // Trends data
+        const trendsResponse = await fetch(analyticsUrls.trendsUrl);
+        const trends = await trendsResponse.json();
+
+        // Create charts, or refresh them after a resync
+        Object.values(charts).forEach(chart => chart.destroy());
+        charts.risk = createRiskChart(overview.risk_distribution);
+        charts.disease = createDiseaseChart(overview.disease_distribution);
+        charts.trends = createTrendsChart(trends);
+
+    } catch (error) {
+        console.error('Error loading analytics:', error);
+    }
+}
+
+// Add (sign 1) or remove (sign -1) one prediction from a chart's label
+function adjustChart(chart, label, sign) {
+    if (!chart || !label) {
+        return;
+    }
+    const labels = chart.data.labels;
+    const values = chart.data.datasets[0].data;
+    let index = labels.indexOf(label);
+    if (index === -1) {
+        if (sign < 0) {
+            return;
+        }
+        labels.push(label);
+        values.push(0);
+        index = labels.length - 1;
+    }
+    values[index] = Math.max(0, values[index] + sign);
+    chart.update();
+}
+
+function applyDelta(prediction, sign) {
+    const riskLabels = {Low: 'Low Risk', Medium: 'Medium Risk', High: 'High Risk'};
+    adjustChart(charts.risk, riskLabels[prediction.risk_level], sign);
+    adjustChart(charts.disease, prediction.disease, sign);
+    adjustChart(charts.trends, prediction.month, sign);
+}
+
+// Live updates: deltas of new and deleted predictions instead of reloading every aggregate
+function subscribeAnalytics() {
+    if (!window.EventSource || !analyticsUrls.streamUrl) {
+        return;
+    }
+    const events = new EventSource(analyticsUrls.streamUrl);
+    events.addEventListener('created', event => applyDelta(JSON.parse(event.data), 1));
+    events.addEventListener('deleted', event => applyDelta(JSON.parse(event.data), -1));
+    events.addEventListener('resync', loadAnalytics);
+}
+
+// Risk Distribution Doughnut Chart
+function createRiskChart(data) {
+    const ctx = document.getElementById('riskChart').getContext('2d');
+    return new Chart(ctx, {
+        type: 'doughnut',
+        data: {
+            labels: ['Low Risk', 'Medium Risk', 'High Risk'],
+            datasets: [{
+                data: [data.Low || 0, data.Medium || 0, data.High || 0],
+                backgroundColor: [
+                    '#4CAF50',
+                    '#FF9800',
+                    '#F44336'
+                ],
+                borderWidth: 0
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: true,
+            plugins: {
+                legend: {
+                    position: 'bottom',
+                    labels: {
+                        padding: 20,
+                        font: {
+                            size: 12
+                        }
+                    }
+                }
+            }
+        }
+    });
+}
+
+// Disease Distribution Bar Chart
+function createDiseaseChart(data) {
+    const ctx = document.getElementById('diseaseChart').getContext('2d');
+    const labels = Object.keys(data);
+    const values = Object.values(data);
+
+    return new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: labels,
+            datasets: [{
+                label: 'Number of Predictions',
+                data: values,
+                backgroundColor: 'rgba(102, 126, 234, 0.8)',
+                borderColor: 'rgba(102, 126, 234, 1)',
+                borderWidth: 2,
+                borderRadius: 8
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: true,
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    ticks: {
+                        stepSize: 1
+                    }
+                },
+                x: {
+                    ticks: {
+                        maxRotation: 45,
+                        minRotation: 45
+                    }
+                }
+            },
+            plugins: {
+                legend: {
+                    display: false
+                }
+            }
+        }
+    });
+}
+
+// Trends Line Chart
+function createTrendsChart(data) {
+    const ctx = document.getElementById('trendsChart').getContext('2d');
+
+    return new Chart(ctx, {
+        type: 'line',
+        data: {
+            labels: data.labels,
+            datasets: [{
+                label: 'Predictions per Month',
+                data: data.data,
+                fill: true,
+                backgroundColor: 'rgba(102, 126, 234, 0.1)',
+                borderColor: 'rgba(102, 126, 234, 1)',
+                borderWidth: 3,
+                tension: 0.4,
+                pointRadius: 5,
+                pointBackgroundColor: 'rgba(102, 126, 234, 1)',
+                pointBorderColor: '#fff',
+                pointBorderWidth: 2,
+                pointHoverRadius: 7
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: true,
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    ticks: {
+                        stepSize: 1
+                    }
+                }
+            },
+            plugins: {
+                legend: {
+                    display: true,
+                    position: 'top'
+                }
+            }
+        }
+    });
+}
+
+// Load analytics on page load, then keep them current
+document.addEventListener('DOMContentLoaded', () => {
+    loadAnalytics();
+    subscribeAnalytics();
+});
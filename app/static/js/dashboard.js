@@ -0,0 +1,57 @@
+// Live updates of the prediction count and recent predictions; URLs come from data attributes
+var dashboardUrls = document.currentScript.dataset;
+
+function recentItem(prediction) {
+    var item = document.createElement('div');
+    item.className = 'prediction-item';
+    item.dataset.predictionId = prediction.id;
+
+    var left = document.createElement('div');
+    var name = document.createElement('strong');
+    name.style.color = 'var(--text-primary)';
+    name.textContent = prediction.disease;
+    var date = document.createElement('small');
+    date.style.color = 'var(--text-light)';
+    date.textContent = prediction.date;
+    left.append(name, document.createElement('br'), date);
+
+    var right = document.createElement('div');
+    right.style.textAlign = 'right';
+    var badge = document.createElement('span');
+    badge.className = 'risk-badge ' + (prediction.risk_level || 'low').toLowerCase();
+    badge.textContent = (prediction.risk_level || 'Unknown') + ' Risk';
+    var link = document.createElement('a');
+    link.href = dashboardUrls.resultUrl.replace('{id}', prediction.id);
+    link.style.fontSize = '0.875rem';
+    link.textContent = 'View Report →';
+    right.append(badge, document.createElement('br'), link);
+
+    item.append(left, right);
+    return item;
+}
+
+function adjustTotal(sign) {
+    var total = document.getElementById('totalPredictions');
+    total.textContent = Math.max(0, parseInt(total.textContent, 10) + sign);
+}
+
+if (window.EventSource && dashboardUrls.streamUrl) {
+    var events = new EventSource(dashboardUrls.streamUrl);
+    events.addEventListener('created', function (event) {
+        var prediction = JSON.parse(event.data);
+        adjustTotal(1);
+        var list = document.getElementById('recentPredictions');
+        if (!list) { return; }
+        list.insertBefore(recentItem(prediction), list.firstChild);
+        var items = list.querySelectorAll('.prediction-item');
+        if (items.length > 5) { items[items.length - 1].remove(); }
+    });
+    events.addEventListener('deleted', function (event) {
+        var prediction = JSON.parse(event.data);
+        adjustTotal(-1);
+        var item = document.querySelector('[data-prediction-id="' + prediction.id + '"]');
+        if (item) { item.remove(); }
+    });
+    // Too far behind to apply deltas: render the dashboard again
+    events.addEventListener('resync', function () { window.location.reload(); });
+}
@@ -0,0 +1,19 @@
+// API URLs come from the script tag's data attributes
+var predictionUrls = document.currentScript.dataset;
+var form = document.getElementById('predictionForm');
+var loadingOverlay = document.getElementById('loadingOverlay');
+form.addEventListener('submit', function (e) {
+    e.preventDefault();
+    loadingOverlay.classList.add('active');
+    var formData = new FormData(form);
+    var data = {};
+    formData.forEach(function (value, key) { data[key] = parseFloat(value); });
+    fetch(predictionUrls.predictUrl, {
+        method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(data)
+    }).then(function (response) { return response.json().then(function (result) { return { ok: response.ok, data: result }; }); })
+        .then(function (res) {
+            loadingOverlay.classList.remove('active');
+            if (res.ok) { window.location.href = predictionUrls.resultUrl.replace('{id}', res.data.prediction_id); }
+            else { alert('Error: ' + (res.data.error || 'Prediction failed')); }
+        }).catch(function (error) { loadingOverlay.classList.remove('active'); alert('Error: ' + error.message); });
+});
@@ -0,0 +1,36 @@
+// Password strength indicator
+const passwordInput = document.getElementById('password');
+const strengthBar = document.getElementById('strengthBar');
+
+passwordInput.addEventListener('input', function () {
+    const password = this.value;
+    let strength = 0;
+
+    if (password.length >= 6) strength++;
+    if (password.length >= 10) strength++;
+    if (/[a-z]/.test(password) && /[A-Z]/.test(password)) strength++;
+    if (/\d/.test(password)) strength++;
+    if (/[^a-zA-Z0-9]/.test(password)) strength++;
+
+    strengthBar.className = 'password-strength-bar';
+
+    if (strength <= 2) {
+        strengthBar.classList.add('weak');
+    } else if (strength <= 4) {
+        strengthBar.classList.add('medium');
+    } else {
+        strengthBar.classList.add('strong');
+    }
+});
+
+// Password confirmation validation
+const form = document.getElementById('registerForm');
+const confirmPassword = document.getElementById('confirm_password');
+
+form.addEventListener('submit', function (e) {
+    if (passwordInput.value !== confirmPassword.value) {
+        e.preventDefault();
+        alert('Passwords do not match!');
+        confirmPassword.focus();
+    }
+});
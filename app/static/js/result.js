@@ -0,0 +1,27 @@
+// API URLs come from the script tag's data attributes
+var resultUrls = document.currentScript.dataset;
+fetch(resultUrls.similarUrl + '?k=5')
+    .then(function (response) { return response.ok ? response.json() : { similar: [] }; })
+    .then(function (data) {
+        if (!data.similar.length) { return; }
+        var list = document.getElementById('similarList');
+        data.similar.forEach(function (item) {
+            var row = document.createElement('div');
+            row.className = 'driver-item';
+            var name = document.createElement('div');
+            name.className = 'driver-name';
+            name.textContent = item.created_at ? item.created_at.slice(0, 10) : '';
+            var result = document.createElement('div');
+            result.style.flex = '1';
+            result.textContent = item.prediction_result + ' · ' + item.risk_level + ' risk';
+            var risk = document.createElement('a');
+            risk.className = 'driver-value';
+            risk.href = resultUrls.resultUrl.replace('{id}', item.id);
+            risk.textContent = item.risk_percentage.toFixed(1) + '%';
+            row.appendChild(name);
+            row.appendChild(result);
+            row.appendChild(risk);
+            list.appendChild(row);
+        });
+        document.getElementById('similarCases').style.display = 'block';
+    });
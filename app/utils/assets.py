@@ -0,0 +1,140 @@
+"""
+Asset Pipeline - Fingerprinted, Precompressed Static Bundles
+`flask build-assets` copies every stylesheet and script under app/static to
+ASSETS_DIST_PATH with a content hash in its name, next to gzip and brotli
+(when the brotli package is installed) variants compressed once at maximum
+level, and records the names in manifest.json. Templates link assets with
+asset_url('css/main.css'); with a manifest that resolves to /assets/<hashed
+name>, served in the best encoding the browser accepts with a year-long
+immutable cache lifetime, since a changed file gets a new name. Without a
+build, asset_url falls back to the plain /static file
+"""
+import gzip
+import hashlib
+import json
+import os
+from flask import abort, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BUNDLED_EXTENSIONS = ('.css', '.js')
+MANIFEST_NAME = 'manifest.json'
+
+# Variants built next to each asset, in order of preference
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+ONE_YEAR = 365 * 24 * 3600
+
+
+class AssetPipeline:
+    """Builds the fingerprinted bundles and resolves asset URLs through their manifest"""
+
+    def __init__(self):
+        self.dist_path = None
+        self.manifest = {}
+        self.max_age = ONE_YEAR
+
+    def init_app(self, app):
+        """Load the manifest of the last build and expose asset_url() to templates"""
+        self.dist_path = app.config.get('ASSETS_DIST_PATH')
+        self.max_age = app.config.get('ASSETS_MAX_AGE', ONE_YEAR)
+        self.manifest = self._load_manifest()
+        app.add_url_rule('/assets/<path:filename>', 'assets', self._serve)
+        app.add_template_global(self.url, 'asset_url')
+
+    def _load_manifest(self):
+        if not self.dist_path:
+            return {}
+        path = os.path.join(self.dist_path, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def url(self, name):
+        """URL of a static asset, fingerprinted when it has been built"""
+        built = self.manifest.get(name)
+        if built is not None:
+            return url_for('assets', filename=built)
+        return url_for('static', filename=name)
+
+    def build(self, static_folder):
+        """Fingerprint and precompress every bundled asset; returns the new manifest"""
+        if not self.dist_path:
+            raise RuntimeError('ASSETS_DIST_PATH is not set')
+        dist = os.path.abspath(self.dist_path)
+        os.makedirs(dist, exist_ok=True)
+        manifest = {}
+        for directory, subdirectories, files in os.walk(static_folder):
+            # Never bundle a previous build
+            subdirectories[:] = [d for d in subdirectories if os.path.abspath(os.path.join(directory, d)) != dist]
+            for name in files:
+                if not name.endswith(BUNDLED_EXTENSIONS):
+                    continue
+                source = os.path.join(directory, name)
+                logical = os.path.relpath(source, static_folder).replace(os.sep, '/')
+                manifest[logical] = self._build_one(source, logical)
+
+        with open(os.path.join(dist, MANIFEST_NAME + '.tmp'), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(os.path.join(dist, MANIFEST_NAME + '.tmp'), os.path.join(dist, MANIFEST_NAME))
+        self._remove_stale(dist, manifest)
+        self.manifest = manifest
+        return manifest
+
+    def _build_one(self, source, logical):
+        with open(source, 'rb') as f:
+            data = f.read()
+        stem, extension = os.path.splitext(logical)
+        built = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}'
+        target = os.path.join(self.dist_path, *built.split('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        variants = {'': lambda: data, '.gz': lambda: gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = lambda: brotli.compress(data, quality=11)
+        for suffix, compress in variants.items():
+            # Unchanged files keep the variants of an earlier build
+            if os.path.exists(target + suffix):
+                continue
+            content = compress()
+            with open(target + suffix + '.tmp', 'wb') as f:
+                f.write(content)
+            os.replace(target + suffix + '.tmp', target + suffix)
+        return built
+
+    def _remove_stale(self, dist, manifest):
+        """Delete the files of earlier builds; the previous one is kept for pages still open"""
+        keep = set(manifest.values()) | set(self.manifest.values())
+        for directory, _, files in os.walk(dist):
+            for name in files:
+                relative = os.path.relpath(os.path.join(directory, name), dist).replace(os.sep, '/')
+                base = relative[:-3] if relative.endswith(tuple(suffix for _, suffix in PRECOMPRESSED)) else relative
+                if relative != MANIFEST_NAME and base not in keep:
+                    os.remove(os.path.join(directory, name))
+
+    def _serve(self, filename):
+        if not self.dist_path or not filename.endswith(BUNDLED_EXTENSIONS):
+            abort(404)
+        encoding, served = None, filename
+        for name, suffix in PRECOMPRESSED:
+            if request.accept_encodings[name] and os.path.exists(os.path.join(self.dist_path, filename + suffix)):
+                encoding, served = name, filename + suffix
+                break
+
+        response = send_from_directory(self.dist_path, served, mimetype=_mimetype(filename), max_age=self.max_age)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+def _mimetype(filename):
+    return 'text/css' if filename.endswith('.css') else 'text/javascript'
+
+
+assets = AssetPipeline()
@@ -0,0 +1,80 @@
+"""
+Response Compression - On-the-Fly gzip for Dynamic HTML, JSON and Text
+Responses of a compressible type are gzipped for clients that accept it:
+buffered bodies when they reach COMPRESSION_MIN_SIZE, streamed bodies chunk
+by chunk (each flushed, so a stream still arrives as it is produced). Files
+sent with send_file, event streams and responses that are already encoded
+pass through untouched; prebuilt assets carry their own compressed copies
+"""
+import zlib
+from flask import request
+
+COMPRESSIBLE_MIMETYPES = frozenset([
+    'text/html', 'text/plain', 'text/css', 'text/javascript', 'text/csv',
+    'application/json', 'application/javascript', 'application/x-ndjson', 'image/svg+xml'
+])
+
+# Status codes without a body to compress
+SKIPPED_STATUS = (204, 206, 304)
+
+
+def _gzip_stream(chunks, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+class ResponseCompression:
+    """Compresses eligible responses after each request"""
+
+    def __init__(self):
+        self.enabled = False
+        self.min_size = 1024
+        self.level = 6
+
+    def init_app(self, app):
+        self.enabled = app.config.get('COMPRESSION_ENABLED', True)
+        if not self.enabled:
+            return
+        self.min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+        self.level = app.config.get('COMPRESSION_LEVEL', 6)
+        app.after_request(self._compress)
+
+    def _compress(self, response):
+        if (response.status_code < 200 or response.status_code in SKIPPED_STATUS
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        if not request.accept_encodings['gzip']:
+            return response
+
+        if response.is_streamed:
+            response.response = _gzip_stream(response.response, self.level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+            response.set_data(compressor.compress(data) + compressor.flush())
+        response.headers['Content-Encoding'] = 'gzip'
+
+        # The encoded body differs byte for byte from the one the tag was computed for
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+compression = ResponseCompression()
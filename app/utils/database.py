@@ -0,0 +1,249 @@
+"""
+Database Engine Setup - SQLite Production Mode and Read Routing
+In SQLite production mode the database runs in WAL mode with tuned pragmas.
+Every session reads from a pool of query-only connections with a deferred
+BEGIN, which WAL lets read while the writer commits; only once a transaction
+writes (a flush, a bulk statement or SELECT ... FOR UPDATE) does it check out
+the single writer connection, whose BEGIN IMMEDIATE takes the write lock,
+and it gives both back when it commits. Plain reads never wait for the writer.
+Read-only views can also be served by replica databases: replicas failing a
+health check are skipped, and a user who just wrote reads from the primary
+for a few seconds so replication lag never hides their own changes
+"""
+import itertools
+import threading
+import time
+from flask import g, has_app_context, has_request_context, session as cookie_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, false, text, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql import Select
+
+
+# Bind key of the SQLite read-only pool; replicas are replica_0, replica_1, ...
+READ_BIND = 'read'
+REPLICA_BIND = 'replica_{}'
+
+# Session key holding the time until which the user reads from the primary
+PINNED_KEY = '_db_primary_until'
+
+
+class ReplicaSet:
+    """The read binds of the application and their health"""
+
+    def __init__(self):
+        self.configure([], 10, 5)
+
+    def configure(self, binds, check_interval, pin_seconds):
+        # binds: (bind key, whether it can lag behind the primary)
+        self.binds = list(binds)
+        self.check_interval = check_interval
+        self.pin_seconds = pin_seconds
+        self.health = {}
+        self.lock = threading.Lock()
+        self.counter = itertools.count()
+
+    @property
+    def lagging(self):
+        return any(lagging for _, lagging in self.binds)
+
+    def is_healthy(self, key, engine):
+        """Last health check result, re-checked when older than the interval"""
+        now = time.monotonic()
+        with self.lock:
+            healthy, checked_at = self.health.get(key, (True, None))
+        if checked_at is not None and now - checked_at < self.check_interval:
+            return healthy
+
+        try:
+            with engine.connect() as connection:
+                connection.exec_driver_sql('SELECT 1')
+            healthy = True
+        except SQLAlchemyError:
+            healthy = False
+        with self.lock:
+            self.health[key] = (healthy, now)
+        return healthy
+
+    def choose(self, engines, pinned=False, replicas_allowed=True):
+        """Next healthy read engine in round-robin order, or None to use the primary"""
+        candidates = [
+            key for key, lagging in self.binds
+            if key in engines and not (lagging and (pinned or not replicas_allowed))
+        ]
+        if not candidates:
+            return None
+        start = next(self.counter)
+        for i in range(len(candidates)):
+            key = candidates[(start + i) % len(candidates)]
+            if self.is_healthy(key, engines[key]):
+                return engines[key]
+        return None
+
+    def stats(self):
+        return {
+            'binds': [
+                {
+                    'bind': key,
+                    'replica': lagging,
+                    'healthy': self.health.get(key, (True, None))[0]
+                }
+                for key, lagging in self.binds
+            ],
+            'check_interval': self.check_interval,
+            'read_your_writes_seconds': self.pin_seconds
+        }
+
+
+replicas = ReplicaSet()
+
+
+def _is_pinned():
+    return has_request_context() and cookie_session.get(PINNED_KEY, 0) > time.time()
+
+
+class RoutingSession(Session):
+    """Session sending SELECTs to a read engine until its transaction writes"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # Replicas may lag, so only views marked read-only use them; the SQLite
+        # read pool sees every commit and serves any read outside a write
+        if (bind is None and replicas.binds and not self._flushing and not self.info.get('wrote')
+                and isinstance(clause, Select) and clause._for_update_arg is None and has_app_context()):
+            engine = replicas.choose(
+                self._db.engines, pinned=_is_pinned(), replicas_allowed=bool(g.get('db_read_only'))
+            )
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _mark_flush(session, flush_context, instances):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _mark_statement(orm_execute_state):
+    # Bulk UPDATE/DELETE/INSERT and locking reads run on the writer, and so does
+    # the rest of their transaction, which must see what they changed
+    statement = orm_execute_state.statement
+    if not orm_execute_state.is_select or getattr(statement, '_for_update_arg', None) is not None:
+        orm_execute_state.session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _pin_after_write(session):
+    # Read-your-writes: keep this user on the primary until replicas have caught up
+    if session.info.pop('wrote', False) and replicas.lagging and has_request_context():
+        cookie_session[PINNED_KEY] = time.time() + replicas.pin_seconds
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _forget_write(session, transaction):
+    # The next transaction reads from the read engine again, whether this one committed or not
+    if transaction.parent is None:
+        session.info.pop('wrote', None)
+
+
+def lock_table(session, model):
+    """Make the transaction the only writer of a table until it ends, before it reads what it will change"""
+    dialect = session.get_bind(mapper=model.__mapper__).dialect.name
+    if dialect == 'sqlite':
+        # SQLite has one write lock, taken by the first write of a transaction: an UPDATE
+        # of no rows takes it now, and in production mode moves the transaction to the writer
+        key = model.__mapper__.primary_key[0]
+        session.execute(
+            update(model).where(false()).values({key.name: key}).execution_options(synchronize_session=False)
+        )
+    elif dialect == 'postgresql':
+        # Other writers of the table wait, readers do not
+        session.execute(text(f'LOCK TABLE {model.__tablename__} IN SHARE ROW EXCLUSIVE MODE'))
+    # Elsewhere callers rely on their own SELECT ... FOR UPDATE
+
+
+def use_read_engine():
+    """Route the rest of this request's SELECTs to a read engine"""
+    g.db_read_only = True
+
+
+def is_sqlite_file(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def configure_database(app):
+    """Add engine options and the read binds; call before db.init_app"""
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    read_binds = []
+
+    if app.config.get('SQLITE_PRODUCTION_MODE') and is_sqlite_file(uri):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+            'pool_size': 1,
+            'max_overflow': 0,
+            'pool_timeout': app.config['SQLITE_WRITER_TIMEOUT']
+        }
+        binds[READ_BIND] = {
+            'url': uri,
+            'pool_size': app.config['SQLITE_READ_POOL_SIZE'],
+            'max_overflow': 0
+        }
+        read_binds.append((READ_BIND, False))
+
+    for i, replica_uri in enumerate(app.config.get('DATABASE_REPLICA_URLS') or []):
+        key = REPLICA_BIND.format(i)
+        binds[key] = {'url': replica_uri, 'pool_pre_ping': True}
+        read_binds.append((key, True))
+
+    if binds:
+        app.config['SQLALCHEMY_BINDS'] = binds
+    replicas.configure(
+        read_binds,
+        app.config.get('REPLICA_HEALTH_CHECK_INTERVAL', 10),
+        app.config.get('READ_YOUR_WRITES_SECONDS', 5)
+    )
+
+
+def install_engine_hooks(app, db):
+    """Apply the SQLite pragmas to every new connection; call after db.init_app"""
+    production = app.config.get('SQLITE_PRODUCTION_MODE')
+    pragmas = app.config['SQLITE_PRAGMAS']
+    read_keys = {key for key, _ in replicas.binds}
+    with app.app_context():
+        engines = dict(db.engines)
+
+    for key, engine in engines.items():
+        if engine.url.get_backend_name() != 'sqlite':
+            continue
+
+        @event.listens_for(engine, 'connect')
+        def enable_foreign_keys(dbapi_connection, connection_record):
+            # SQLite ignores ON DELETE CASCADE unless foreign keys are enabled per connection
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA foreign_keys = ON')
+            cursor.close()
+
+        if not production or not is_sqlite_file(str(engine.url)):
+            continue
+        read_only = key in read_keys
+
+        @event.listens_for(engine, 'connect')
+        def set_pragmas(dbapi_connection, connection_record, read_only=read_only):
+            # Let SQLAlchemy issue BEGIN itself instead of pysqlite's implicit deferred BEGIN
+            dbapi_connection.isolation_level = None
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+            if read_only:
+                cursor.execute('PRAGMA query_only = ON')
+            cursor.close()
+
+        @event.listens_for(engine, 'begin')
+        def begin(connection, read_only=read_only):
+            # Sessions only reach the writer to write, so it takes the write lock up
+            # front: busy_timeout applies and the transaction cannot fail with
+            # "database is locked" when it upgrades from reading to writing
+            connection.exec_driver_sql('BEGIN' if read_only else 'BEGIN IMMEDIATE')
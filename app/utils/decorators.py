@@ -0,0 +1,27 @@
+"""
+Route Decorators
+"""
+from functools import wraps
+from flask import abort
+from flask_login import login_required, current_user
+from app.utils.database import use_read_engine
+
+
+def admin_required(f):
+    """Restrict a view to logged-in administrators"""
+    @wraps(f)
+    @login_required
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_admin:
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def read_only(f):
+    """Serve a view's queries from the read engine when one is configured"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        use_read_engine()
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,74 @@
+"""
+HTTP Caching - Validators and Conditional GET for Immutable Predictions
+A saved prediction does not change, so its pages and JSON get an ETag
+derived from the prediction (id, report_id and the little state that can
+change later, such as whether its report exists) plus a version of the
+templates and assets. A browser that already holds the response revalidates
+it and gets a bodiless 304 before any template is rendered.
+Responses are private to the logged-in user: they may be kept by the
+browser but never by a shared cache
+"""
+import hashlib
+import os
+from flask import Response, make_response, request, session
+
+
+class HttpCache:
+    """Computes validators and answers conditional requests"""
+
+    def __init__(self):
+        self.enabled = True
+        self.version = ''
+
+    def init_app(self, app):
+        self.enabled = app.config.get('HTTP_CACHE_ENABLED', True)
+        self.version = self._app_version(app)
+
+    def _app_version(self, app):
+        """Digest of the template and static files, so a deploy changes every tag"""
+        digest = hashlib.sha1()
+        for folder in (os.path.join(app.root_path, app.template_folder), app.static_folder):
+            for directory, subdirectories, files in os.walk(folder):
+                subdirectories.sort()
+                for name in sorted(files):
+                    stat = os.stat(os.path.join(directory, name))
+                    digest.update(f'{os.path.relpath(directory, folder)}/{name}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+        return digest.hexdigest()[:12]
+
+    def etag(self, *parts):
+        """Strong entity tag for a response built from parts"""
+        key = '|'.join(str(part) for part in (self.version, *parts))
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+    def respond(self, etag, build, last_modified=None, max_age=0):
+        """304 if the client holds etag, otherwise build() with validators; private either way"""
+        # Pending flash messages are rendered into the page, so it cannot be revalidated
+        if not self.enabled or session.get('_flashes'):
+            return make_response(build())
+
+        if request.if_none_match:
+            fresh = request.if_none_match.contains_weak(etag)
+        else:
+            fresh = last_modified is not None and request.if_modified_since is not None \
+                and last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+        response = Response(status=304) if fresh else make_response(build())
+
+        response.set_etag(etag)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        self.private(response, max_age)
+        return response
+
+    def private(self, response, max_age=0):
+        """Cache-Control for a response only the logged-in user may see"""
+        response.cache_control.public = False
+        response.cache_control.private = True
+        if max_age:
+            response.cache_control.max_age = max_age
+        else:
+            response.cache_control.no_cache = True
+        response.vary.add('Cookie')
+        return response
+
+
+http_cache = HttpCache()
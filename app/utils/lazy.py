@@ -0,0 +1,54 @@
+"""
+Lazy Services - Deferred Construction and Imports
+Route modules hold their services in module globals; wrapping the factory in
+LazyService defers the service's construction, and the heavy imports behind
+it (numpy, reportlab, joblib and sklearn, model metadata, index files), to
+the first request that touches it, so starting a worker or running a CLI
+command does not pay for services it never uses
+"""
+import threading
+from werkzeug.utils import import_string
+
+
+class LazyService:
+    """Proxy that builds its service from factory() on first attribute access"""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._instance is not None
+
+    @property
+    def instance(self):
+        """The service, built now if it has not been yet"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return instance
+
+    def reset(self):
+        """Drop the service so the next use builds it again, e.g. after its paths were reconfigured"""
+        with self._lock:
+            self._instance = None
+
+    def __getattr__(self, name):
+        # Only reached for names the proxy itself does not define
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.instance, name)
+
+    def __repr__(self):
+        state = repr(self._instance) if self.loaded else 'not loaded'
+        return f'<LazyService {state}>'
+
+
+def lazy_service(import_name, *args, **kwargs):
+    """LazyService for a class given by its dotted name, imported only when first used"""
+    return LazyService(lambda: import_string(import_name)(*args, **kwargs))
@@ -0,0 +1,252 @@
+"""
+Request Metrics - Stage Timers, Counters and a Prometheus Text Endpoint
+When METRICS_ENABLED is set, every request is timed per endpoint, database
+queries are counted and timed through SQLAlchemy engine events, and code
+wrapped in metrics.stage(...) is timed per stage; /metrics serves it all in
+the Prometheus text format. When disabled no hooks are installed and
+stage() hands back a shared no-op context manager, so instrumented code
+pays for one attribute check.
+Metrics are kept per worker process; Prometheus scrapes each worker
+"""
+import bisect
+import threading
+import time
+from flask import Response, abort, g, request
+from sqlalchemy import event
+
+# Seconds; covers sub-millisecond stages up to slow report renders
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    type = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        for labels, value in items:
+            yield self.name, _labels(self.label_names, labels), value
+
+
+class Gauge:
+    """Current value read from a callback at scrape time"""
+
+    type = 'gauge'
+
+    def __init__(self, name, help_text, callback, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.callback = callback
+
+    def samples(self):
+        value = self.callback()
+        items = sorted(value.items()) if isinstance(value, dict) else [((), value)]
+        for labels, current in items:
+            labels = labels if isinstance(labels, tuple) else (labels,)
+            yield self.name, _labels(self.label_names, labels), current
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self.lock:
+            items = sorted((labels, ([*counts], total, count)) for labels, (counts, total, count) in self.series.items())
+        names = self.label_names + ('le',)
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', _labels(names, labels + (bound,)), cumulative
+            yield f'{self.name}_sum', _labels(self.label_names, labels), total
+            yield f'{self.name}_count', _labels(self.label_names, labels), count
+
+
+class _NullStage:
+    """Stage timer used while metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ('histogram', 'name', 'started')
+
+    def __init__(self, histogram, name):
+        self.histogram = histogram
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, self.name)
+        return False
+
+
+class Metrics:
+    """The metrics of this worker process"""
+
+    def __init__(self):
+        self.enabled = False
+        self.instruments = {}
+        self.installed_engines = set()
+        self.stage_seconds = self.histogram('app_stage_seconds', 'Time spent in an instrumented stage', ['stage'])
+        self.request_seconds = self.histogram(
+            'http_request_duration_seconds', 'Request latency per endpoint', ['method', 'endpoint', 'status']
+        )
+        self.request_queries = self.histogram(
+            'http_request_db_queries', 'Database queries executed per request', ['endpoint'],
+            buckets=QUERY_COUNT_BUCKETS
+        )
+        self.query_seconds = self.histogram('db_query_duration_seconds', 'Database query latency', ['bind'])
+        self.query_errors = self.counter('db_query_errors_total', 'Database queries that raised', ['bind'])
+
+    def counter(self, name, help_text, labels=()):
+        return self.instruments.setdefault(name, Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.instruments.setdefault(name, Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name, help_text, callback, labels=()):
+        """Register (or replace) a gauge read from callback() when scraped"""
+        self.instruments[name] = Gauge(name, help_text, callback, labels)
+        return self.instruments[name]
+
+    def stage(self, name):
+        """Context manager timing a named stage into app_stage_seconds"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self.stage_seconds, name)
+
+    def init_app(self, app, db):
+        """Install the request and query hooks and the /metrics endpoint if enabled"""
+        self.enabled = app.config.get('METRICS_ENABLED', False)
+        if not self.enabled:
+            return
+        self.token = app.config.get('METRICS_TOKEN')
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self._endpoint)
+
+        with app.app_context():
+            engines = dict(db.engines)
+        for key, engine in engines.items():
+            if engine in self.installed_engines:
+                continue
+            self.installed_engines.add(engine)
+            bind = key or 'default'
+            event.listen(engine, 'before_cursor_execute', self._start_query)
+            event.listen(engine, 'after_cursor_execute', lambda *args, bind=bind: self._finish_query(bind, *args))
+            event.listen(engine, 'handle_error', lambda context, bind=bind: self._query_failed(bind, context))
+
+    def _start_request(self):
+        g._metrics_started = time.perf_counter()
+        g._metrics_queries = 0
+
+    def _finish_request(self, response):
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            self.request_seconds.observe(
+                time.perf_counter() - started, request.method, endpoint, response.status_code
+            )
+            self.request_queries.observe(g.pop('_metrics_queries', 0), endpoint)
+        return response
+
+    def _start_query(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_started', []).append(time.perf_counter())
+
+    def _finish_query(self, bind, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['_metrics_started'].pop()
+        self.query_seconds.observe(time.perf_counter() - started, bind)
+        if g and '_metrics_queries' in g:
+            g._metrics_queries += 1
+
+    def _query_failed(self, bind, context):
+        self.query_errors.inc(bind)
+        if context.connection is not None and context.connection.info.get('_metrics_started'):
+            context.connection.info['_metrics_started'].pop()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name, instrument in sorted(self.instruments.items()):
+            samples = list(instrument.samples())
+            if not samples:
+                continue
+            lines.append(f'# HELP {name} {instrument.help}')
+            lines.append(f'# TYPE {name} {instrument.type}')
+            for sample, labels, value in samples:
+                lines.append(f'{sample}{labels} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _endpoint(self):
+        if self.token:
+            if request.headers.get('Authorization') != f'Bearer {self.token}':
+                abort(401)
+        elif request.remote_addr not in LOCAL_ADDRESSES:
+            abort(403)
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+metrics = Metrics()
@@ -0,0 +1,90 @@
+"""
+Schema Migrations - Upgrades for Tables Created by Older Versions
+db.create_all() creates missing tables but never alters existing ones, so
+columns added to an existing model are added here. SQLite cannot change the
+keys of a table in place, so a predictions table that could reuse the ids of
+deleted rows (no AUTOINCREMENT), or that deletes rows behind the indexes'
+back (ON DELETE CASCADE), is rebuilt from the model with its rows. Every
+step checks the live schema first, so upgrading twice (or an up-to-date
+database) is a no-op. Run by `flask init-db`, `flask upgrade-db` and
+`python run.py`
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+
+
+class MigrationError(Exception):
+    """Raised when a database cannot be upgraded as it is"""
+
+
+def _add_missing_columns(connection, inspector, table, columns):
+    existing = {column['name'] for column in inspector.get_columns(table)}
+    added = []
+    for name, ddl in columns:
+        if name not in existing:
+            connection.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {name} {ddl}')
+            added.append(f'{table}.{name}')
+    return added
+
+
+def _rebuild_sqlite_table(connection, inspector, table):
+    """Recreate a table from its model under the same name, keeping the rows of the columns both share"""
+    columns = [column['name'] for column in inspector.get_columns(table.name)]
+    columns = ', '.join(column for column in columns if column in table.columns)
+    for index in inspector.get_indexes(table.name):
+        connection.exec_driver_sql(f'DROP INDEX {index["name"]}')
+
+    create = str(CreateTable(table).compile(connection))
+    connection.exec_driver_sql(create.replace(f'TABLE {table.name} ', f'TABLE {table.name}_new ', 1))
+    connection.exec_driver_sql(f'INSERT INTO {table.name}_new ({columns}) SELECT {columns} FROM {table.name}')
+    connection.exec_driver_sql(f'DROP TABLE {table.name}')
+    connection.exec_driver_sql(f'ALTER TABLE {table.name}_new RENAME TO {table.name}')
+    for index in table.indexes:
+        index.create(connection)
+
+
+def _upgrade_prediction_keys(connection, inspector):
+    from app.models.prediction import Prediction
+
+    cascades = [
+        key for key in inspector.get_foreign_keys('predictions')
+        if key['referred_table'] == 'users' and (key.get('options') or {}).get('ondelete')
+    ]
+    if connection.dialect.name != 'sqlite':
+        # Serial ids are never reused, and the foreign key can be replaced in place
+        for key in cascades:
+            connection.exec_driver_sql(f'ALTER TABLE predictions DROP CONSTRAINT {key["name"]}')
+            connection.exec_driver_sql(
+                f'ALTER TABLE predictions ADD CONSTRAINT {key["name"]} FOREIGN KEY (user_id) REFERENCES users (id)'
+            )
+        return ['predictions.user_id foreign key'] if cascades else []
+
+    sql = connection.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'predictions'"))
+    if 'AUTOINCREMENT' in sql.scalar().upper() and not cascades:
+        return []
+    orphaned = connection.execute(text(
+        'SELECT count(*) FROM predictions WHERE user_id NOT IN (SELECT id FROM users)'
+    )).scalar()
+    if orphaned:
+        raise MigrationError(
+            f'{orphaned} predictions belong to deleted users; run `flask resume-deletions` first'
+        )
+    _rebuild_sqlite_table(connection, inspector, Prediction.__table__)
+    return ['predictions rebuilt']
+
+
+def upgrade_schema(engine):
+    """Bring existing tables up to the current models; returns the changes made"""
+    applied = []
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        if not inspector.has_table('predictions'):
+            return applied
+        applied += _add_missing_columns(connection, inspector, 'predictions', [
+            ('feature_contributions', 'TEXT')
+        ])
+
+    # Committed apart, so the application can run (and clear orphans) if this step is refused
+    with engine.begin() as connection:
+        applied += _upgrade_prediction_keys(connection, inspect(connection))
+    return applied
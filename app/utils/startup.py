@@ -0,0 +1,67 @@
+"""
+Startup Profile - Import Time per Module of a Cold create_app
+Starts a fresh interpreter with -X importtime, builds the application there
+and reports how long create_app took, the modules that cost the most to
+import and which heavy libraries were loaded before any request was served
+"""
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# Libraries that should load with the first request that needs them, not at startup
+HEAVY_MODULES = ('numpy', 'reportlab', 'sklearn', 'joblib', 'scipy')
+
+_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app(sys.argv[1])
+finished = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - started,
+    'create_app_seconds': finished - started,
+    'modules': sorted(sys.modules)
+}))
+'''
+
+
+def _parse_importtime(stderr):
+    """(module, self microseconds, cumulative microseconds) per '-X importtime' line"""
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        yield name.strip(), int(self_us), int(cumulative_us)
+
+
+def profile_startup(config_name='default', limit=25):
+    """Profile a cold create_app(config_name) in a new interpreter"""
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE, config_name],
+        cwd=root, capture_output=True, text=True, check=True
+    )
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+
+    imports = list(_parse_importtime(result.stderr))
+    packages = defaultdict(int)
+    for name, self_us, _ in imports:
+        packages[name.split('.')[0]] += self_us
+
+    return {
+        'create_app_seconds': round(probe['create_app_seconds'], 4),
+        'import_seconds': round(probe['import_seconds'], 4),
+        'modules_imported': len(imports),
+        'heavy_modules': [name for name in HEAVY_MODULES if name in probe['modules']],
+        'packages': [
+            {'package': name, 'self_ms': round(us / 1000, 2)}
+            for name, us in sorted(packages.items(), key=lambda item: -item[1])[:limit]
+        ],
+        'modules': [
+            {'module': name, 'self_ms': round(self_us / 1000, 2), 'cumulative_ms': round(cumulative_us / 1000, 2)}
+            for name, self_us, cumulative_us in sorted(imports, key=lambda item: -item[1])[:limit]
+        ]
+    }
@@ -0,0 +1,106 @@
+"""
+T-Digest - Mergeable Sketch for Approximate Quantiles
+Keeps a small set of weighted centroids that are dense at the tails and
+coarse in the middle, so sketches built per day and per disease can be
+merged and queried for percentiles without rescanning the raw rows
+"""
+import struct
+import numpy as np
+
+
+class TDigest:
+    """Merging t-digest using the arcsine (k1) scale function"""
+
+    HEADER = struct.Struct('<dddI')
+
+    def __init__(self, compression=200, means=None, weights=None, minimum=np.inf, maximum=-np.inf):
+        self.compression = compression
+        self.means = np.asarray(means if means is not None else [], dtype=np.float64)
+        self.weights = np.asarray(weights if weights is not None else [], dtype=np.float64)
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @property
+    def count(self):
+        """Total weight of all values added"""
+        return float(self.weights.sum())
+
+    def update(self, values):
+        """Add a batch of values"""
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return self
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        self._compress(
+            np.concatenate([self.means, values]),
+            np.concatenate([self.weights, np.ones(values.size)])
+        )
+        return self
+
+    def merge(self, other):
+        """Fold another digest into this one"""
+        if other.weights.size == 0:
+            return self
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._compress(
+            np.concatenate([self.means, other.means]),
+            np.concatenate([self.weights, other.weights])
+        )
+        return self
+
+    @classmethod
+    def merge_all(cls, digests, compression=200):
+        """Merge many digests in a single compression pass"""
+        digests = [d for d in digests if d.weights.size]
+        merged = cls(compression)
+        if not digests:
+            return merged
+        merged.minimum = min(d.minimum for d in digests)
+        merged.maximum = max(d.maximum for d in digests)
+        merged._compress(
+            np.concatenate([d.means for d in digests]),
+            np.concatenate([d.weights for d in digests])
+        )
+        return merged
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+
+        # Centroids whose left edge falls in the same unit of k-space are combined
+        q_left = (np.cumsum(weights) - weights) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q_left - 1)
+        group = np.floor(k - k[0]).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+
+        merged_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / merged_weights
+        self.weights = merged_weights
+
+    def quantile(self, q):
+        """Estimate the value at quantile q (0..1)"""
+        if self.weights.size == 0:
+            return None
+        if self.weights.size == 1:
+            return float(self.means[0])
+
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        positions = np.r_[0.0, centers, total]
+        values = np.r_[self.minimum, self.means, self.maximum]
+        return float(np.interp(q * total, positions, values))
+
+    def to_bytes(self):
+        """Serialize for storage"""
+        header = self.HEADER.pack(self.compression, self.minimum, self.maximum, self.means.size)
+        return header + self.means.tobytes() + self.weights.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Restore a serialized digest"""
+        compression, minimum, maximum, size = cls.HEADER.unpack_from(data)
+        body = np.frombuffer(data, dtype=np.float64, offset=cls.HEADER.size)
+        return cls(compression, body[:size].copy(), body[size:2 * size].copy(), minimum, maximum)
@@ -0,0 +1,115 @@
+"""
+Template Caches - Rendered Fragments and Compiled Template Bytecode
+Parts of a template that depend only on their arguments (a disease's form,
+the disease grid, the advice for a disease and risk level) are wrapped in
+
+    {% cache 'name', disease_type %} ... {% endcache %}
+
+and rendered once per worker for each set of arguments; the key also holds
+the template, its line and a digest of its source (the template version),
+so an edited template never serves stale fragments, and the script root the
+fragment's URLs were built under. An administrator can drop a worker's
+fragments from the admin API. Compiled templates are written to a bytecode
+cache directory shared by all workers, which `flask compile-templates`
+fills at deploy time so no worker compiles templates on startup
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from flask import has_request_context, request
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+
+class FragmentCache:
+    """Per-process LRU cache of rendered template fragments"""
+
+    def __init__(self, max_size=512):
+        self.enabled = True
+        self.max_size = max_size
+        self.fragments = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Install the {% cache %} tag and the bytecode cache before the Jinja environment is built"""
+        self.enabled = app.config.get('TEMPLATE_FRAGMENT_CACHE_ENABLED', True)
+        self.max_size = app.config.get('TEMPLATE_FRAGMENT_CACHE_SIZE', 512)
+        self.clear()
+        self.hits = self.misses = 0
+
+        options = dict(app.jinja_options)
+        options['extensions'] = [*options.get('extensions', ()), FragmentCacheExtension]
+        path = app.config.get('TEMPLATE_BYTECODE_CACHE_PATH')
+        if path:
+            os.makedirs(path, exist_ok=True)
+            options['bytecode_cache'] = FileSystemBytecodeCache(path)
+        app.jinja_options = options
+
+    def render(self, key, caller):
+        """The cached fragment for key, rendered by caller() on a miss"""
+        if not self.enabled:
+            return caller()
+        with self.lock:
+            fragment = self.fragments.get(key)
+            if fragment is not None:
+                self.fragments.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+
+        # Rendered outside the lock; two requests may both render a new fragment
+        fragment = caller()
+        with self.lock:
+            self.fragments[key] = fragment
+            while len(self.fragments) > self.max_size:
+                self.fragments.popitem(last=False)
+        return fragment
+
+    def clear(self):
+        with self.lock:
+            self.fragments.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'fragments': len(self.fragments),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else None
+        }
+
+
+fragment_cache = FragmentCache()
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache 'name', arg, ... %} body {% endcache %}"""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+
+        fragment = f'{parser.name}:{lineno}:{self._source_digest(parser.name)}'
+        call = self.call_method('_render', [nodes.Const(fragment), nodes.Tuple(args, 'load')])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _source_digest(self, name):
+        if name is None or self.environment.loader is None:
+            return ''
+        source = self.environment.loader.get_source(self.environment, name)[0]
+        return hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+
+    def _render(self, fragment, args, caller):
+        # url_for() inside a fragment depends on where the application is mounted
+        script_root = request.script_root if has_request_context() else ''
+        return fragment_cache.render((fragment, script_root, *args), caller)
@@ -0,0 +1,201 @@
+"""
+Microbenchmark Harness - Timings and Memory High-Water Marks Against Stored Baselines
+Each benchmark reports the median and fastest time of several rounds and the
+peak memory allocated by one call (tracemalloc). With --benchmark-compare a
+benchmark fails when its fastest time (the least noisy on a busy machine)
+or its peak memory exceeds the baseline in benchmarks/baselines.json by more
+than the threshold; --benchmark-save records the current results as the new
+baseline. Times are compared after scaling by a fixed pure-Python workload
+timed alongside each benchmark, which cancels out CPU frequency changes and
+busy neighbours, but baselines are still best recorded on the machine that
+compares against them
+
+    python -m pytest benchmarks -q --benchmark-compare
+    python -m pytest benchmarks -q --benchmark-save
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+# Timings below this many milliseconds are at the resolution of the clock
+TIME_FLOOR_MS = 0.002
+
+# Extra attempts given to a benchmark that looks slower than its baseline
+RETRIES = 2
+
+
+def _calibration_workload():
+    total = 0
+    for i in range(20000):
+        total += len(str(i * i))
+    return total
+
+
+def calibrate(rounds=5):
+    """Fastest time of the reference workload, in milliseconds"""
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        _calibration_workload()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption('--benchmark-compare', action='store_true',
+                    help='Fail benchmarks that regressed past the threshold')
+    group.addoption('--benchmark-save', action='store_true', help='Store the results as the new baselines')
+    group.addoption('--benchmark-threshold', type=float, default=0.25,
+                    help='Allowed slowdown of the fastest time, as a fraction (default 0.25)')
+    group.addoption('--benchmark-memory-threshold', type=float, default=0.25,
+                    help='Allowed growth of the peak memory, as a fraction (default 0.25)')
+    group.addoption('--benchmark-baseline', default=BASELINE_PATH, help='Baseline file')
+
+
+class Benchmarks:
+    """Runs benchmarks and checks them against the baselines"""
+
+    def __init__(self, config):
+        self.config = config
+        # Options exist only when this directory is on the command line
+        self.path = config.getoption('benchmark_baseline', BASELINE_PATH)
+        self.results = {}
+        self.baselines = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.baselines = json.load(f).get('benchmarks', {})
+
+    def _run(self, func, rounds):
+        calibration = calibrate()
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return timings, min(calibration, calibrate())
+
+    def measure(self, name, func, rounds=20, warmup=2):
+        for _ in range(warmup):
+            func()
+        timings, calibration = self._run(func, rounds)
+
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        result = {
+            'median_ms': round(statistics.median(timings) * 1000, 4),
+            'min_ms': round(min(timings) * 1000, 4),
+            'peak_kib': round(peak / 1024, 1),
+            'rounds': rounds,
+            'calibration_ms': round(calibration, 4)
+        }
+
+        # A slow run is measured again before it counts as a regression, since a
+        # busy machine can hold back every round of one attempt
+        problems = self.check(name, result)
+        for _ in range(RETRIES):
+            if not problems or not any(problem.startswith('fastest') for problem in problems):
+                break
+            timings, calibration = self._run(func, rounds)
+            if min(timings) * 1000 < result['min_ms']:
+                result['min_ms'] = round(min(timings) * 1000, 4)
+                result['calibration_ms'] = round(calibration, 4)
+            problems = self.check(name, result)
+
+        self.results[name] = result
+        if problems:
+            pytest.fail(f'{name} regressed: ' + '; '.join(problems), pytrace=False)
+        return result
+
+    def check(self, name, result):
+        """Ways a result is worse than its baseline, if comparing"""
+        baseline = self.baselines.get(name)
+        if not self.config.getoption('benchmark_compare', False) or baseline is None:
+            return []
+        problems = []
+        expected = baseline['min_ms'] * result['calibration_ms'] / baseline['calibration_ms']
+        time_limit = max(expected * (1 + self.config.getoption('benchmark_threshold', 0.25)),
+                         expected + TIME_FLOOR_MS)
+        if result['min_ms'] > time_limit:
+            problems.append(f"fastest {result['min_ms']:.3f} ms > {time_limit:.3f} ms "
+                            f"(baseline {baseline['min_ms']:.3f} ms, {expected:.3f} ms at this machine speed)")
+        # Small allocations are noise; allow at least 64 KiB of growth
+        memory_limit = max(baseline['peak_kib'] * (1 + self.config.getoption('benchmark_memory_threshold', 0.25)),
+                           baseline['peak_kib'] + 64)
+        if result['peak_kib'] > memory_limit:
+            problems.append(f"peak memory {result['peak_kib']:.1f} KiB > {memory_limit:.1f} KiB "
+                            f"(baseline {baseline['peak_kib']:.1f} KiB)")
+        return problems
+
+    def save(self):
+        data = {'benchmarks': {}}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                data = json.load(f)
+        data['machine'] = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.machine(),
+            'cpus': os.cpu_count()
+        }
+        data['benchmarks'] = {**data.get('benchmarks', {}), **self.results}
+        data['benchmarks'] = dict(sorted(data['benchmarks'].items()))
+        with open(self.path, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.write('\n')
+
+    def summary_lines(self):
+        lines = []
+        for name, result in sorted(self.results.items()):
+            baseline = self.baselines.get(name)
+            change = ''
+            if baseline:
+                speed = result['calibration_ms'] / baseline['calibration_ms']
+                change = f"  ({(result['min_ms'] / max(baseline['min_ms'] * speed, 0.0001) - 1) * 100:+.0f}% time, " \
+                         f"{(result['peak_kib'] / max(baseline['peak_kib'], 0.1) - 1) * 100:+.0f}% memory)"
+            lines.append(f"{name:<55} {result['median_ms']:>10.3f} ms {result['min_ms']:>10.3f} ms "
+                         f"{result['peak_kib']:>10.1f} KiB{change}")
+        return lines
+
+
+def pytest_configure(config):
+    config._benchmarks = Benchmarks(config)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    benchmarks = session.config._benchmarks
+    if session.config.getoption('benchmark_save', False) and benchmarks.results:
+        benchmarks.save()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    benchmarks = config._benchmarks
+    if benchmarks.results:
+        terminalreporter.section('benchmarks (median time, fastest time, peak memory)')
+        for line in benchmarks.summary_lines():
+            terminalreporter.write_line(line)
+
+
+@pytest.fixture
+def bench(request):
+    """bench(func) times func, named after the test; bench(func, name=...) for several per test"""
+    benchmarks = request.config._benchmarks
+
+    def run(func, name=None, rounds=20, warmup=2):
+        return benchmarks.measure(name or request.node.name, func, rounds=rounds, warmup=warmup)
+
+    return run
@@ -0,0 +1,342 @@
+"""
+End-to-End Load Test
+Starts the application on a local port against a file-backed SQLite database,
+seeds users with historical predictions, and drives concurrent clients
+through a weighted mix of login, predictions, history, the analytics APIs
+and report generation over real HTTP connections. Reports throughput and
+p50/p95/p99 latency per endpoint as JSON, so runs on different commits or
+machines can be compared
+
+    python benchmarks/load_test.py --clients 16 --seconds 30 --output load.json
+    python benchmarks/load_test.py --mix predict=1,history=1 --production-mode
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from werkzeug.serving import make_server
+import config as config_module
+from config import Config
+from app import create_app, db
+from app.models.user import User
+from app.models.prediction import Prediction
+
+PASSWORD = 'loadtest'
+
+# Relative weight of each action; every client picks its next action at random
+DEFAULT_MIX = {
+    'login': 1,
+    'predict': 4,
+    'history': 3,
+    'overview': 2,
+    'trends': 1,
+    'comparison': 1,
+    'recent_activity': 2,
+    'report': 1
+}
+
+DISEASES = ['diabetes', 'heart_disease', 'anemia', 'stroke', 'thyroid']
+
+
+def make_app(directory, production_mode):
+    # Services read file locations from Config itself, so point them at the run's directory
+    Config.REPORTS_PATH = os.path.join(directory, 'reports')
+    Config.ML_MODELS_PATH = os.path.join(directory, 'ml_models')
+    Config.SIMILARITY_INDEX_PATH = os.path.join(directory, 'similarity')
+    Config.ARCHIVE_PATH = os.path.join(directory, 'archive')
+
+    class LoadTestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(directory, 'load.db')
+        SQLITE_PRODUCTION_MODE = production_mode
+        REPORT_SWEEP_INTERVAL = 0
+
+    config_module.config['load-test'] = LoadTestConfig
+    return create_app('load-test')
+
+
+def random_features(service, disease_type, rng):
+    return {
+        feature: int(rng.integers(low, high + 1))
+        for feature, (low, high) in service.feature_ranges[disease_type].items()
+    }
+
+
+def seed(app, users, predictions_per_user):
+    """Users sharing one password hash, each with a year of predictions"""
+    from app.routes.predictions import prediction_service
+    rng = np.random.default_rng(0)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        template = User(username='template', email='template@example.com')
+        template.set_password(PASSWORD)
+        db.session.execute(User.__table__.insert(), [
+            {'username': f'load{i}', 'email': f'load{i}@example.com', 'password_hash': template.password_hash,
+             'is_active': True, 'is_admin': False, 'created_at': datetime.utcnow()}
+            for i in range(users)
+        ])
+        user_ids = [row.id for row in db.session.query(User.id)]
+
+        now = datetime.utcnow()
+        rows = []
+        for user_id in user_ids:
+            for _ in range(predictions_per_user):
+                disease_type = DISEASES[int(rng.integers(len(DISEASES)))]
+                risk = float(rng.uniform(0, 100))
+                rows.append({
+                    'user_id': user_id,
+                    'disease_type': disease_type,
+                    'disease_name': Config.DISEASES[disease_type]['name'],
+                    'prediction_result': 'Positive' if risk >= 50 else 'Negative',
+                    'risk_level': 'High' if risk >= 66 else 'Medium' if risk >= 33 else 'Low',
+                    'confidence_score': float(rng.uniform(50, 100)),
+                    'risk_percentage': risk,
+                    'model_name': 'seed',
+                    'model_accuracy': 90.0,
+                    'input_features': json.dumps(random_features(prediction_service, disease_type, rng)),
+                    'report_id': f'RPT_SEED{len(rows):08d}',
+                    'report_generated': False,
+                    'created_at': now - timedelta(minutes=int(rng.integers(0, 365 * 24 * 60)))
+                })
+            if len(rows) >= 10000:
+                db.session.execute(Prediction.__table__.insert(), rows)
+                rows = []
+        if rows:
+            db.session.execute(Prediction.__table__.insert(), rows)
+        db.session.commit()
+
+        # Build the models before the clock starts, so the run measures warm workers
+        for disease_type in DISEASES:
+            prediction_service.load_model(disease_type)
+
+        report_ids = defaultdict(list)
+        for row in db.session.query(Prediction.user_id, Prediction.id).filter(Prediction.id % 25 == 0):
+            report_ids[row.user_id].append(row.id)
+        return user_ids, dict(report_ids)
+
+
+class Client:
+    """One keep-alive HTTP connection with its own cookies"""
+
+    def __init__(self, port):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        self.cookies = SimpleCookie()
+
+    def request(self, method, path, body=None, content_type=None):
+        headers = {}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{key}={morsel.value}' for key, morsel in self.cookies.items())
+        if content_type:
+            headers['Content-Type'] = content_type
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            self.connection.close()
+            raise
+        for header in response.headers.get_all('Set-Cookie') or []:
+            self.cookies.load(header)
+        return response.status
+
+
+class LoadTest:
+    """Weighted-mix clients against a running server"""
+
+    def __init__(self, port, user_ids, report_ids, mix, seed_value=0):
+        from app.routes.predictions import prediction_service
+        self.port = port
+        self.user_ids = user_ids
+        self.report_ids = report_ids
+        self.actions = list(mix)
+        weights = np.array([mix[action] for action in self.actions], dtype=float)
+        self.weights = weights / weights.sum()
+        self.prediction_service = prediction_service
+        self.seed_value = seed_value
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.recording = threading.Event()
+        self.stop = threading.Event()
+
+    def record(self, endpoint, started, ok):
+        if not self.recording.is_set():
+            return
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            if ok:
+                self.latencies[endpoint].append(elapsed)
+            else:
+                self.errors[endpoint] += 1
+
+    def call(self, client, endpoint, method, path, body=None, content_type=None, expect=(200,)):
+        started = time.perf_counter()
+        try:
+            ok = client.request(method, path, body, content_type) in expect
+        except (http.client.HTTPException, OSError):
+            ok = False
+        self.record(endpoint, started, ok)
+        return ok
+
+    def login(self, client, user_id):
+        client.cookies = SimpleCookie()
+        body = urlencode({'username': f'load{user_id - self.user_ids[0]}', 'password': PASSWORD})
+        return self.call(client, 'POST /auth/login', 'POST', '/auth/login', body,
+                         'application/x-www-form-urlencoded', expect=(302,))
+
+    def step(self, client, user_id, action, rng):
+        if action == 'login':
+            self.login(client, user_id)
+        elif action == 'predict':
+            disease_type = DISEASES[int(rng.integers(len(DISEASES)))]
+            body = json.dumps(random_features(self.prediction_service, disease_type, rng))
+            self.call(client, 'POST /predict/api/<disease>', 'POST', f'/predict/api/{disease_type}',
+                      body, 'application/json')
+        elif action == 'history':
+            page = int(rng.integers(1, 4))
+            self.call(client, 'GET /predict/history', 'GET', f'/predict/history?page={page}')
+        elif action == 'overview':
+            self.call(client, 'GET /analytics/api/overview', 'GET', '/analytics/api/overview')
+        elif action == 'trends':
+            self.call(client, 'GET /analytics/api/trends', 'GET', '/analytics/api/trends')
+        elif action == 'comparison':
+            self.call(client, 'GET /analytics/api/disease-comparison', 'GET', '/analytics/api/disease-comparison')
+        elif action == 'recent_activity':
+            self.call(client, 'GET /analytics/api/recent-activity', 'GET', '/analytics/api/recent-activity')
+        elif action == 'report':
+            candidates = self.report_ids.get(user_id)
+            if candidates:
+                prediction_id = candidates[int(rng.integers(len(candidates)))]
+                self.call(client, 'GET /reports/generate/<id>', 'GET', f'/reports/generate/{prediction_id}')
+
+    def client_loop(self, index):
+        rng = np.random.default_rng(self.seed_value + index)
+        client = Client(self.port)
+        user_id = self.user_ids[index % len(self.user_ids)]
+        self.login(client, user_id)
+        while not self.stop.is_set():
+            action = self.actions[int(rng.choice(len(self.actions), p=self.weights))]
+            self.step(client, user_id, action, rng)
+        client.connection.close()
+
+    def run(self, clients, seconds, warmup):
+        threads = [threading.Thread(target=self.client_loop, args=(i,), daemon=True) for i in range(clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(warmup)
+        self.recording.set()
+        started = time.perf_counter()
+        time.sleep(seconds)
+        self.recording.clear()
+        elapsed = time.perf_counter() - started
+        self.stop.set()
+        for thread in threads:
+            thread.join()
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        def summary(latencies, errors):
+            latencies = np.array(latencies) * 1000
+            return {
+                'requests': len(latencies),
+                'errors': errors,
+                'per_second': round(len(latencies) / elapsed, 1),
+                'p50_ms': round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+                'p95_ms': round(float(np.percentile(latencies, 95)), 2) if len(latencies) else None,
+                'p99_ms': round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+                'max_ms': round(float(latencies.max()), 2) if len(latencies) else None
+            }
+
+        endpoints = sorted(set(self.latencies) | set(self.errors))
+        return {
+            'endpoints': {
+                endpoint: summary(self.latencies[endpoint], self.errors[endpoint]) for endpoint in endpoints
+            },
+            'total': summary(
+                [value for endpoint in endpoints for value in self.latencies[endpoint]],
+                sum(self.errors.values())
+            )
+        }
+
+
+def parse_mix(text):
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in text.split(','):
+        action, _, weight = item.partition('=')
+        if action not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f'Unknown action {action!r}; choose from {", ".join(DEFAULT_MIX)}')
+        mix[action] = float(weight or 1)
+    return mix
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--warmup', type=float, default=3, help='Seconds of load before measuring')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--predictions-per-user', type=int, default=200)
+    parser.add_argument('--mix', type=parse_mix, default=None, help='e.g. predict=4,history=3,report=1')
+    parser.add_argument('--production-mode', action='store_true', help='Enable SQLite production mode')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    args = parser.parse_args()
+    mix = args.mix or dict(DEFAULT_MIX)
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(directory, args.production_mode)
+        seed_started = time.perf_counter()
+        user_ids, report_ids = seed(app, args.users, args.predictions_per_user)
+        seed_seconds = time.perf_counter() - seed_started
+
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+        try:
+            load = LoadTest(server.server_port, user_ids, report_ids, mix, args.seed)
+            results = load.run(args.clients, args.seconds, args.warmup)
+        finally:
+            server.shutdown()
+            with app.app_context():
+                for engine in db.engines.values():
+                    engine.dispose()
+
+    report = {
+        'commit': git_commit(),
+        'settings': {**vars(args), 'mix': mix},
+        'seed_seconds': round(seed_seconds, 1),
+        **results
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+SQLite Concurrency Benchmark
+Writer threads insert predictions while reader threads run the analytics
+overview queries against a file-backed SQLite database, once with default
+settings and once in SQLite production mode (WAL, pragmas, serialized writer,
+read-only pool). Reports throughput, read latency and lock errors as JSON
+
+    python benchmarks/sqlite_concurrency.py --writers 4 --readers 8 --seconds 10
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+import config as config_module
+from config import Config
+from app import create_app, db
+from app.models.user import User
+from app.models.prediction import Prediction
+from app.utils.database import use_read_engine
+
+
+def make_app(path, production_mode):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+        SQLITE_PRODUCTION_MODE = production_mode
+        # Measure the database, not hashing
+        PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+
+    name = f'sqlite-benchmark-{production_mode}'
+    config_module.config[name] = BenchmarkConfig
+    return create_app(name)
+
+
+def new_prediction(user_id, rng):
+    risk = float(rng.uniform(0, 100))
+    prediction = Prediction(
+        user_id=user_id,
+        disease_type='diabetes',
+        disease_name='Diabetes',
+        prediction_result='Positive' if risk >= 50 else 'Negative',
+        risk_level='High' if risk >= 66 else 'Medium' if risk >= 33 else 'Low',
+        confidence_score=float(rng.uniform(50, 100)),
+        risk_percentage=risk
+    )
+    prediction.set_input_features({f'feature_{i}': float(rng.uniform(0, 200)) for i in range(20)})
+    return prediction
+
+
+def seed(app, users, predictions):
+    rng = np.random.default_rng(0)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        for i in range(users):
+            user = User(username=f'user{i}', email=f'user{i}@example.com')
+            user.set_password('benchmark')
+            db.session.add(user)
+        db.session.commit()
+        for i in range(predictions):
+            db.session.add(new_prediction(i % users + 1, rng))
+        db.session.commit()
+
+
+def read_overview(user_id):
+    """The queries behind /analytics/api/overview"""
+    Prediction.query.filter_by(user_id=user_id).count()
+    db.session.query(Prediction.risk_level, func.count(Prediction.id)).filter_by(
+        user_id=user_id
+    ).group_by(Prediction.risk_level).all()
+    db.session.query(Prediction.disease_name, func.count(Prediction.id)).filter_by(
+        user_id=user_id
+    ).group_by(Prediction.disease_name).all()
+
+
+def run(app, users, writers, readers, seconds):
+    stop = threading.Event()
+    lock = threading.Lock()
+    results = {'write': [], 'read': [], 'write_errors': 0, 'read_errors': 0}
+
+    def worker(kind, index):
+        rng = np.random.default_rng(index)
+        latencies = []
+        errors = 0
+        with app.test_request_context():
+            if kind == 'read':
+                use_read_engine()
+            while not stop.is_set():
+                user_id = int(rng.integers(1, users + 1))
+                start = time.perf_counter()
+                try:
+                    if kind == 'write':
+                        db.session.add(new_prediction(user_id, rng))
+                        db.session.commit()
+                    else:
+                        read_overview(user_id)
+                        db.session.commit()
+                    latencies.append(time.perf_counter() - start)
+                except (OperationalError, PoolTimeoutError):
+                    db.session.rollback()
+                    errors += 1
+            db.session.remove()
+        with lock:
+            results[kind].extend(latencies)
+            results[f'{kind}_errors'] += errors
+
+    threads = [threading.Thread(target=worker, args=('write', i)) for i in range(writers)]
+    threads += [threading.Thread(target=worker, args=('read', 100 + i)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    report = {}
+    for kind in ('write', 'read'):
+        latencies = np.array(results[kind]) * 1000
+        report[kind] = {
+            'operations': len(latencies),
+            'per_second': round(len(latencies) / seconds, 1),
+            'errors': results[f'{kind}_errors'],
+            'p50_ms': round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+            'p95_ms': round(float(np.percentile(latencies, 95)), 2) if len(latencies) else None,
+            'p99_ms': round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--predictions', type=int, default=20000)
+    args = parser.parse_args()
+
+    report = {'settings': vars(args)}
+    with tempfile.TemporaryDirectory() as directory:
+        for production_mode in (False, True):
+            path = os.path.join(directory, f'benchmark-{production_mode}.db')
+            app = make_app(path, production_mode)
+            seed(app, args.users, args.predictions)
+            name = 'production_mode' if production_mode else 'default'
+            report[name] = run(app, args.users, args.writers, args.readers, args.seconds)
+            with app.app_context():
+                db.engine.dispose()
+                for engine in db.engines.values():
+                    engine.dispose()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
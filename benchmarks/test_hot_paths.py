@@ -0,0 +1,171 @@
+"""
+Hot Path Microbenchmarks
+Model inference per disease, model loading, prediction serialization, PDF
+generation and the analytics queries on a seeded database
+"""
+import json
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from config import Config
+
+DISEASE_TYPES = list(Config.DISEASES)
+
+ANALYTICS_ENDPOINTS = [
+    '/analytics/api/overview',
+    '/analytics/api/trends',
+    '/analytics/api/disease-comparison',
+    '/analytics/api/recent-activity'
+]
+
+# Predictions of the benchmark user, spread over the last year
+SEEDED_PREDICTIONS = 2000
+
+
+@pytest.fixture(scope='session')
+def storage(tmp_path_factory):
+    """Point every file location at a throwaway directory"""
+    root = tmp_path_factory.mktemp('benchmarks')
+    names = ('REPORTS_PATH', 'ML_MODELS_PATH', 'SIMILARITY_INDEX_PATH', 'ARCHIVE_PATH')
+    saved = {name: getattr(Config, name) for name in names}
+    for name in names:
+        setattr(Config, name, str(root / name.lower()))
+    yield root
+    for name, value in saved.items():
+        setattr(Config, name, value)
+
+
+@pytest.fixture(scope='session')
+def prediction_service(storage):
+    from app.services.prediction_service import PredictionService
+    return PredictionService()
+
+
+def sample_features(service, disease_type, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        feature: int(rng.integers(low, high + 1))
+        for feature, (low, high) in service.feature_ranges[disease_type].items()
+    }
+
+
+@pytest.fixture(scope='session')
+def seeded_app(storage, prediction_service):
+    """Application with one user owning SEEDED_PREDICTIONS predictions"""
+    from app import create_app, db
+    from app.models.user import User
+    from app.models.prediction import Prediction
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all(bind_key=None)
+        user = User(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+
+        rng = np.random.default_rng(0)
+        now = datetime.utcnow()
+        diseases = DISEASE_TYPES[:6]
+        rows = []
+        for i in range(SEEDED_PREDICTIONS):
+            disease_type = diseases[i % len(diseases)]
+            risk = float(rng.uniform(0, 100))
+            rows.append({
+                'user_id': user.id,
+                'disease_type': disease_type,
+                'disease_name': Config.DISEASES[disease_type]['name'],
+                'prediction_result': 'Positive' if risk >= 50 else 'Negative',
+                'risk_level': 'High' if risk >= 66 else 'Medium' if risk >= 33 else 'Low',
+                'confidence_score': float(rng.uniform(50, 100)),
+                'risk_percentage': risk,
+                'model_accuracy': 90.0,
+                'input_features': json.dumps(sample_features(prediction_service, disease_type, i)),
+                'report_id': f'RPT_BENCH{i:06d}',
+                'created_at': now - timedelta(minutes=int(rng.integers(0, 365 * 24 * 60)))
+            })
+        db.session.execute(Prediction.__table__.insert(), rows)
+        db.session.commit()
+        app.config['BENCHMARK_USER_ID'] = user.id
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture(scope='session')
+def client(seeded_app):
+    client = seeded_app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(seeded_app.config['BENCHMARK_USER_ID'])
+        session['_fresh'] = True
+    return client
+
+
+@pytest.fixture
+def prediction(seeded_app):
+    from app.models.prediction import Prediction
+    return Prediction.query.first()
+
+
+@pytest.mark.parametrize('disease_type', DISEASE_TYPES)
+def test_predict(bench, prediction_service, disease_type):
+    features = sample_features(prediction_service, disease_type)
+    prediction_service.load_model(disease_type)
+
+    result = bench(lambda: prediction_service.predict(disease_type, features), rounds=10)
+
+    assert 'error' not in prediction_service.predict(disease_type, features)
+    assert result['median_ms'] > 0
+
+
+def test_load_model_cold(bench, prediction_service):
+    from app.services.prediction_service import PredictionService
+    prediction_service.load_model('heart_disease')
+
+    # A fresh service has nothing cached, so every call reads the model file
+    bench(lambda: PredictionService().load_model('heart_disease'), rounds=5, warmup=1)
+
+
+def test_load_model_warm(bench, prediction_service):
+    prediction_service.load_model('heart_disease')
+
+    bench(lambda: prediction_service.load_model('heart_disease'), rounds=200)
+
+
+def test_prediction_to_dict(bench, prediction):
+    bench(prediction.to_dict, rounds=200)
+
+
+def test_get_input_features(bench, prediction):
+    bench(prediction.get_input_features, rounds=200)
+
+
+def test_generate_report(bench, seeded_app, prediction):
+    from app import db
+    from app.models.user import User
+    from app.services.pdf_service import PDFService
+    service = PDFService()
+    user = db.session.get(User, prediction.user_id)
+
+    bench(lambda: service.generate_report(prediction, user), rounds=5, warmup=1)
+
+
+@pytest.mark.parametrize('endpoint', ANALYTICS_ENDPOINTS)
+def test_analytics_api(bench, client, endpoint):
+    assert client.get(endpoint).status_code == 200
+
+    bench(lambda: client.get(endpoint), rounds=10)
+
+
+def test_population_overview(bench, seeded_app):
+    from app.services.population_stats_service import PopulationStatsService
+    service = PopulationStatsService()
+    service.compact()
+
+    bench(service.overview, rounds=10)
+
+
+def test_population_daily(bench, seeded_app):
+    from app.services.population_stats_service import PopulationStatsService
+    service = PopulationStatsService()
+    service.compact()
+
+    bench(lambda: service.daily(days=365), rounds=10)
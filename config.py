@@ -18,17 +18,160 @@ class Config:
         'sqlite:///' + os.path.join(basedir, 'instance', 'multi_disease_analytics.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # SQLite production mode: WAL journal, tuned pragmas, a pool of query-only connections
+    # for every read and one serialized writer connection held only while a transaction writes
+    SQLITE_PRODUCTION_MODE = os.environ.get('SQLITE_PRODUCTION_MODE', 'false').lower() in ['true', 'on', '1']
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 268435456,
+        'cache_size': -16000,
+        'temp_store': 'MEMORY'
+    }
+    SQLITE_READ_POOL_SIZE = int(os.environ.get('SQLITE_READ_POOL_SIZE') or 8)
+    SQLITE_WRITER_TIMEOUT = 30
+    
+    # Read replicas: comma-separated database URLs serving the read-only views
+    # After writing, a user reads from the primary for READ_YOUR_WRITES_SECONDS
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS') or 5)
+    REPLICA_HEALTH_CHECK_INTERVAL = 10
+    
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     
+    # Logged-in user cache: seconds a loaded user is reused before it is read again
+    # With USER_SESSION_SNAPSHOT the user's fields also travel in the signed session cookie
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)
+    USER_CACHE_MAX_SIZE = 10000
+    USER_SESSION_SNAPSHOT = os.environ.get('USER_SESSION_SNAPSHOT', 'false').lower() in ['true', 'on', '1']
+    
+    # Password hashing: Werkzeug method string, e.g. scrypt:32768:8:1 or pbkdf2:sha256:600000
+    # Stored hashes made with other parameters are upgraded at the next login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PASSWORD_SALT_LENGTH = 16
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 2)
+    PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE') or 32)
+    PASSWORD_HASH_TIMEOUT = 10.0
+    
+    # Login throttling: failed attempts allowed per account within the window (seconds)
+    LOGIN_MAX_ATTEMPTS = int(os.environ.get('LOGIN_MAX_ATTEMPTS') or 5)
+    LOGIN_ATTEMPT_WINDOW = int(os.environ.get('LOGIN_ATTEMPT_WINDOW') or 300)
+    
     # ML Models
     ML_MODELS_PATH = os.path.join(basedir, 'app', 'ml_models')
     
-    # PDF Reports
+    # Decision tables: precompute predictions for diseases with a small discrete input space
+    DECISION_TABLES_ENABLED = os.environ.get('DECISION_TABLES_ENABLED', 'false').lower() in ['true', 'on', '1']
+    DECISION_TABLE_MAX_SIZE = int(os.environ.get('DECISION_TABLE_MAX_SIZE') or 262144)
+    
+    # What-if analysis: values tried per feature and rows scored per request
+    SENSITIVITY_MAX_POINTS = 11
+    SENSITIVITY_MAX_ROWS = 20000
+    
+    # Explanations: per-feature contributions from the forest decision paths
+    EXPLANATIONS_ENABLED = os.environ.get('EXPLANATIONS_ENABLED', 'true').lower() in ['true', 'on', '1']
+    EXPLANATION_TOP_FEATURES = 5
+    
+    # Inference server: e.g. unix:///tmp/mdra-inference.sock or tcp://127.0.0.1:5001
+    # When unset, models are loaded and scored inside each web worker
+    INFERENCE_SERVER_ADDRESS = os.environ.get('INFERENCE_SERVER_ADDRESS')
+    INFERENCE_POOL_SIZE = int(os.environ.get('INFERENCE_POOL_SIZE') or 4)
+    INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT') or 5.0)
+    
+    # Similar-case search: memory-mapped per-disease vector files
+    SIMILARITY_INDEX_PATH = os.path.join(basedir, 'instance', 'similarity')
+    
+    # Population statistics: predictions are folded into daily rollups by `flask rollup-stats`
+    # and by a background compactor every STATS_COMPACT_INTERVAL seconds and after every
+    # STATS_COMPACT_EVERY saved predictions (0 = off). Predictions younger than
+    # STATS_COMPACT_LAG_SECONDS are left in the tail: outside SQLite, ids can commit out of order
+    STATS_COMPACT_INTERVAL = int(os.environ.get('STATS_COMPACT_INTERVAL') or 0)
+    STATS_COMPACT_EVERY = int(os.environ.get('STATS_COMPACT_EVERY') or 0)
+    STATS_COMPACT_LAG_SECONDS = int(os.environ.get('STATS_COMPACT_LAG_SECONDS') or 60)
+    
+    # Archive: predictions older than this many days move to per-month files
+    # (kept past a year so the 365-day trends only read the hot table)
+    ARCHIVE_PATH = os.path.join(basedir, 'instance', 'archive')
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS') or 400)
+    
+    # Bulk deletion: predictions deleted per transaction, report files removed per batch
+    DELETION_CHUNK_SIZE = int(os.environ.get('DELETION_CHUNK_SIZE') or 1000)
+    REPORT_CLEANUP_BATCH_SIZE = int(os.environ.get('REPORT_CLEANUP_BATCH_SIZE') or 500)
+    
+    # Metrics: per-endpoint and per-stage latency histograms and query counts at /metrics
+    # (Prometheus text format); with METRICS_TOKEN set scrapers send it as a Bearer token,
+    # otherwise only local requests may read it
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() in ['true', 'on', '1']
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # Static assets: `flask build-assets` writes content-hashed, gzip/brotli-precompressed copies
+    # of the stylesheets and scripts to ASSETS_DIST_PATH, served from /assets as immutable;
+    # before a build asset_url() links the plain /static files
+    ASSETS_DIST_PATH = os.environ.get('ASSETS_DIST_PATH') or os.path.join(basedir, 'app', 'static', 'dist')
+    ASSETS_MAX_AGE = 365 * 24 * 3600
+    
+    # HTTP caching: private validators (ETag, Last-Modified) on prediction results, JSON and
+    # reports, which never change once written; browsers revalidate pages and keep JSON and
+    # PDFs for the max-age below
+    HTTP_CACHE_ENABLED = True
+    PREDICTION_CACHE_MAX_AGE = 3600
+    REPORT_CACHE_MAX_AGE = 24 * 3600
+    
+    # Delta sync: /predict/api/sync pages through the prediction change log (NDJSON streams
+    # every page in one response); `flask prune-changes` drops changes older than
+    # SYNC_RETENTION_DAYS and clients holding an older token resync from scratch
+    SYNC_RETENTION_DAYS = int(os.environ.get('SYNC_RETENTION_DAYS') or 30)
+    SYNC_PAGE_SIZE = 500
+    SYNC_MAX_PAGE_SIZE = 5000
+    
+    # Live updates: /analytics/api/stream pushes each user's new and deleted predictions to
+    # their open dashboards as server-sent events. EVENT_BROKER is the dotted path of the
+    # broker class; the default in-process one only reaches streams of the publishing worker
+    LIVE_UPDATES_ENABLED = os.environ.get('LIVE_UPDATES_ENABLED', 'true').lower() in ['true', 'on', '1']
+    EVENT_BROKER = os.environ.get('EVENT_BROKER') or 'app.services.live_update_service.InProcessBroker'
+    LIVE_UPDATES_QUEUE_SIZE = 100
+    LIVE_UPDATES_HEARTBEAT = 15
+    LIVE_UPDATES_IDLE_TIMEOUT = 300
+    LIVE_UPDATES_RETRY_MS = 3000
+    LIVE_UPDATES_MAX_STREAMS = 100
+    LIVE_UPDATES_MAX_STREAMS_PER_USER = 5
+    
+    # Response compression: gzip for HTML, JSON and text of at least COMPRESSION_MIN_SIZE bytes
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() in ['true', 'on', '1']
+    COMPRESSION_MIN_SIZE = 1024
+    COMPRESSION_LEVEL = 6
+    
+    # Templates: {% cache %} fragments are kept per worker (LRU of TEMPLATE_FRAGMENT_CACHE_SIZE);
+    # compiled templates are shared through the bytecode cache (`flask compile-templates`)
+    TEMPLATE_FRAGMENT_CACHE_ENABLED = os.environ.get('TEMPLATE_FRAGMENT_CACHE_ENABLED', 'true').lower() in ['true', 'on', '1']
+    TEMPLATE_FRAGMENT_CACHE_SIZE = 512
+    TEMPLATE_BYTECODE_CACHE_PATH = os.environ.get('TEMPLATE_BYTECODE_CACHE_PATH') or \
+        os.path.join(basedir, 'instance', 'template_cache')
+    
+    # Profiler: admin-triggered stack sampling (and optional allocation tracing) of this
+    # worker; sessions are capped in length and requests, and stop themselves when sampling
+    # costs more than PROFILER_MAX_OVERHEAD of wall time for two seconds in a row. Allocation
+    # tracing slows every allocation of the worker (model training runs ~40x slower), so it
+    # ends sooner: after PROFILER_MAX_TRACE_SECONDS or at PROFILER_MAX_TRACE_MB of traces
+    PROFILER_MAX_SECONDS = int(os.environ.get('PROFILER_MAX_SECONDS') or 300)
+    PROFILER_MAX_REQUESTS = 1000
+    PROFILER_MAX_OVERHEAD = 0.05
+    PROFILER_INTERVAL_MS = 10
+    PROFILER_MAX_TRACE_SECONDS = 30
+    PROFILER_MAX_TRACE_MB = 32
+    
+    # PDF Reports: sharded under REPORTS_PATH; the sweeper (every REPORT_SWEEP_INTERVAL
+    # seconds, 0 = only via `flask sweep-reports`) removes orphans and evicts the least
+    # recently downloaded reports down to REPORTS_QUOTA_TARGET of the quota
     REPORTS_PATH = os.path.join(basedir, 'reports')
+    REPORTS_QUOTA_MB = int(os.environ.get('REPORTS_QUOTA_MB') or 1024)
+    REPORTS_QUOTA_TARGET = 0.9
+    REPORT_SWEEP_INTERVAL = int(os.environ.get('REPORT_SWEEP_INTERVAL') or 0)
     
     # Upload limits
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file upload
@@ -81,6 +224,10 @@ class ProductionConfig(Config):
     DEBUG = False
     TESTING = False
     SESSION_COOKIE_SECURE = True
+    SQLITE_PRODUCTION_MODE = os.environ.get('SQLITE_PRODUCTION_MODE', 'true').lower() in ['true', 'on', '1']
+    REPORT_SWEEP_INTERVAL = int(os.environ.get('REPORT_SWEEP_INTERVAL') or 3600)
+    STATS_COMPACT_INTERVAL = int(os.environ.get('STATS_COMPACT_INTERVAL') or 300)
+    STATS_COMPACT_EVERY = int(os.environ.get('STATS_COMPACT_EVERY') or 1000)
 
 
 class TestingConfig(Config):
@@ -88,6 +235,8 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    TEMPLATE_BYTECODE_CACHE_PATH = None
+    ASSETS_DIST_PATH = None
 
 
 config = {
@@ -3,9 +3,11 @@ Application Entry Point
 Run this file to start the Multi-Disease Risk Analytics Platform
 """
 import os
+import click
 from app import create_app, db
 from app.models.user import User
 from app.models.prediction import Prediction
+from app.utils.migrations import upgrade_schema, MigrationError
 
 # Get environment or default to development
 env = os.environ.get('FLASK_ENV', 'development')
@@ -26,9 +28,23 @@ def make_shell_context():
 def init_db():
     """Initialize the database"""
     db.create_all()
+    upgrade_schema(db.engine)
     print("Database initialized successfully!")
 
 
+@app.cli.command()
+def upgrade_db():
+    """Bring a database created by an older version up to the current models"""
+    db.create_all()
+    try:
+        applied = upgrade_schema(db.engine)
+    except MigrationError as error:
+        raise click.ClickException(str(error))
+    for change in applied:
+        print(f"Upgraded {change}")
+    print(f"Database is up to date ({len(applied)} changes).")
+
+
 @app.cli.command()
 def create_admin():
     """Create an admin user"""
@@ -48,6 +64,168 @@ def create_admin():
     print("Password: admin123")
 
 
+@app.cli.command()
+def rollup_stats():
+    """Fold new predictions into the population statistics rollups"""
+    from app.services.population_stats_service import population_stats
+    
+    folded = population_stats.compact()
+    print(f"Folded {folded} predictions into daily rollups.")
+
+
+@app.cli.command()
+def rebuild_cohort_index():
+    """Rebuild the symptom bitmap indexes from stored predictions"""
+    from app.services.cohort_index_service import CohortIndexService
+    
+    indexed = CohortIndexService().rebuild()
+    print(f"Indexed {indexed} predictions.")
+
+
+@app.cli.command()
+def rebuild_similarity_index():
+    """Rebuild the similar-case vector files from stored predictions"""
+    from app.services.similarity_index_service import SimilarityIndexService
+    
+    service = SimilarityIndexService()
+    for disease_type in app.config['DISEASES']:
+        count = service.rebuild(disease_type)
+        print(f"{disease_type}: {count} predictions indexed")
+
+
+@app.cli.command()
+@click.option('--older-than-days', type=int, default=None, help='Defaults to ARCHIVE_AFTER_DAYS')
+def archive(older_than_days):
+    """Move old predictions into the monthly archive files"""
+    from app.services.archive_service import ArchiveService
+    
+    moved = ArchiveService().archive(older_than_days)
+    for month, count in sorted(moved.items()):
+        print(f"{month}: {count} predictions archived")
+    print(f"Archived {sum(moved.values())} predictions.")
+
+
+@app.cli.command()
+@click.option('--older-than-days', type=int, default=None, help='Defaults to SYNC_RETENTION_DAYS')
+def prune_changes(older_than_days):
+    """Delete prediction changes too old to be synced"""
+    from app.services.change_log_service import change_log
+    
+    print(f"Pruned {change_log.prune(older_than_days)} prediction changes.")
+
+
+@app.cli.command()
+@click.option('--batch-size', default=500, help='Predictions explained per commit')
+def explain_predictions(batch_size):
+    """Record the explanation of predictions saved without one"""
+    from app.services.prediction_service import PredictionService
+    
+    service = PredictionService()
+    explained = last_id = 0
+    while True:
+        rows = Prediction.query.filter(
+            Prediction.feature_contributions.is_(None),
+            Prediction.id > last_id
+        ).order_by(Prediction.id).limit(batch_size).all()
+        if not rows:
+            break
+        for prediction in rows:
+            contributions = service.explain(prediction.disease_type, prediction.get_input_features())
+            if contributions is not None:
+                prediction.set_feature_contributions(contributions)
+                explained += 1
+        last_id = rows[-1].id
+        db.session.commit()
+    print(f"Explained {explained} predictions.")
+
+
+@app.cli.command()
+def resume_deletions():
+    """Finish account deletions that were interrupted, and delete predictions left without a user"""
+    from app.services.deletion_service import DeletionService
+    
+    failed = 0
+    results = DeletionService().resume_account_deletions()
+    for user_id, result in results.items():
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"User {user_id}: failed ({result})")
+        else:
+            print(f"User {user_id}: {result} predictions deleted")
+    if failed:
+        raise click.ClickException(f"{failed} account deletions failed; run again to retry")
+    print(f"Resumed {len(results)} account deletions.")
+
+
+@app.cli.command()
+def sweep_reports():
+    """Remove orphaned report files and evict old ones over the disk quota"""
+    from app.services.report_storage_service import report_storage
+    
+    result = report_storage.sweep()
+    if result is None:
+        print("Another process is sweeping the reports directory.")
+        return
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+
+@app.cli.command()
+def build_assets():
+    """Fingerprint and precompress the static stylesheets and scripts"""
+    from app.utils.assets import assets
+    
+    manifest = assets.build(app.static_folder)
+    for name, built in sorted(manifest.items()):
+        print(f"{name} -> {built}")
+    print(f"Built {len(manifest)} assets into {app.config['ASSETS_DIST_PATH']}")
+
+
+@app.cli.command()
+def compile_templates():
+    """Compile every template into the shared bytecode cache"""
+    if not app.config.get('TEMPLATE_BYTECODE_CACHE_PATH'):
+        print("TEMPLATE_BYTECODE_CACHE_PATH is not set.")
+        return
+    
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    print(f"Compiled {len(names)} templates into {app.config['TEMPLATE_BYTECODE_CACHE_PATH']}")
+
+
+@app.cli.command()
+@click.option('--config', 'config_name', default=env, help='Configuration to start (default: FLASK_ENV)')
+@click.option('--limit', default=25, help='Number of packages and modules listed')
+def startup_profile(config_name, limit):
+    """Report the import time per module of a cold application start"""
+    from app.utils.startup import profile_startup
+    
+    profile = profile_startup(config_name, limit)
+    print(f"create_app: {profile['create_app_seconds'] * 1000:.1f} ms "
+          f"({profile['import_seconds'] * 1000:.1f} ms importing app, {profile['modules_imported']} modules)")
+    print(f"Heavy libraries loaded at startup: {', '.join(profile['heavy_modules']) or 'none'}")
+    print("\nSelf import time per package:")
+    for row in profile['packages']:
+        print(f"  {row['self_ms']:>8.2f} ms  {row['package']}")
+    print("\nSlowest modules (self / cumulative):")
+    for row in profile['modules']:
+        print(f"  {row['self_ms']:>8.2f} ms {row['cumulative_ms']:>9.2f} ms  {row['module']}")
+
+
+@app.cli.command()
+@click.option('--address', default=None, help='unix:///path.sock or tcp://host:port')
+def inference_server(address):
+    """Run the standalone model inference server"""
+    from app.services.inference_server import InferenceServer
+    
+    address = address or app.config.get('INFERENCE_SERVER_ADDRESS') or 'tcp://127.0.0.1:5001'
+    server = InferenceServer(address)
+    server.warm()
+    print(f"Inference server listening on {address}")
+    server.serve_forever()
+
+
 if __name__ == '__main__':
     # Ensure instance folder exists
     os.makedirs('instance', exist_ok=True)
@@ -57,6 +235,7 @@ if __name__ == '__main__':
     # Initialize database on first run
     with app.app_context():
         db.create_all()
+        upgrade_schema(db.engine)
         print("✓ Database initialized successfully!")
         print("✓ Starting Multi-Disease Risk Analytics Platform...")
         print("✓ Access the app at: http://localhost:5000")
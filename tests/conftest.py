@@ -0,0 +1,115 @@
+"""
+Shared Test Fixtures
+"""
+import pytest
+from flask import g
+from sqlalchemy import event
+from app import create_app, db
+from app.models.user import User
+from app.routes import auth as auth_routes
+from app.routes import predictions as prediction_routes
+from config import Config
+
+
+# Every file location the application writes to
+STORAGE_PATHS = (
+    'REPORTS_PATH', 'ML_MODELS_PATH', 'SIMILARITY_INDEX_PATH', 'ARCHIVE_PATH', 'TEMPLATE_BYTECODE_CACHE_PATH'
+)
+
+
+@pytest.fixture
+def tmp_storage(tmp_path, monkeypatch):
+    """Point every file location at the test's own directory, never at instance/"""
+    for name in STORAGE_PATHS:
+        monkeypatch.setattr(Config, name, str(tmp_path / name.lower()))
+    
+    # Services built by an earlier test still hold that test's similarity index
+    indexes = (prediction_routes.similarity_index, auth_routes.deletion.similarity_index)
+    for index in indexes:
+        index.reset()
+    yield tmp_path
+    for index in indexes:
+        index.reset()
+
+
+@pytest.fixture
+def app(tmp_storage):
+    """Application with an in-memory database and throwaway file storage"""
+    app = create_app('testing')
+    
+    # The app context pushed below lasts for the whole test, so g outlives each
+    # request; reset it so every request authenticates and routes like a real one
+    @app.teardown_request
+    def reset_request_globals(error):
+        g.pop('_login_user', None)
+        g.pop('db_read_only', None)
+    
+    with app.app_context():
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+        db.drop_all(bind_key=None)
+
+
+@pytest.fixture
+def user(app):
+    """A registered user"""
+    user = User(username='patient', email='patient@example.com')
+    user.set_password('secret123')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client(app, user):
+    """Test client logged in as the user"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+    return client
+
+
+class QueryRecorder:
+    """Records the SQL statements a block of code executes and measures the data they return"""
+    
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+    
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+    
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+    
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+    
+    @property
+    def count(self):
+        return len(self.statements)
+    
+    def bytes_fetched(self):
+        """Replay the recorded SELECTs and add up the size of every value returned"""
+        total = 0
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            for statement, parameters in self.statements:
+                if not statement.lstrip().upper().startswith('SELECT'):
+                    continue
+                for row in cursor.execute(statement, parameters).fetchall():
+                    for value in row:
+                        total += len(value) if isinstance(value, (str, bytes)) else 8
+        finally:
+            connection.close()
+        return total
+
+
+@pytest.fixture
+def query_recorder(app):
+    """Factory for QueryRecorder bound to the test database"""
+    return lambda: QueryRecorder(db.engine)
@@ -0,0 +1,80 @@
+"""
+Old predictions move to monthly archive files and stay readable on request
+"""
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.prediction import Prediction
+from app.routes import predictions as prediction_routes
+from app.services.archive_service import ArchiveService
+from app.services.population_stats_service import PopulationStatsService
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    service = ArchiveService(archive_path=str(tmp_path / 'archive'))
+    monkeypatch.setattr(prediction_routes, 'archive', service)
+    return service
+
+
+@pytest.fixture
+def history(user):
+    """Six predictions 500-560 days old and four recent ones"""
+    now = datetime.utcnow()
+    ages = [560, 540, 530, 520, 510, 500, 30, 20, 10, 1]
+    for i, age in enumerate(ages):
+        prediction = Prediction(
+            user_id=user.id, disease_type='diabetes', disease_name='Diabetes',
+            prediction_result='Positive' if i % 2 else 'Negative', risk_level='High' if i % 2 else 'Low',
+            confidence_score=80.0, model_accuracy=90.0, risk_percentage=70.0 if i % 2 else 20.0,
+            created_at=now - timedelta(days=age), notes='archived notes ' * 50
+        )
+        prediction.set_input_features({'Glucose': 100 + i})
+        db.session.add(prediction)
+    db.session.commit()
+
+
+def test_archive_moves_old_predictions(history, archive):
+    before = PopulationStatsService().overview()['overall']
+    
+    moved = archive.archive(older_than_days=400)
+    
+    assert sum(moved.values()) == 6
+    assert len(archive.files()) == len(moved) >= 2
+    assert Prediction.query.count() == 4
+    assert PopulationStatsService().overview()['overall'] == before
+    assert archive.archive(older_than_days=400) == {}
+
+
+def test_archived_predictions_read_back(history, archive, user):
+    archive.archive(older_than_days=400)
+    
+    archived = archive.user_predictions(user.id)
+    assert len(archived) == 6
+    assert all(p.archived for p in archived)
+    assert archived[0].created_at > archived[-1].created_at
+    assert archived[0].get_input_features() == {'Glucose': 105}
+    assert archived[0].notes.startswith('archived notes')
+    assert set(archive.get_predictions([p.id for p in archived])) == {p.id for p in archived}
+    assert archive.count_user_predictions(user.id, risk_level='High') == 3
+
+
+def test_history_includes_archive_when_asked(client, user, history, archive, monkeypatch):
+    archive.archive(older_than_days=400)
+    monkeypatch.setattr(prediction_routes.Config, 'PREDICTIONS_PER_PAGE', 3)
+    
+    def rows(url):
+        return client.get(url).data.count(b'/predict/result/')
+    
+    assert rows('/predict/history?page=2') == 1
+    assert rows('/predict/history?archived=1&page=2') == 3
+    assert rows('/predict/history?archived=1&page=4') == 1
+    
+    archived_id = archive.user_predictions(user.id)[0].id
+    response = client.get(f'/predict/result/{archived_id}')
+    assert response.status_code == 200
+    assert b'action-btn primary">Download PDF Report' not in response.data
+    
+    
+    hot_id = Prediction.query.first().id
+    assert b'action-btn primary">Download PDF Report' in client.get(f'/predict/result/{hot_id}').data
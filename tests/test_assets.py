@@ -0,0 +1,80 @@
+"""
+Static assets are fingerprinted and precompressed; dynamic responses are gzipped on the fly
+"""
+import gzip
+import os
+from flask import Response, stream_with_context
+from app import create_app
+from app.utils.assets import assets
+from config import TestingConfig
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+def test_built_assets_are_fingerprinted_and_immutable(tmp_path, monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'ASSETS_DIST_PATH', str(tmp_path / 'dist'))
+    app = create_app('testing')
+    manifest = assets.build(app.static_folder)
+    
+    built = manifest['css/main.css']
+    assert built.startswith('css/main.') and built != 'css/main.css'
+    assert os.path.exists(tmp_path / 'dist' / (built + '.gz'))
+    assert 'js/base.js' in manifest and 'css/result.css' in manifest
+    
+    client = app.test_client()
+    assert f'/assets/{built}'.encode() in client.get('/').data
+    
+    response = client.get(f'/assets/{built}', headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'Accept-Encoding' in response.headers['Vary']
+    with open(os.path.join(app.static_folder, 'css', 'main.css'), 'rb') as f:
+        assert gzip.decompress(response.get_data()) == f.read()
+    response.close()
+    
+    plain = client.get(f'/assets/{built}')
+    assert 'Content-Encoding' not in plain.headers
+    plain.close()
+    
+    # A rebuild without changes keeps the names, so browser caches stay valid
+    assert assets.build(app.static_folder) == manifest
+
+
+def test_unbuilt_assets_fall_back_to_static(client):
+    assert b'/static/css/main.css' in client.get('/dashboard').data
+
+
+def test_html_is_gzipped_for_clients_that_accept_it(client):
+    plain = client.get('/dashboard')
+    compressed = client.get('/dashboard', headers=GZIP)
+    
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert len(compressed.data) < len(plain.data)
+    assert gzip.decompress(compressed.data) == plain.data
+
+
+def test_small_and_streamed_responses():
+    app = create_app('testing')
+    
+    @app.route('/small')
+    def small():
+        return {'ok': True}
+    
+    @app.route('/stream')
+    def stream():
+        rows = (f'{{"row": {i}}}\n' for i in range(500))
+        return Response(stream_with_context(rows), mimetype='application/x-ndjson')
+    
+    client = app.test_client()
+    assert 'Content-Encoding' not in client.get('/small', headers=GZIP).headers
+    
+    response = client.get('/stream', headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    lines = gzip.decompress(response.get_data()).decode().splitlines()
+    assert len(lines) == 500 and lines[-1] == '{"row": 499}'
+
+
+def test_scripts_get_result_urls_with_an_id_placeholder(client):
+    page = client.get('/predict/diabetes').get_data(as_text=True)
+    assert 'data-result-url="/predict/result/{id}"' in page
@@ -0,0 +1,121 @@
+"""
+Cohort bitmaps answer symptom queries like a scan of the table, even when workers index at once
+"""
+import json
+import threading
+import time
+import pytest
+from sqlalchemy.dialects import postgresql
+import config as config_module
+from config import TestingConfig
+from app import create_app, db
+from app.models.cohort_bitmap import CohortBitmap
+from app.models.prediction import Prediction
+from app.services.cohort_index_service import CohortIndexService
+
+
+@pytest.fixture
+def app(tmp_storage, tmp_path, monkeypatch):
+    """A database file, so indexing threads have connections of their own"""
+    class FileDatabaseConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'cohort.db')
+    
+    monkeypatch.setitem(config_module.config, 'cohort-test', FileDatabaseConfig)
+    app = create_app('cohort-test')
+    with app.app_context():
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def cohort(app):
+    return CohortIndexService()
+
+
+def _predictions(user, count):
+    rows = []
+    for i in range(count):
+        prediction = Prediction(
+            user_id=user.id, disease_type='stroke', disease_name='Stroke',
+            prediction_result='Positive' if i % 2 else 'Negative', risk_level=('Low', 'Medium', 'High')[i % 3]
+        )
+        prediction.set_input_features({'smoking': i % 2, 'high_bp': i % 3 % 2, 'age': 40 + i})
+        db.session.add(prediction)
+        rows.append(prediction)
+    db.session.commit()
+    return rows
+
+
+def _scan(rows, smoking, risk_level):
+    """Ids of the rows matching the conditions, newest first"""
+    return sorted(
+        (p.id for p in rows if json.loads(p.input_features)['smoking'] == smoking and p.risk_level == risk_level),
+        reverse=True
+    )
+
+
+def test_queries_match_a_scan(cohort, user):
+    rows = _predictions(user, 30)
+    for prediction in rows:
+        cohort.index_prediction(prediction)
+    db.session.commit()
+    
+    result = cohort.query('stroke', {'smoking': [1], 'risk_level': [2]}, per_page=100)
+    assert result['prediction_ids'] == _scan(rows, 1, 'High')
+    assert result['count'] == len(result['prediction_ids']) == 5
+    
+    # Age has too many answers to be indexed
+    assert 'age' not in cohort.indexed_features['stroke']
+    
+    cohort.unindex_predictions(rows[:10])
+    db.session.commit()
+    remaining = cohort.query('stroke', {'smoking': [1], 'risk_level': [2]}, per_page=100)['prediction_ids']
+    assert remaining == _scan(rows[10:], 1, 'High')
+    
+    # A rebuild from the table gives the same bitmaps as the incremental updates
+    for prediction in rows[:10]:
+        cohort.index_prediction(prediction)
+    db.session.commit()
+    incremental = {(r.feature, r.value, r.chunk): r.get_bits().tobytes() for r in CohortBitmap.query}
+    assert cohort.rebuild() == 30
+    assert {(r.feature, r.value, r.chunk): r.get_bits().tobytes() for r in CohortBitmap.query} == incremental
+
+
+def test_concurrent_adds_keep_every_bit(app, cohort, user, monkeypatch):
+    ids = [p.id for p in _predictions(user, 8)]
+    
+    # Widen the window between reading a bitmap and writing it back
+    get_bits = CohortBitmap.get_bits
+    
+    def slow_get_bits(self):
+        bits = get_bits(self)
+        time.sleep(0.02)
+        return bits
+    
+    monkeypatch.setattr(CohortBitmap, 'get_bits', slow_get_bits)
+    
+    def index(prediction_id):
+        with app.app_context():
+            cohort.index_prediction(db.session.get(Prediction, prediction_id))
+            db.session.commit()
+            db.session.remove()
+    
+    threads = [threading.Thread(target=index, args=(prediction_id,)) for prediction_id in ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    db.session.rollback()
+    assert cohort.query('stroke', {'prediction_result': [0, 1]}, per_page=100)['prediction_ids'] == ids[::-1]
+
+
+def test_updates_lock_only_the_bitmaps_they_change(cohort):
+    query = cohort._locked_rows('stroke', 0, [('risk_level', 2), ('smoking', 1)])
+    sql = str(query.statement.compile(dialect=postgresql.dialect()))
+    assert '(cohort_bitmaps.feature, cohort_bitmaps.value) IN' in sql
+    assert sql.rstrip().endswith('FOR UPDATE')
+    assert 'LOCK TABLE' not in sql
@@ -0,0 +1,62 @@
+"""
+Decision tables answer exactly what the model would, and step aside outside their domain
+"""
+import numpy as np
+import pytest
+from config import Config
+from app.services.decision_table import DecisionTable
+from app.services.prediction_service import PredictionService
+
+DISEASES = list(PredictionService().disease_features)
+
+
+@pytest.fixture
+def service(tmp_storage):
+    return PredictionService()
+
+
+def _ranges(service, disease_type):
+    """The form ranges of a disease, narrowed to two values per feature when the table would be too big"""
+    ranges = [service.feature_ranges[disease_type][f] for f in service.disease_features[disease_type]]
+    if DecisionTable.domain_size(ranges) > Config.DECISION_TABLE_MAX_SIZE:
+        ranges = [(low, min(high, low + 1)) for low, high in ranges]
+    return ranges
+
+
+@pytest.mark.parametrize('disease_type', DISEASES)
+def test_lookup_matches_predict_proba(service, disease_type):
+    model = service.load_model(disease_type)
+    ranges = _ranges(service, disease_type)
+    table = DecisionTable.compile(model, ranges)
+    assert table.size == DecisionTable.domain_size(ranges)
+    
+    rng = np.random.default_rng(0)
+    samples = np.array([[rng.integers(low, high + 1) for low, high in ranges] for _ in range(200)], dtype=np.float64)
+    looked_up = np.array([table.lookup(list(sample)) for sample in samples])
+    np.testing.assert_allclose(looked_up, model.predict_proba(samples), rtol=0, atol=1e-12)
+    
+    # The corners of the domain too
+    for corner in ([low for low, _ in ranges], [high for _, high in ranges]):
+        np.testing.assert_allclose(table.lookup(corner), model.predict_proba([corner])[0], rtol=0, atol=1e-12)
+
+
+def test_inputs_outside_the_table_use_the_model(service, monkeypatch):
+    monkeypatch.setattr(Config, 'DECISION_TABLES_ENABLED', True)
+    table = service.compile_decision_table('covid19')
+    assert table is not None
+    features = service.disease_features['covid19']
+    
+    inside = {feature: 1 for feature in features}
+    outside = [dict(inside, fever=2), dict(inside, fever=0.5), dict(inside, fever=-1)]
+    for values in outside:
+        assert table.lookup(service.get_feature_values('covid19', values)) is None
+    
+    direct = PredictionService()
+    direct.models['covid19'] = service.models['covid19']
+    for values in [inside] + outside:
+        assert service.predict('covid19', values) == direct.predict('covid19', values)
+    assert 'covid19' not in direct.decision_tables
+    
+    # Diseases whose input space is too large get no table at all
+    assert service.compile_decision_table('diabetes') is None
+    assert 'diabetes' not in service.decision_tables
@@ -0,0 +1,154 @@
+"""
+Predictions and accounts are deleted in bulk, with their index entries and reports
+"""
+import os
+from datetime import datetime
+import numpy as np
+import pytest
+from app import db
+from app.models.user import User
+from app.models.prediction import Prediction
+from app.models.cohort_bitmap import CohortBitmap
+from app.models.account_deletion import AccountDeletion
+from app.routes import auth as auth_routes
+from app.routes import predictions as prediction_routes
+from app.services import deletion_service
+from app.services.archive_service import ArchiveService
+from app.services.deletion_service import DeletionService, report_cleaner
+
+
+@pytest.fixture
+def deletion(tmp_path, monkeypatch):
+    service = DeletionService(
+        cohort_index=prediction_routes.cohort_index,
+        archive=ArchiveService(archive_path=str(tmp_path / 'archive')),
+        chunk_size=3
+    )
+    monkeypatch.setattr(prediction_routes, 'deletion', service)
+    monkeypatch.setattr(auth_routes, 'deletion', service)
+    return service
+
+
+@pytest.fixture
+def predictions(app, user, tmp_path):
+    """Seven indexed predictions of the user, each with a report file"""
+    reports = tmp_path / 'reports'
+    reports.mkdir(exist_ok=True)
+    rows = []
+    for i in range(7):
+        prediction = Prediction(
+            user_id=user.id, disease_type='diabetes', disease_name='Diabetes',
+            prediction_result='Positive' if i % 2 else 'Negative', risk_level='High' if i % 2 else 'Low',
+            confidence_score=80.0, model_accuracy=90.0, risk_percentage=50.0,
+            created_at=datetime.utcnow(), report_id=f'RPT_{i}', report_path=str(reports / f'report_RPT_{i}.pdf')
+        )
+        prediction.set_input_features({'Glucose': 100 + i, 'Age': 40})
+        db.session.add(prediction)
+        rows.append(prediction)
+    db.session.flush()
+    for prediction in rows:
+        prediction_routes.cohort_index.index_prediction(prediction)
+        open(prediction.report_path, 'wb').close()
+    db.session.commit()
+    return rows
+
+
+def _indexed_count():
+    """Predictions present in the risk level bitmaps"""
+    rows = CohortBitmap.query.filter_by(disease_type='diabetes', feature='risk_level').all()
+    return sum(int(np.unpackbits(row.get_bits()).sum()) for row in rows)
+
+
+def test_bulk_delete_removes_rows_index_bits_and_reports(client, predictions, deletion):
+    doomed = [p.id for p in predictions[:5]]
+    paths = [p.report_path for p in predictions[:5]]
+    
+    response = client.post('/predict/delete', data={'prediction_ids': [str(pid) for pid in doomed]})
+    assert response.status_code == 302
+    report_cleaner.wait()
+    
+    assert Prediction.query.count() == 2
+    assert _indexed_count() == 2
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_bulk_delete_ignores_other_users(client, predictions, deletion):
+    other = User(username='other', email='other@example.com', password_hash='x')
+    db.session.add(other)
+    db.session.commit()
+    
+    assert deletion.delete_predictions(other.id, [p.id for p in predictions]) == 0
+    assert Prediction.query.count() == 7
+
+
+def test_account_deletion_runs_in_background(client, user, predictions, deletion):
+    user_id = user.id
+    
+    response = client.post('/auth/delete-account', data={'password': 'wrong'})
+    assert response.status_code == 302
+    assert db.session.get(User, user_id).is_active
+    
+    response = client.post('/auth/delete-account', data={'password': 'secret123'})
+    assert response.status_code == 302
+    # The worker runs one deletion at a time, so this waits for the one just scheduled
+    deletion_service._account_executor.submit(lambda: None).result()
+    
+    db.session.expire_all()
+    assert db.session.get(User, user_id) is None
+    assert Prediction.query.count() == 0
+    assert _indexed_count() == 0
+    assert client.get('/predict/history').status_code == 302
+
+
+def test_interrupted_account_deletion_is_resumed(client, user, predictions, deletion, monkeypatch):
+    user_id = user.id
+    delete_chunk = deletion._delete_chunk
+    
+    def crash_after_first_chunk(*args):
+        monkeypatch.setattr(deletion, '_delete_chunk', crash)
+        return delete_chunk(*args)
+    
+    def crash(*args):
+        raise RuntimeError('worker lost')
+    
+    monkeypatch.setattr(deletion, '_delete_chunk', crash_after_first_chunk)
+    client.post('/auth/delete-account', data={'password': 'secret123'})
+    deletion_service._account_executor.submit(lambda: None).result()
+    
+    # Deactivated, partly deleted, and recorded as pending
+    db.session.expire_all()
+    assert not db.session.get(User, user_id).is_active
+    assert Prediction.query.count() == _indexed_count() == 4
+    pending = db.session.get(AccountDeletion, user_id)
+    assert pending.attempts == 1 and pending.last_error == 'RuntimeError: worker lost'
+    
+    monkeypatch.setattr(deletion, '_delete_chunk', delete_chunk)
+    assert deletion.resume_account_deletions() == {user_id: 4}
+    assert db.session.get(User, user_id) is None
+    assert Prediction.query.count() == _indexed_count() == 0
+    assert AccountDeletion.query.count() == 0
+    assert deletion.resume_account_deletions() == {}
+
+
+def test_prediction_saved_during_account_deletion_is_unindexed(user, predictions, deletion, monkeypatch):
+    user_id = user.id
+    delete_chunk = deletion._delete_chunk
+    late = []
+    
+    def save_one_late(*args):
+        deleted = delete_chunk(*args)
+        if not deleted and not late:
+            prediction = Prediction(user_id=user_id, disease_type='diabetes', disease_name='Diabetes',
+                                    prediction_result='Positive', risk_level='High')
+            prediction.set_input_features({'Glucose': 150, 'Age': 40})
+            db.session.add(prediction)
+            db.session.flush()
+            prediction_routes.cohort_index.index_prediction(prediction)
+            db.session.commit()
+            late.append(prediction.id)
+        return deleted
+    
+    monkeypatch.setattr(deletion, '_delete_chunk', save_one_late)
+    assert deletion.delete_account(user_id) == 8
+    assert db.session.get(User, user_id) is None
+    assert Prediction.query.count() == _indexed_count() == 0
@@ -0,0 +1,85 @@
+"""
+Prediction results, JSON and reports revalidate with 304s and reports support byte ranges
+"""
+from app import db
+from app.models.prediction import Prediction
+from app.routes import reports as report_routes
+
+
+def _prediction(user):
+    prediction = Prediction(
+        user_id=user.id, disease_type='diabetes', disease_name='Diabetes', prediction_result='Negative',
+        risk_level='Low', confidence_score=80.0, model_accuracy=90.0, risk_percentage=20.0
+    )
+    prediction.set_input_features({'age': 45, 'gender': 1, 'height': 170, 'weight': 80, 'fatigue': 5})
+    prediction.set_feature_contributions({'age': 1.5})
+    prediction.generate_report_id()
+    db.session.add(prediction)
+    db.session.commit()
+    return prediction
+
+
+def test_result_page_revalidates(client, user):
+    prediction = _prediction(user)
+    url = f'/predict/result/{prediction.id}'
+    
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+    etag = first.headers['ETag']
+    
+    again = client.get(url, headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.data == b''
+    
+    # The compressed page carries a weak tag, which revalidates too
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['ETag'].startswith('W/')
+    assert client.get(url, headers={'If-None-Match': compressed.headers['ETag']}).status_code == 304
+    
+    # Generating the report changes the page
+    prediction.report_generated = True
+    db.session.commit()
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_prediction_json_is_cached_privately(client, user):
+    prediction = _prediction(user)
+    url = f'/predict/api/prediction/{prediction.id}'
+    
+    response = client.get(url)
+    assert response.get_json()['report_id'] == prediction.report_id
+    assert response.headers['Cache-Control'] == 'private, max-age=3600'
+    assert 'Cookie' in response.headers['Vary']
+    
+    since = client.get(url, headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert since.status_code == 304
+    assert client.get(f'/predict/api/prediction/{prediction.id + 1}').status_code == 404
+
+
+def test_report_is_generated_once_and_served_in_ranges(client, user, monkeypatch):
+    prediction = _prediction(user)
+    generated = []
+    generate = report_routes.pdf_service.generate_report
+    monkeypatch.setattr(report_routes.pdf_service, 'generate_report',
+                        lambda *args: generated.append(args) or generate(*args))
+    url = f'/reports/generate/{prediction.id}'
+    
+    first = client.get(url)
+    pdf = first.data
+    assert pdf.startswith(b'%PDF')
+    assert 'private' in first.headers['Cache-Control'] and 'public' not in first.headers['Cache-Control']
+    
+    second = client.get(url)
+    assert second.data == pdf
+    assert len(generated) == 1
+    
+    part = client.get(f'/reports/download/{prediction.id}', headers={'Range': 'bytes=0-99'})
+    assert part.status_code == 206
+    assert part.data == pdf[:100]
+    assert part.headers['Content-Range'] == f'bytes 0-99/{len(pdf)}'
+    
+    cached = client.get(f'/reports/download/{prediction.id}', headers={'If-None-Match': first.headers['ETag']})
+    assert cached.status_code == 304
+    
+    # PDFs are already compressed and are never gzipped again
+    assert 'Content-Encoding' not in client.get(url, headers={'Accept-Encoding': 'gzip'}).headers
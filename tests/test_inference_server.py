@@ -0,0 +1,110 @@
+"""
+Web workers score on a separate inference server, and locally when it is down
+"""
+import threading
+import time
+import pytest
+from app.services.inference_server import InferenceClient, InferenceServer
+from app.services.prediction_service import PredictionService
+
+FEATURES = {'age': 45, 'gender': 1, 'height': 170, 'weight': 80, 'fatigue': 5}
+
+
+@pytest.fixture
+def address(tmp_storage):
+    return f'unix://{tmp_storage / "inference.sock"}'
+
+
+@pytest.fixture
+def server(address):
+    server = InferenceServer(address)
+    server.start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def inference(server, address):
+    client = InferenceClient(address, pool_size=2, timeout=5.0)
+    yield client
+    client.close()
+
+
+def test_ping(inference):
+    assert inference.ping()
+
+
+def test_predict_sensitivity_and_explain_match_the_service(server, inference):
+    assert inference.predict('diabetes', FEATURES) == server.service.predict('diabetes', FEATURES)
+    assert inference.predict_many([('diabetes', FEATURES), ('anemia', FEATURES)]) == [
+        server.service.predict('diabetes', FEATURES),
+        server.service.predict('anemia', FEATURES)
+    ]
+    assert inference.explain('diabetes', FEATURES) == server.service.explain('diabetes', FEATURES)
+    
+    # Pairwise features travel as a list and are a set again on the server
+    pairwise = inference.sensitivity('diabetes', FEATURES, pairwise={'age', 'fatigue'})
+    assert pairwise == server.service.sensitivity('diabetes', FEATURES, pairwise={'age', 'fatigue'})
+    assert [entry['features'] for entry in pairwise['pairwise']] == [['age', 'fatigue']]
+    
+    # Only the server loaded models
+    assert sorted(server.service.models) == ['anemia', 'diabetes']
+    assert inference.local.models == {}
+
+
+def test_server_errors_are_raised(inference):
+    with pytest.raises(RuntimeError, match='Unknown operation'):
+        inference._call('train', [])
+
+
+def test_falls_back_to_local_scoring_when_the_server_is_down(address):
+    inference = InferenceClient(address, timeout=1.0, retry_interval=60)
+    assert not inference.ping()
+    
+    local = PredictionService()
+    assert inference.predict('diabetes', FEATURES) == local.predict('diabetes', FEATURES)
+    assert 'diabetes' in inference.local.models
+    
+    # The server is not tried again until the retry interval has passed
+    assert inference._down_until > time.monotonic()
+    server = InferenceServer(address)
+    server.start()
+    try:
+        inference.predict('anemia', FEATURES)
+        assert server.service.models == {}
+        
+        inference._down_until = 0.0
+        inference.predict('anemia', FEATURES)
+        assert list(server.service.models) == ['anemia']
+    finally:
+        server.shutdown()
+        inference.close()
+
+
+def test_without_fallback_errors_reach_the_caller(address):
+    inference = InferenceClient(address, timeout=1.0, fallback=False)
+    with pytest.raises(OSError):
+        inference.predict('diabetes', FEATURES)
+
+
+def test_concurrent_first_loads_create_one_model(tmp_storage, monkeypatch):
+    service = PredictionService()
+    created = []
+    create = service._create_dummy_model
+    
+    def slow_create(disease_type):
+        created.append(disease_type)
+        time.sleep(0.1)
+        return create(disease_type)
+    
+    monkeypatch.setattr(service, '_create_dummy_model', slow_create)
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(service.load_model('diabetes'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert created == ['diabetes']
+    assert all(model is models[0] for model in models)
+    assert not list((tmp_storage / 'ml_models_path').glob('*.tmp'))
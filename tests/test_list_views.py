@@ -0,0 +1,62 @@
+"""
+List views must not load the per-prediction JSON blobs they never display
+"""
+import pytest
+from app import db
+from app.models.prediction import Prediction
+
+
+HEAVY_COLUMNS = ('input_features', 'notes', 'feature_contributions')
+
+
+@pytest.fixture
+def history(user):
+    """Forty predictions, each carrying about 8 KB of JSON and notes"""
+    for i in range(40):
+        prediction = Prediction(
+            user_id=user.id,
+            disease_type='diabetes',
+            disease_name='Diabetes',
+            prediction_result='Positive' if i % 2 else 'Negative',
+            risk_level='High' if i % 2 else 'Low',
+            confidence_score=80.0,
+            risk_percentage=70.0 if i % 2 else 20.0,
+            notes='n' * 4000
+        )
+        prediction.set_input_features({f'feature_{j}': j for j in range(300)})
+        prediction.set_feature_contributions({f'feature_{j}': 0.5 for j in range(20)})
+        prediction.report_id = f'RPT_TEST{i:04d}'
+        db.session.add(prediction)
+    db.session.commit()
+
+
+@pytest.mark.parametrize('url, max_queries, max_bytes', [
+    ('/predict/history', 4, 8000),
+    ('/dashboard', 6, 4000),
+    ('/analytics/api/recent-activity', 2, 2000),
+])
+def test_list_views_skip_heavy_columns(client, history, query_recorder, url, max_queries, max_bytes):
+    with query_recorder() as recorder:
+        response = client.get(url)
+    
+    assert response.status_code == 200
+    assert recorder.count <= max_queries
+    
+    # COUNT(*) wrappers select no row data, so only row-returning queries are checked
+    prediction_selects = [
+        s for s, _ in recorder.statements
+        if 'FROM predictions' in s and not s.startswith('SELECT count(*)')
+    ]
+    assert prediction_selects
+    for statement in prediction_selects:
+        for column in HEAVY_COLUMNS:
+            assert f'predictions.{column}' not in statement
+    
+    assert recorder.bytes_fetched() <= max_bytes
+
+
+def test_recent_activity_payload(client, history):
+    activity = client.get('/analytics/api/recent-activity').get_json()
+    
+    assert len(activity) == 10
+    assert set(activity[0]) == {'id', 'disease', 'result', 'risk_level', 'date'}
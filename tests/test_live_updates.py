@@ -0,0 +1,90 @@
+"""
+Open dashboards get deltas of new and deleted predictions as server-sent events
+"""
+import json
+import pytest
+from config import TestingConfig
+from app.services.live_update_service import live_updates
+
+FEATURES = {'age': 45, 'gender': 1, 'height': 170, 'weight': 80, 'fatigue': 5}
+
+
+@pytest.fixture
+def short_streams(monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'LIVE_UPDATES_HEARTBEAT', 0.05, raising=False)
+    monkeypatch.setattr(TestingConfig, 'LIVE_UPDATES_IDLE_TIMEOUT', 0.2, raising=False)
+    monkeypatch.setattr(TestingConfig, 'LIVE_UPDATES_QUEUE_SIZE', 4, raising=False)
+    monkeypatch.setattr(TestingConfig, 'LIVE_UPDATES_MAX_STREAMS_PER_USER', 2, raising=False)
+
+
+@pytest.fixture
+def app(short_streams, app):
+    return app
+
+
+def _events(response):
+    """(event, data) of every frame until the stream closes"""
+    events = []
+    for chunk in response.response:
+        fields = dict(line.split(': ', 1) for line in chunk.decode().splitlines() if ': ' in line)
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    response.close()
+    return events
+
+
+def test_saved_and_deleted_predictions_are_pushed(client):
+    stream = client.get('/analytics/api/stream', buffered=False)
+    assert stream.mimetype == 'text/event-stream'
+    
+    saved = client.post('/predict/api/diabetes', json=FEATURES).get_json()
+    assert client.post(f"/predict/delete/{saved['prediction_id']}").status_code == 302
+    
+    events = _events(stream)
+    assert [event for event, _ in events] == ['ready', 'created', 'deleted']
+    created, deleted = events[1][1], events[2][1]
+    assert created['id'] == deleted['id'] == saved['prediction_id']
+    assert created['disease'] == 'Diabetes' and created['risk_level'] == saved['risk_level']
+    assert created['month'] == deleted['month']
+
+
+def test_streams_resume_from_the_last_event(client, user):
+    # The first frame after the retry interval gives the position to resume from
+    first = client.get('/analytics/api/stream', buffered=False)
+    frames = iter(first.response)
+    assert next(frames).startswith(b'retry: ')
+    last_id = next(frames).decode().split('\n')[0][len('id: '):]
+    first.close()
+    
+    live_updates._publish(user.id, 'created', {'id': 1})
+    live_updates._publish(user.id, 'created', {'id': 2})
+    resumed = client.get('/analytics/api/stream', headers={'Last-Event-ID': last_id}, buffered=False)
+    assert _events(resumed) == [('created', {'id': 1}), ('created', {'id': 2})]
+    
+    unknown = client.get('/analytics/api/stream', headers={'Last-Event-ID': 'elsewhere-3'}, buffered=False)
+    assert _events(unknown) == [('resync', {})]
+
+
+def test_slow_clients_are_told_to_resync(client, user):
+    stream = client.get('/analytics/api/stream', buffered=False)
+    for i in range(10):
+        live_updates._publish(user.id, 'created', {'id': i})
+    
+    events = _events(stream)
+    assert events[0] == ('resync', {})
+    assert len(events) < 10
+
+
+def test_streams_per_user_are_limited(client):
+    streams = [client.get('/analytics/api/stream', buffered=False) for _ in range(2)]
+    refused = client.get('/analytics/api/stream')
+    assert refused.status_code == 429 and 'Retry-After' in refused.headers
+    
+    for stream in streams:
+        stream.close()
+    assert live_updates.stream_count() == 0
+
+
+def test_pushed_predictions_link_through_an_id_placeholder(client):
+    page = client.get('/dashboard').get_data(as_text=True)
+    assert 'data-result-url="/predict/result/{id}"' in page
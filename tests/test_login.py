@@ -0,0 +1,65 @@
+"""
+Login hashing runs on the bounded pool, upgrades old hashes and throttles retries
+"""
+import pytest
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models.user import User
+from app.services.password_service import password_hasher, HashingBusyError
+
+
+def login(client, password):
+    return client.post('/auth/login', data={'username': 'patient', 'password': password})
+
+
+def test_login_rehashes_outdated_hash(app, user):
+    user.password_hash = generate_password_hash('secret123', 'pbkdf2:sha256:1000')
+    db.session.commit()
+    
+    assert login(app.test_client(), 'secret123').status_code == 302
+    
+    db.session.expire_all()
+    stored = db.session.get(User, user.id).password_hash
+    assert stored.startswith('scrypt:32768:8:1$')
+    assert not password_hasher.needs_rehash(stored)
+
+
+def test_failed_logins_are_throttled_before_hashing(app, user):
+    client = app.test_client()
+    for _ in range(app.config['LOGIN_MAX_ATTEMPTS']):
+        assert login(client, 'wrong').status_code == 200
+    
+    hashed = password_hasher.hashed
+    response = login(client, 'secret123')
+    
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
+    assert password_hasher.hashed == hashed
+
+
+def test_full_queue_is_rejected(app, user, monkeypatch):
+    monkeypatch.setattr(password_hasher.slots, 'acquire', lambda blocking=True: False)
+    
+    assert login(app.test_client(), 'secret123').status_code == 503
+    with pytest.raises(HashingBusyError):
+        user.check_password('secret123')
+
+
+def test_account_deletion_needs_a_login_and_is_throttled(app, user):
+    client = app.test_client()
+    response = client.post('/auth/delete-account', data={'password': 'secret123'})
+    assert response.status_code == 302 and '/auth/login' in response.location
+    
+    assert login(client, 'secret123').status_code == 302
+    for _ in range(app.config['LOGIN_MAX_ATTEMPTS']):
+        assert client.post('/auth/delete-account', data={'password': 'wrong'}).status_code == 302
+    
+    # The right password is refused too, without hashing, and the account stays
+    hashed = password_hasher.hashed
+    client.post('/auth/delete-account', data={'password': 'secret123'})
+    assert password_hasher.hashed == hashed
+    db.session.expire_all()
+    assert db.session.get(User, user.id).is_active
+    
+    client.get('/auth/logout')
+    assert login(client, 'secret123').status_code == 429
@@ -0,0 +1,56 @@
+"""
+Requests, stages and queries are timed and served at /metrics in Prometheus format
+"""
+import pytest
+from config import TestingConfig
+from app import create_app
+from app.utils.metrics import metrics, _NULL_STAGE
+
+
+@pytest.fixture
+def enable_metrics(monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'METRICS_ENABLED', True)
+
+
+@pytest.fixture
+def app(enable_metrics, app):
+    """The shared app fixture, created with metrics enabled"""
+    return app
+
+
+def test_metrics_cover_endpoints_stages_and_queries(client):
+    assert client.get('/analytics/api/overview').status_code == 200
+    features = {'age': 45, 'gender': 1, 'height': 170, 'weight': 80, 'fatigue': 5}
+    assert client.post('/predict/api/diabetes', json=features).status_code == 200
+    
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert ('http_request_duration_seconds_count{method="GET",endpoint="/analytics/api/overview",status="200"} 1'
+            in text)
+    assert 'http_request_duration_seconds_bucket{method="POST",endpoint="/predict/api/<disease_type>",' in text
+    for stage in ('predict.coerce_features', 'predict.inference', 'predict.recommendations',
+                  'predict.db_commit', 'predict.serialize'):
+        assert f'app_stage_seconds_count{{stage="{stage}"}}' in text
+    assert 'http_request_db_queries_count{endpoint="/analytics/api/overview"} 1' in text
+    assert 'db_query_duration_seconds_count{bind="default"}' in text
+    assert '# TYPE model_cache_models gauge' in text
+
+
+def test_metrics_token(enable_metrics, monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'METRICS_TOKEN', 'scrape-me')
+    client = create_app('testing').test_client()
+    
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-me'}).status_code == 200
+
+
+def test_disabled_metrics_cost_nothing(monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'METRICS_ENABLED', False)
+    app = create_app('testing')
+    
+    assert metrics.stage('predict.inference') is _NULL_STAGE
+    assert app.test_client().get('/metrics').status_code == 404
@@ -0,0 +1,117 @@
+"""
+Databases created by the original release are upgraded in place to the current models
+"""
+import pytest
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models.prediction import Prediction
+from app.models.user import User
+from app.services.deletion_service import DeletionService
+from app.utils.migrations import upgrade_schema, MigrationError
+
+# The predictions table as the original release created it
+BASELINE_PREDICTIONS = (
+    """
+    CREATE TABLE predictions (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        disease_type VARCHAR(50) NOT NULL,
+        disease_name VARCHAR(100) NOT NULL,
+        prediction_result VARCHAR(20) NOT NULL,
+        risk_level VARCHAR(20),
+        confidence_score FLOAT,
+        risk_percentage FLOAT,
+        input_features TEXT,
+        model_name VARCHAR(100),
+        model_version VARCHAR(20),
+        model_accuracy FLOAT,
+        report_id VARCHAR(50),
+        report_generated BOOLEAN,
+        report_path VARCHAR(255),
+        created_at DATETIME,
+        notes TEXT,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )
+    """,
+    'CREATE INDEX ix_predictions_user_id ON predictions (user_id)',
+    'CREATE INDEX ix_predictions_disease_type ON predictions (disease_type)',
+    'CREATE UNIQUE INDEX ix_predictions_report_id ON predictions (report_id)',
+    'CREATE INDEX ix_predictions_created_at ON predictions (created_at)'
+)
+
+
+@pytest.fixture
+def baseline(app, user):
+    """The user and one prediction in a predictions table of the original schema"""
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('DROP TABLE predictions')
+        for statement in BASELINE_PREDICTIONS:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql(
+            "INSERT INTO predictions (user_id, disease_type, disease_name, prediction_result, risk_level, "
+            "confidence_score, risk_percentage, input_features, model_accuracy, report_generated, created_at) "
+            "VALUES (?, 'diabetes', 'Diabetes', 'Negative', 'Low', 80, 20, '{}', 90, 0, '2024-01-01 00:00:00')",
+            (user.id,)
+        )
+    return user
+
+
+def test_upgrade_adds_missing_columns(baseline, client):
+    with pytest.raises(OperationalError):
+        Prediction.query.all()
+    db.session.rollback()
+    
+    assert upgrade_schema(db.engine) == ['predictions.feature_contributions', 'predictions rebuilt']
+    assert upgrade_schema(db.engine) == []
+    
+    prediction = Prediction.query.one()
+    assert prediction.feature_contributions is None
+    assert client.get('/predict/history').status_code == 200
+    assert client.get(f'/predict/result/{prediction.id}').status_code == 200
+    assert client.get('/dashboard').status_code == 200
+    assert client.get('/analytics/api/overview').status_code == 200
+
+
+def _save_prediction(user):
+    prediction = Prediction(user_id=user.id, disease_type='diabetes', disease_name='Diabetes',
+                            prediction_result='Negative', risk_level='Low')
+    db.session.add(prediction)
+    db.session.commit()
+    return prediction.id
+
+
+def test_rebuilt_predictions_never_reuse_ids(baseline):
+    upgrade_schema(db.engine)
+    newest = _save_prediction(baseline)
+    Prediction.query.filter_by(id=newest).delete()
+    db.session.commit()
+    assert _save_prediction(baseline) > newest
+    
+    # The rebuilt table has the model's indexes, and no cascade behind the deletion service's back
+    with db.engine.connect() as connection:
+        sql = connection.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'predictions'").scalar()
+        indexes = {row[1] for row in connection.exec_driver_sql("PRAGMA index_list('predictions')")}
+    assert 'AUTOINCREMENT' in sql and 'CASCADE' not in sql
+    assert {index.name for index in Prediction.__table__.indexes} <= indexes
+
+
+def test_orphaned_predictions_are_deleted_before_the_rebuild(baseline):
+    user_id = baseline.id
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute('PRAGMA foreign_keys = OFF')
+        cursor.execute('DELETE FROM users')
+        cursor.execute('PRAGMA foreign_keys = ON')
+        connection.commit()
+    finally:
+        connection.close()
+    
+    with pytest.raises(MigrationError, match='1 predictions belong to deleted users'):
+        upgrade_schema(db.engine)
+    
+    # The column step is kept, so the deletion service can run
+    assert DeletionService().resume_account_deletions() == {user_id: 1}
+    assert upgrade_schema(db.engine) == ['predictions rebuilt']
+    assert Prediction.query.count() == User.query.count() == 0
@@ -0,0 +1,136 @@
+"""
+Population statistics come from daily rollups plus the uncompacted tail, folded exactly once
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+import config as config_module
+from config import TestingConfig
+from app import create_app, db
+from app.models.population_stats import DailyDiseaseStats
+from app.models.prediction import Prediction
+from app.services.population_stats_service import PopulationStatsService
+
+
+@pytest.fixture
+def app(tmp_storage, tmp_path, monkeypatch):
+    """A database file, so compactions in other threads have connections of their own"""
+    class FileDatabaseConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'stats.db')
+    
+    monkeypatch.setitem(config_module.config, 'stats-test', FileDatabaseConfig)
+    app = create_app('stats-test')
+    with app.app_context():
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def _add_predictions(user, count, days_old=1, disease_type='diabetes'):
+    now = datetime.utcnow()
+    for i in range(count):
+        db.session.add(Prediction(
+            user_id=user.id, disease_type=disease_type, disease_name=disease_type.title(),
+            prediction_result='Positive' if i % 2 else 'Negative', risk_level=('Low', 'Medium', 'High')[i % 3],
+            confidence_score=80.0, risk_percentage=float(i * 7 % 100),
+            created_at=now - timedelta(days=days_old + i % 3)
+        ))
+    db.session.commit()
+
+
+def _folded():
+    return sum(stats.prediction_count for stats in DailyDiseaseStats.query)
+
+
+def test_rollups_answer_like_the_table(app, user):
+    _add_predictions(user, 30)
+    _add_predictions(user, 12, disease_type='stroke')
+    service = PopulationStatsService(batch_size=7)
+    before = service.overview()
+    daily = service.daily(days=30)
+    
+    assert service.compact() == 42
+    assert service.compact() == 0
+    assert service.overview() == before
+    assert service.daily(days=30) == daily
+    assert before['overall']['total_predictions'] == 42
+    assert before['overall']['risk_distribution'] == {'Low': 14, 'Medium': 14, 'High': 14}
+    assert [d['disease_type'] for d in before['diseases']] == ['diabetes', 'stroke']
+    
+    _add_predictions(user, 5)
+    assert service.overview()['overall']['total_predictions'] == 47
+    assert service.compact() == 5
+    assert _folded() == 47
+
+
+def test_compaction_leaves_recent_predictions_in_the_tail(app, user):
+    _add_predictions(user, 3)
+    # Saved just now, as if its transaction were still committing
+    _add_predictions(user, 1, days_old=0)
+    _add_predictions(user, 2)
+    service = PopulationStatsService()
+    
+    # Nothing past the first recent id is folded, so the watermark cannot skip a late commit
+    assert service.compact(lag_seconds=60) == 3
+    assert service.get_watermark() == 3
+    assert service.overview()['overall']['total_predictions'] == 6
+    
+    assert service.compact(lag_seconds=0) == 3
+    assert service.overview()['overall']['total_predictions'] == 6
+
+
+def test_concurrent_compactions_fold_each_prediction_once(app, user, monkeypatch):
+    _add_predictions(user, 40)
+    service = PopulationStatsService(batch_size=10)
+    
+    # Widen the window between reading the watermark and writing the rollups
+    read_watermark = service.get_watermark
+    
+    def slow_watermark():
+        watermark = read_watermark()
+        time.sleep(0.05)
+        return watermark
+    
+    monkeypatch.setattr(service, 'get_watermark', slow_watermark)
+    folded = []
+    
+    def compact():
+        with app.app_context():
+            folded.append(service.compact(lag_seconds=0))
+            db.session.remove()
+    
+    threads = [threading.Thread(target=compact) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert sum(folded) == 40
+    assert _folded() == 40
+
+
+def test_compactor_runs_after_every_n_predictions(app, user, monkeypatch):
+    monkeypatch.setitem(app.config, 'STATS_COMPACT_EVERY', 3)
+    service = PopulationStatsService()
+    service.init_app(app)
+    try:
+        _add_predictions(user, 3)
+        for _ in range(2):
+            service.prediction_saved()
+        time.sleep(0.2)
+        assert _folded() == 0
+        
+        service.prediction_saved()
+        deadline = time.monotonic() + 5
+        while _folded() < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            db.session.rollback()
+        assert _folded() == 3
+        assert service.pending == 0
+    finally:
+        service.stop()
+        service.thread.join(5)
+    assert not service.thread.is_alive()
@@ -0,0 +1,101 @@
+"""
+Administrators can sample the stacks and allocations of a live worker
+"""
+import time
+import pytest
+from app import db
+from app.models.user import User
+from app.services.profiler_service import profiler
+
+FEATURES = {'age': 45, 'gender': 1, 'height': 170, 'weight': 80, 'fatigue': 5}
+
+
+@pytest.fixture
+def admin_client(client, user):
+    db.session.get(User, user.id).is_admin = True
+    db.session.commit()
+    yield client
+    profiler.stop()
+    profiler.last = None
+
+
+def test_profiler_requires_admin(client):
+    assert client.post('/admin/api/profiler/start', json={'seconds': 1}).status_code == 403
+    assert client.get('/admin/api/profiler/stacks').status_code == 403
+
+
+def test_profile_next_requests_of_an_endpoint(admin_client):
+    response = admin_client.post('/admin/api/profiler/start', json={
+        'endpoint': 'predictions.api_predict', 'requests': 1, 'interval_ms': 1
+    })
+    assert response.status_code == 202
+    assert admin_client.post('/admin/api/profiler/start', json={'seconds': 1}).status_code == 409
+    
+    # Other endpoints are not sampled and do not count towards the requests
+    assert admin_client.get('/analytics/api/overview').status_code == 200
+    assert profiler.current().active
+    
+    # The first prediction trains the model, so there is plenty to sample
+    assert admin_client.post('/predict/api/diabetes', json=FEATURES).status_code == 200
+    assert profiler.current().finished.wait(5)
+    
+    status = admin_client.get('/admin/api/profiler').get_json()
+    print('DBG', status)
+    assert status['stop_reason'] == 'requests done'
+    assert status['samples'] > 0
+    
+    stacks = admin_client.get('/admin/api/profiler/stacks')
+    assert stacks.mimetype == 'text/plain'
+    lines = stacks.get_data(as_text=True).splitlines()
+    assert lines and all(line.startswith('endpoint:predictions.api_predict;') for line in lines)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert admin_client.get('/admin/api/profiler/allocations').status_code == 404
+
+
+def test_trace_allocations(admin_client):
+    # Tracing slows training dozens of times, so the model is trained first
+    assert admin_client.post('/predict/api/diabetes', json=FEATURES).status_code == 200
+    admin_client.post('/admin/api/profiler/start', json={
+        'endpoint': 'predictions.api_predict', 'requests': 1, 'trace_memory': True
+    })
+    assert admin_client.get('/admin/api/profiler/allocations').status_code == 409
+    assert admin_client.post('/predict/api/diabetes', json=FEATURES).status_code == 200
+    assert profiler.current().finished.wait(5)
+    
+    allocations = admin_client.get('/admin/api/profiler/allocations').get_json()['allocations']
+    assert allocations and {'site', 'size_kib', 'count', 'traceback'} <= set(allocations[0])
+
+
+def test_allocation_tracing_ends_at_its_limit(admin_client, monkeypatch):
+    monkeypatch.setattr(profiler, 'max_trace_bytes', 0)
+    admin_client.post('/admin/api/profiler/start', json={'seconds': 30, 'trace_memory': True})
+    deadline = time.monotonic() + 5
+    while profiler.current().tracing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    
+    # Sampling carries on without it, and what was traced can be read
+    status = admin_client.get('/admin/api/profiler').get_json()
+    assert status['active'] and not status['tracing']
+    assert admin_client.get('/admin/api/profiler/allocations').status_code == 200
+
+
+def test_sampling_above_the_overhead_cap_stops(admin_client, monkeypatch):
+    def costly_sample(session):
+        started = time.thread_time()
+        while time.thread_time() - started < 0.005:
+            pass
+    
+    monkeypatch.setattr(profiler, '_sample', costly_sample)
+    admin_client.post('/admin/api/profiler/start', json={'seconds': 30, 'interval_ms': 1})
+    assert profiler.current().finished.wait(5)
+    
+    # One window to back off, and a second one still above the cap
+    status = admin_client.get('/admin/api/profiler').get_json()
+    assert status['stop_reason'] == 'overhead cap exceeded'
+    assert status['interval_ms'] > 1
+
+
+def test_profile_rejects_unknown_endpoint(admin_client):
+    response = admin_client.post('/admin/api/profiler/start', json={'endpoint': 'nope', 'requests': 1})
+    assert response.status_code == 400
+    assert admin_client.post('/admin/api/profiler/stop').status_code == 409
@@ -0,0 +1,72 @@
+"""
+Read-only views are served by replicas, with read-your-writes and health-check fallback
+"""
+import pytest
+from sqlalchemy.exc import OperationalError
+import config as config_module
+from config import Config
+from app import create_app, db
+from app.models.user import User
+from app.models.prediction import Prediction
+from app.utils.database import replicas, PINNED_KEY
+
+
+@pytest.fixture
+def app(tmp_storage, tmp_path, monkeypatch):
+    """Primary and replica as two SQLite files; replication is left to the test"""
+    class ReplicaConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'primary.db')
+        DATABASE_REPLICA_URLS = ['sqlite:///' + str(tmp_path / 'replica.db')]
+        PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    
+    monkeypatch.setitem(config_module.config, 'replica-test', ReplicaConfig)
+    app = create_app('replica-test')
+    with app.app_context():
+        db.create_all(bind_key=None)
+        db.metadata.create_all(db.engines['replica_0'])
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def replica_row(app, user):
+    """The user, copied to the replica, with a prediction only the replica has"""
+    with db.engines['replica_0'].begin() as connection:
+        connection.execute(User.__table__.insert(), [{
+            'id': user.id, 'username': user.username, 'email': user.email,
+            'password_hash': user.password_hash, 'is_active': True, 'is_admin': False
+        }])
+        connection.execute(Prediction.__table__.insert(), [{
+            'user_id': user.id, 'disease_type': 'stroke', 'disease_name': 'Replica Only',
+            'prediction_result': 'Negative', 'risk_level': 'Low', 'risk_percentage': 10.0
+        }])
+
+
+def diseases(client):
+    return client.get('/analytics/api/overview').get_json()['disease_distribution']
+
+
+def test_analytics_reads_from_replica(client, replica_row):
+    assert 'Replica Only' in diseases(client)
+
+
+def test_writes_pin_user_to_primary(client, replica_row):
+    client.post('/auth/update-profile', data={'full_name': 'Writer', 'email': 'patient@example.com'})
+    
+    assert 'Replica Only' not in diseases(client)
+    
+    with client.session_transaction() as session:
+        session[PINNED_KEY] = 0
+    assert 'Replica Only' in diseases(client)
+
+
+def test_unhealthy_replica_falls_back_to_primary(app, client, replica_row, monkeypatch):
+    def unavailable():
+        raise OperationalError('SELECT 1', {}, Exception('replica down'))
+    monkeypatch.setattr(db.engines['replica_0'], 'connect', unavailable)
+    
+    assert 'Replica Only' not in diseases(client)
+    assert replicas.stats()['binds'][0]['healthy'] is False
@@ -0,0 +1,91 @@
+"""
+Report files are sharded, swept of orphans and evicted over the quota
+"""
+import os
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.prediction import Prediction
+from app.models.report_file import ReportFile
+from app.services.report_storage_service import report_storage
+
+
+def _prediction(user, report_id):
+    prediction = Prediction(
+        user_id=user.id, disease_type='diabetes', disease_name='Diabetes', prediction_result='Negative',
+        risk_level='Low', confidence_score=80.0, model_accuracy=90.0, risk_percentage=20.0, report_id=report_id
+    )
+    prediction.set_input_features({'Glucose': 100})
+    db.session.add(prediction)
+    db.session.flush()
+    return prediction
+
+
+def _write(path, size):
+    with open(path, 'wb') as f:
+        f.write(b'%' * size)
+    return path
+
+
+@pytest.fixture
+def storage(app):
+    os.makedirs(report_storage.root, exist_ok=True)
+    yield report_storage
+    report_storage.quota_bytes = app.config['REPORTS_QUOTA_MB'] * 1024 * 1024
+
+
+def test_generated_report_is_sharded_and_tracked(client, user):
+    prediction = _prediction(user, 'RPT_GENERATED')
+    db.session.commit()
+    
+    response = client.get(f'/reports/generate/{prediction.id}')
+    assert response.status_code == 200
+    
+    record = ReportFile.query.filter_by(report_id='RPT_GENERATED').one()
+    assert record.path == report_storage.relative_path('RPT_GENERATED')
+    assert record.size == os.path.getsize(prediction.report_path) > 0
+    assert not [name for name in os.listdir(report_storage.root) if name.endswith('.pdf')]
+
+
+def test_sweep_migrates_and_removes_orphans(storage, user):
+    kept = _prediction(user, 'RPT_KEPT')
+    missing = _prediction(user, 'RPT_MISSING')
+    storage.register(missing, _write(storage.path_for('RPT_MISSING'), 10))
+    db.session.commit()
+    os.remove(storage.path_for('RPT_MISSING'))
+    
+    _write(os.path.join(storage.root, 'report_RPT_KEPT.pdf'), 10)
+    _write(os.path.join(storage.root, 'report_RPT_GONE.pdf'), 10)
+    _write(storage.path_for('RPT_DELETED'), 10)
+    
+    result = storage.sweep()
+    
+    assert result['migrated'] == 1
+    assert result['orphans_removed'] == 2
+    assert result['missing'] == 1
+    assert os.path.exists(storage.path_for('RPT_KEPT'))
+    assert kept.report_path == storage.path_for('RPT_KEPT') and kept.report_generated
+    assert not os.path.exists(storage.path_for('RPT_DELETED'))
+    db.session.refresh(missing)
+    assert not missing.report_generated and missing.report_path is None
+    assert {record.report_id for record in ReportFile.query} == {'RPT_KEPT'}
+
+
+def test_sweep_evicts_least_recently_used(storage, user):
+    now = datetime.utcnow()
+    predictions = []
+    for i in range(4):
+        prediction = _prediction(user, f'RPT_{i}')
+        record = storage.register(prediction, _write(storage.path_for(f'RPT_{i}'), 1000))
+        record.last_accessed = now - timedelta(days=10 - i)
+        predictions.append(prediction)
+    db.session.commit()
+    
+    storage.quota_bytes = 2500
+    result = storage.sweep()
+    
+    assert result['evicted'] == 2
+    assert storage.usage() == (2, 2000)
+    db.session.expire_all()
+    assert [p.report_generated for p in predictions] == [False, False, True, True]
+    assert not os.path.exists(storage.path_for('RPT_0'))
@@ -0,0 +1,62 @@
+"""
+What-if analysis scores single and pairwise perturbations within a row limit
+"""
+import pytest
+from config import Config
+from app.routes import predictions as prediction_routes
+
+FEATURES = {'age': 45, 'gender': 1, 'height': 170, 'weight': 80, 'fatigue': 5}
+
+
+def _sensitivity(client, pairwise=None):
+    query = {'pairwise': pairwise} if pairwise else {}
+    return client.post('/predict/api/diabetes/sensitivity', json=FEATURES, query_string=query)
+
+
+def test_single_feature_perturbations(client):
+    response = _sensitivity(client)
+    assert response.status_code == 200
+    result = response.get_json()
+    
+    service = prediction_routes.prediction_service
+    assert result['risk_percentage'] == service.predict('diabetes', FEATURES)['risk_percentage']
+    assert 'pairwise' not in result
+    assert sorted(f['feature'] for f in result['features']) == sorted(service.disease_features['diabetes'])
+    assert result['perturbations_scored'] == sum(len(f['perturbations']) for f in result['features'])
+    
+    age = next(f for f in result['features'] if f['feature'] == 'age')
+    assert age['current_value'] == 45
+    assert 45 not in [p['value'] for p in age['perturbations']]
+    for p in age['perturbations']:
+        assert p['delta'] == pytest.approx(p['risk_percentage'] - result['risk_percentage'], abs=0.02)
+    
+    # Most influential features first
+    influence = [max(f['max_increase'], -f['max_decrease']) for f in result['features']]
+    assert influence == sorted(influence, reverse=True)
+
+
+def test_pairwise_perturbations(client):
+    result = _sensitivity(client, 'age,fatigue').get_json()
+    singles = {f['feature']: len(f['perturbations']) for f in result['features']}
+    assert result['perturbations_scored'] == sum(singles.values()) + singles['age'] * singles['fatigue']
+    
+    pair, = result['pairwise']
+    assert pair['features'] == ['age', 'fatigue']
+    assert pair['lowest']['delta'] <= pair['highest']['delta']
+    assert len(pair['highest']['values']) == 2
+    
+    every_pair = _sensitivity(client, '1').get_json()
+    features = len(every_pair['features'])
+    assert len(every_pair['pairwise']) == features * (features - 1) // 2
+
+
+def test_too_many_perturbations_are_refused(client, monkeypatch):
+    rows = _sensitivity(client, 'age,fatigue').get_json()['perturbations_scored'] + 1
+    
+    monkeypatch.setattr(Config, 'SENSITIVITY_MAX_ROWS', rows - 1)
+    response = _sensitivity(client, 'age,fatigue')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == f'Too many perturbations ({rows}); restrict the pairwise features'
+    
+    monkeypatch.setattr(Config, 'SENSITIVITY_MAX_ROWS', rows)
+    assert _sensitivity(client, 'age,fatigue').status_code == 200
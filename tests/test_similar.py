@@ -0,0 +1,79 @@
+"""
+Similar past predictions are only ever the owner's own, unless an admin searches everyone
+"""
+import threading
+import pytest
+from app import db
+from app.models.user import User
+from app.routes import predictions as prediction_routes
+from app.services.similarity_index_service import SimilarityIndexService
+
+FEATURES = {'age': 45, 'gender': 1, 'height': 170, 'weight': 80, 'fatigue': 5}
+
+
+@pytest.fixture
+def other_client(app):
+    """Test client logged in as a second user"""
+    other = User(username='other', email='other@example.com')
+    other.set_password('secret123')
+    db.session.add(other)
+    db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(other.id)
+        session['_fresh'] = True
+    return client
+
+
+def _predict(client, **changes):
+    response = client.post('/predict/api/diabetes', json=dict(FEATURES, **changes))
+    assert response.status_code == 200
+    return response.get_json()['prediction_id']
+
+
+def _similar_ids(client, prediction_id, **params):
+    response = client.get(f'/predict/api/diabetes/similar/{prediction_id}', query_string=params)
+    assert response.status_code == 200
+    return [item['id'] for item in response.get_json()['similar']]
+
+
+def test_only_the_owners_predictions_are_returned(app, client, user, other_client):
+    own = [_predict(client, age=45 + i) for i in range(3)]
+    others = [_predict(other_client, age=45 + i) for i in range(3)]
+    
+    assert sorted(_similar_ids(client, own[0])) == own[1:]
+    assert client.get(f'/predict/api/diabetes/similar/{others[0]}').status_code == 404
+    
+    # Admins may search every user's history
+    user.is_admin = True
+    db.session.commit()
+    assert sorted(_similar_ids(client, own[0], scope='all')) == sorted(own[1:] + others)
+
+
+def test_a_stale_index_cannot_leak_other_users_predictions(client, other_client, monkeypatch):
+    own = [_predict(client) for _ in range(2)]
+    foreign = _predict(other_client)
+    
+    # As if the index still listed a prediction under the wrong owner
+    index = prediction_routes.similarity_index.instance
+    monkeypatch.setattr(index, 'query', lambda *args, **kwargs: [(foreign, 0.0), (own[1], 1.0)])
+    assert _similar_ids(client, own[0]) == [own[1]]
+
+
+def test_queries_see_one_version_of_a_growing_index(app, tmp_path):
+    service = SimilarityIndexService(index_path=str(tmp_path))
+    path = service._path('diabetes')
+    done = threading.Event()
+    
+    def append():
+        for i in range(1, 301):
+            service._append(path, service._record('diabetes', i, 1, FEATURES).tobytes())
+        done.set()
+    
+    writer = threading.Thread(target=append)
+    writer.start()
+    while not done.is_set():
+        records, norms, ids, user_ids, deleted = service._get_index('diabetes')
+        assert len(records) == len(norms) == len(ids) == len(user_ids)
+    writer.join()
+    assert len(service.query('diabetes', FEATURES, k=1000, user_id=1)) == 300
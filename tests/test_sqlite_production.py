@@ -0,0 +1,107 @@
+"""
+In SQLite production mode reads never hold the writer connection
+"""
+import threading
+import pytest
+import config as config_module
+from config import TestingConfig
+from app import create_app, db
+from app.models.prediction import Prediction
+
+
+@pytest.fixture
+def app(tmp_storage, tmp_path, monkeypatch):
+    """A WAL database file with one writer connection that gives up after a second"""
+    class ProductionModeConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'production.db')
+        SQLITE_PRODUCTION_MODE = True
+        SQLITE_WRITER_TIMEOUT = 1
+    
+    monkeypatch.setitem(config_module.config, 'production-mode-test', ProductionModeConfig)
+    app = create_app('production-mode-test')
+    with app.app_context():
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def _run_concurrently(app, path, count=2):
+    """Request path from count clients at once; returns their status codes"""
+    statuses = []
+    
+    def request():
+        statuses.append(app.test_client().get(path).status_code)
+    
+    threads = [threading.Thread(target=request) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses
+
+
+def test_concurrent_plain_reads_both_finish(app):
+    both_reading = threading.Barrier(2, timeout=5)
+    
+    @app.route('/slow-read')
+    def slow_read():
+        # Each request keeps its read transaction open until the other one has read too
+        count = Prediction.query.count()
+        both_reading.wait()
+        return {'count': count}
+    
+    assert _run_concurrently(app, '/slow-read') == [200, 200]
+
+
+def test_reads_do_not_wait_for_a_writer(app, user):
+    user_id = user.id
+    writing = threading.Event()
+    read_done = threading.Event()
+    
+    @app.route('/slow-write')
+    def slow_write():
+        prediction = Prediction(
+            user_id=user_id, disease_type='diabetes', disease_name='Diabetes', prediction_result='Negative'
+        )
+        db.session.add(prediction)
+        db.session.flush()
+        writing.set()
+        # Holds the write lock until the reader has finished
+        read_done.wait(5)
+        db.session.commit()
+        return {'written': True}
+    
+    @app.route('/read')
+    def read():
+        writing.wait(5)
+        count = Prediction.query.count()
+        read_done.set()
+        return {'count': count}
+    
+    statuses = []
+    writer = threading.Thread(target=lambda: statuses.append(app.test_client().get('/slow-write').status_code))
+    writer.start()
+    response = app.test_client().get('/read')
+    writer.join()
+    
+    # The read saw the last commit, not the uncommitted row, and did not wait for it
+    assert response.get_json() == {'count': 0}
+    assert statuses == [200]
+    # Requests from this thread share the test's session, so end its read transaction first
+    db.session.rollback()
+    assert Prediction.query.count() == 1
+
+
+def test_a_write_transaction_reads_its_own_changes(app, user):
+    prediction = Prediction(
+        user_id=user.id, disease_type='diabetes', disease_name='Diabetes', prediction_result='Negative'
+    )
+    db.session.add(prediction)
+    db.session.commit()
+    
+    Prediction.query.filter_by(user_id=user.id).delete(synchronize_session=False)
+    assert Prediction.query.count() == 0
+    db.session.rollback()
+    assert Prediction.query.count() == 1
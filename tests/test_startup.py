@@ -0,0 +1,16 @@
+"""
+A cold create_app stays within its time budget and defers the heavy libraries
+"""
+from app.utils.startup import profile_startup
+
+# Seconds for a cold create_app in a fresh interpreter; about 0.4 on a development machine
+STARTUP_BUDGET_SECONDS = 1.5
+
+
+def test_cold_start_within_budget():
+    # The fastest of a few starts, so one slow start on a busy machine does not fail the build
+    profiles = [profile_startup('testing', limit=5) for _ in range(3)]
+    fastest = min(profile['create_app_seconds'] for profile in profiles)
+    
+    assert fastest < STARTUP_BUDGET_SECONDS, profiles[0]['modules']
+    assert profiles[0]['heavy_modules'] == []
@@ -0,0 +1,118 @@
+"""
+Clients sync prediction history incrementally from the change log
+"""
+import json
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.user import User
+from app.models.prediction import Prediction
+from app.models.prediction_change import PredictionChange
+from app.services.archive_service import ArchiveService
+from app.services.change_log_service import change_log
+from app.services.report_storage_service import report_storage
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    service = ArchiveService(archive_path=str(tmp_path / 'archive'))
+    monkeypatch.setattr(change_log, 'archive', service)
+    return service
+
+
+def _prediction(user, days_old=0):
+    prediction = Prediction(
+        user_id=user.id, disease_type='diabetes', disease_name='Diabetes', prediction_result='Negative',
+        risk_level='Low', confidence_score=80.0, model_accuracy=90.0, risk_percentage=20.0,
+        created_at=datetime.utcnow() - timedelta(days=days_old)
+    )
+    prediction.set_input_features({'Glucose': 100})
+    prediction.generate_report_id()
+    db.session.add(prediction)
+    db.session.flush()
+    change_log.record(prediction, PredictionChange.CREATED)
+    db.session.commit()
+    return prediction
+
+
+def _sync(client, token=None, limit=None):
+    params = {'since': token} if token else {}
+    if limit:
+        params['limit'] = limit
+    response = client.get('/predict/api/sync', query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_first_sync_pages_through_hot_and_archived_history(client, user, archive):
+    old = [_prediction(user, days_old=500).id for _ in range(3)]
+    archive.archive(older_than_days=400)
+    recent = [_prediction(user) for _ in range(2)]
+    
+    first = _sync(client, limit=2)
+    assert first['has_more']
+    assert [c['prediction']['id'] for c in first['changes']] == old[:2]
+    assert first['changes'][0]['prediction']['archived']
+    
+    rest = _sync(client, first['sync_token'], limit=2)
+    second = _sync(client, rest['sync_token'], limit=2)
+    assert [c['prediction']['id'] for c in rest['changes'] + second['changes']] == old[2:] + [p.id for p in recent]
+    assert not second['has_more']
+    
+    # Creations logged before the snapshot are not sent again
+    assert _sync(client, second['sync_token'])['changes'] == []
+
+
+def test_changes_since_token(client, user, archive, tmp_path):
+    kept, deleted_id = _prediction(user), _prediction(user).id
+    token = _sync(client)['sync_token']
+    
+    added = _prediction(user)
+    assert client.post(f'/predict/delete/{deleted_id}').status_code == 302
+    path = tmp_path / 'report.pdf'
+    path.write_bytes(b'%PDF')
+    report_storage.register(kept, str(path))
+    db.session.commit()
+    
+    changes = _sync(client, token)
+    assert changes['changes'] == [
+        {'op': 'upsert', 'prediction': dict(added.to_dict(), report_generated=False, archived=False)},
+        {'op': 'delete', 'id': deleted_id},
+        {'op': 'upsert', 'prediction': dict(kept.to_dict(), report_generated=True, archived=False)},
+    ]
+    
+    # Evicting the report is a change too
+    report_storage._forget([kept.id])
+    db.session.commit()
+    evicted = _sync(client, changes['sync_token'])['changes']
+    assert evicted == [{'op': 'upsert', 'prediction': dict(kept.to_dict(), report_generated=False, archived=False)}]
+
+
+def test_large_syncs_stream_as_ndjson(client, user, archive):
+    created = [_prediction(user) for _ in range(7)]
+    
+    response = client.get('/predict/api/sync?limit=3', headers={'Accept': 'application/x-ndjson'})
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['prediction']['id'] for line in lines[:-1]] == [p.id for p in created]
+    assert lines[-1]['has_more'] is False
+    
+    newer = _prediction(user)
+    response = client.get('/predict/api/sync', query_string={'since': lines[-1]['sync_token'], 'format': 'ndjson'})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['prediction']['id'] for line in lines[:-1]] == [newer.id]
+
+
+def test_foreign_and_expired_tokens_are_refused(app, client, user, archive):
+    other = User(username='other', email='other@example.com')
+    other.set_password('secret123')
+    db.session.add(other)
+    db.session.commit()
+    with app.test_request_context():
+        foreign = change_log._dump(other.id, 0, None, datetime.utcnow())
+        expired = change_log._dump(user.id, 0, None, datetime.utcnow() - timedelta(days=change_log.retention_days + 1))
+    
+    assert client.get('/predict/api/sync?since=garbage').status_code == 400
+    assert client.get(f'/predict/api/sync?since={foreign}').status_code == 400
+    response = client.get(f'/predict/api/sync?since={expired}')
+    assert response.status_code == 410 and response.get_json()['resync']
@@ -0,0 +1,96 @@
+"""
+Static template fragments are rendered once per worker and templates compile into a shared bytecode cache
+"""
+import os
+from flask import render_template, render_template_string
+from jinja2 import DictLoader
+from app import create_app, db
+from app.models.user import User
+from app.utils.template_cache import fragment_cache
+from config import Config, TestingConfig
+
+
+def test_prediction_form_is_rendered_once_per_disease(client):
+    first = client.get('/predict/diabetes')
+    assert first.status_code == 200
+    assert fragment_cache.stats()['misses'] == 1
+    
+    again = client.get('/predict/diabetes')
+    assert again.data == first.data
+    assert fragment_cache.stats()['hits'] == 1
+    
+    other = client.get('/predict/heart_disease')
+    assert b'Heart Disease Risk Screening' in other.data
+    assert b'Diabetes Risk Screening' not in other.data
+    assert fragment_cache.stats()['fragments'] == 2
+
+
+def test_user_specific_parts_stay_per_request(app, client):
+    other = User(username='second', email='second@example.com')
+    other.set_password('secret123')
+    db.session.add(other)
+    db.session.commit()
+    other_client = app.test_client()
+    with other_client.session_transaction() as session:
+        session['_user_id'] = str(other.id)
+        session['_fresh'] = True
+    
+    assert b'Welcome, patient!' in client.get('/dashboard').data
+    assert b'Welcome, second!' in other_client.get('/dashboard').data
+    assert fragment_cache.stats()['hits'] == 1
+
+
+def test_edited_template_gets_new_fragments(app):
+    loader = DictLoader({'page.html': "{% cache 'page', 1 %}version 1{% endcache %}"})
+    app.jinja_env.loader = loader
+    app.jinja_env.auto_reload = True
+    with app.test_request_context():
+        assert render_template('page.html') == 'version 1'
+        
+        loader.mapping['page.html'] = "{% cache 'page', 1 %}version 2{% endcache %}"
+        assert render_template('page.html') == 'version 2'
+    assert fragment_cache.stats()['fragments'] == 2
+
+
+def test_fragments_follow_the_script_root(app):
+    source = "{% cache 'link' %}{{ url_for('main.index') }}{% endcache %}"
+    with app.test_request_context():
+        assert render_template_string(source) == '/'
+    with app.test_request_context(base_url='http://localhost/health'):
+        assert render_template_string(source) == '/health/'
+
+
+def test_admin_clears_the_fragments(client, user):
+    db.session.get(User, user.id).is_admin = True
+    db.session.commit()
+    client.get('/predict/diabetes')
+    
+    assert client.post('/admin/api/template-cache/clear').get_json()['fragments'] == 0
+    client.get('/predict/diabetes')
+    assert fragment_cache.stats()['misses'] == 2
+
+
+def test_disabled_fragment_cache_renders_every_time(monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'TEMPLATE_FRAGMENT_CACHE_ENABLED', False)
+    app = create_app('testing')
+    
+    with app.test_request_context():
+        for _ in range(2):
+            render_template('predictions/prediction_form.html', disease_type='diabetes',
+                            disease_info=Config.DISEASES['diabetes'])
+    assert fragment_cache.stats()['fragments'] == fragment_cache.stats()['hits'] == 0
+
+
+def test_templates_compile_into_bytecode_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'TEMPLATE_BYTECODE_CACHE_PATH', str(tmp_path / 'bytecode'))
+    app = create_app('testing')
+    
+    app.jinja_env.get_template('predictions/prediction_form.html')
+    assert os.listdir(tmp_path / 'bytecode')
+    
+    # A new worker loads the compiled code instead of parsing the source
+    fresh = create_app('testing')
+    loads = []
+    monkeypatch.setattr(fresh.jinja_env, '_parse', lambda *args: loads.append(args))
+    fresh.jinja_env.get_template('predictions/prediction_form.html')
+    assert loads == []
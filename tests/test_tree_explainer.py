@@ -0,0 +1,43 @@
+"""
+Explanations add up to the model's probability and are recorded when a prediction is saved
+"""
+import numpy as np
+import pytest
+from app import db
+from app.models.prediction import Prediction
+from app.services.prediction_service import PredictionService
+from app.services.tree_explainer import TreeExplainer
+
+FEATURES = {'age': 45, 'gender': 1, 'height': 170, 'weight': 80, 'fatigue': 5}
+
+
+@pytest.fixture
+def service(tmp_storage):
+    return PredictionService()
+
+
+@pytest.mark.parametrize('disease_type', ['diabetes', 'stroke', 'covid19'])
+def test_bias_plus_contributions_is_predict_proba(service, disease_type):
+    model = service.load_model(disease_type)
+    ranges = [service.feature_ranges[disease_type][f] for f in service.disease_features[disease_type]]
+    rng = np.random.default_rng(0)
+    X = np.array([[rng.uniform(low, high) for low, high in ranges] for _ in range(100)])
+    
+    bias, contributions = TreeExplainer(model).explain(X)
+    assert contributions.shape == X.shape
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), model.predict_proba(X)[:, 1], rtol=0, atol=1e-9)
+
+
+def test_explanations_are_saved_with_the_prediction_and_never_on_read(client, query_recorder):
+    saved = client.post('/predict/api/diabetes', json=FEATURES).get_json()
+    prediction = db.session.get(Prediction, saved['prediction_id'])
+    assert prediction.get_feature_contributions() == saved['feature_contributions']
+    
+    # A prediction saved without one is shown without one, and the page writes nothing
+    prediction.feature_contributions = None
+    db.session.commit()
+    with query_recorder() as recorder:
+        assert client.get(f"/predict/result/{prediction.id}").status_code == 200
+    assert all(statement.lstrip().upper().startswith('SELECT') for statement, _ in recorder.statements)
+    db.session.expire_all()
+    assert db.session.get(Prediction, prediction.id).feature_contributions is None
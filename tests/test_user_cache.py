@@ -0,0 +1,63 @@
+"""
+The logged-in user is served from the user cache instead of a query per request
+"""
+from app import db
+from app.models.user import User
+from app.services.user_cache_service import user_cache
+
+
+def user_queries(recorder):
+    return [s for s, _ in recorder.statements if 'FROM users' in s]
+
+
+def test_repeat_requests_skip_users_table(client, query_recorder):
+    client.get('/analytics/api/overview')
+    
+    with query_recorder() as recorder:
+        for _ in range(4):
+            assert client.get('/analytics/api/overview').status_code == 200
+    
+    assert user_queries(recorder) == []
+    assert user_cache.stats()['hits'] >= 4
+
+
+def test_profile_update_invalidates(client):
+    client.get('/auth/profile')
+    
+    response = client.post('/auth/update-profile', data={
+        'full_name': 'Renamed Patient', 'email': 'patient@example.com', 'age': '40', 'gender': 'Other'
+    })
+    
+    assert response.status_code == 302
+    assert b'Renamed Patient' in client.get('/auth/profile').data
+
+
+def test_deactivated_user_is_logged_out(client, user):
+    assert client.get('/dashboard').status_code == 200
+    
+    db.session.get(User, user.id).is_active = False
+    db.session.commit()
+    
+    assert client.get('/dashboard').status_code == 302
+
+
+def test_session_snapshot(client, query_recorder, monkeypatch):
+    monkeypatch.setattr(user_cache, 'session_snapshot', True)
+    client.get('/dashboard')
+    user_cache.clear()
+    
+    with query_recorder() as recorder:
+        assert client.get('/analytics/api/overview').status_code == 200
+    
+    assert user_queries(recorder) == []
+    assert user_cache.stats()['session_hits'] == 1
+
+
+def test_stats_require_admin(client, user):
+    assert client.get('/admin/api/user-cache').status_code == 403
+    
+    db.session.get(User, user.id).is_admin = True
+    db.session.commit()
+    
+    stats = client.get('/admin/api/user-cache').get_json()
+    assert {'hits', 'misses', 'session_hits', 'invalidations', 'hit_rate'} <= set(stats)